@@ -0,0 +1,154 @@
+import csv
+import datetime
+
+# synthetic dump rows for the benchmarks. shaped like the real dumps, with unique timestamps per index
+
+# destination table for synthetic CoSMo rows
+BENCH_TABLE = "BENCH01"
+
+COSMO_SCHEMA = [
+    "DatasetName", "MonitoringLocationID", "MonitoringLocationName", "MonitoringLocationLatitude",
+    "MonitoringLocationLongitude", "MonitoringLocationHorizontalCoordinateReferenceSystem",
+    "MonitoringLocationHorizontalAccuracyMeasure", "MonitoringLocationHorizontalAccuracyUnit",
+    "MonitoringLocationVerticalMeasure", "MonitoringLocationVerticalUnit", "MonitoringLocationType",
+    "ActivityType", "ActivityMediaName", "ActivityStartDate", "ActivityStartTime", "ActivityEndDate",
+    "ActivityEndTime", "ActivityDepthHeightMeasure", "ActivityDepthHeightUnit", "SampleCollectionEquipmentName",
+    "CharacteristicName", "MethodSpeciation", "ResultSampleFraction", "ResultValue", "ResultUnit",
+    "ResultValueType", "ResultDetectionCondition", "ResultDetectionQuantitationLimitMeasure",
+    "ResultDetectionQuantitationLimitUnit", "ResultDetectionQuantitationLimitType", "ResultStatusID",
+    "ResultComment", "ResultAnalyticalMethodID", "ResultAnalyticalMethodContext", "ResultAnalyticalMethodName",
+    "AnalysisStartDate", "AnalysisStartTime", "AnalysisStartTimeZone", "LaboratoryName", "LaboratorySampleID",
+]
+
+# sites and characteristics of the CoSMo dump files. every site gets every characteristic at each timestamp
+COSMO_SITES = ["WAGG01", "WAGG02", "MOSQ01", "MOSQ04", "MISS01", "MACK02", "HAST01", "HAST03"]
+
+# characteristic, unit, lowest value and spread of values
+COSMO_CHARACTERISTICS = [
+    ("Conductivity", "uS/cm", 50.0, 100.0),
+    ("Specific conductance", "uS/cm", 60.0, 120.0),
+    ("Temperature, water", "deg C", 2.0, 18.0),
+    ("Depth, data-logger (ported)", "m", 10.0, 1.5),
+]
+
+CNV_SCHEMA = [
+    "yyyy/MM/dd HH:mm:ss",
+    "Air Temperature - 5 min Intervals (°C)",
+    "Barometer 5 min Intervals (mbar)",
+    "Hourly Rainfall (mm)",
+    "Rainfall (mm)"
+]
+
+# one in REJECT_EVERY rows of a dump file is one the importer should reject
+REJECT_EVERY = 200
+
+
+class SyntheticDumps(object):
+
+    # a CoSMo dump row with a unique timestamp per index
+    def cosmo_row(i, monitoring_location_id=BENCH_TABLE):
+        timestamp = datetime.datetime(2019, 1, 1) + datetime.timedelta(minutes=15 * i)
+
+        row = dict.fromkeys(COSMO_SCHEMA, "")
+        row["DatasetName"] = "DFO PSEC Community Stream Monitoring (CoSMo)"
+        row["MonitoringLocationID"] = monitoring_location_id
+        row["MonitoringLocationName"] = "Benchmark Creek"
+        row["MonitoringLocationLatitude"] = "49.3211"
+        row["MonitoringLocationLongitude"] = "-123.0712"
+        row["MonitoringLocationType"] = "River/Stream"
+        row["ActivityType"] = "Field Msr/Obs"
+        row["ActivityMediaName"] = "Surface Water"
+        row["ActivityStartDate"] = timestamp.strftime("%Y-%m-%d")
+        row["ActivityStartTime"] = timestamp.strftime("%H:%M:%S")
+        row["CharacteristicName"] = "Conductivity"
+        row["ResultValue"] = "%.1f" % (50 + (i % 400) / 4)
+        row["ResultUnit"] = "uS/cm"
+        row["ResultValueType"] = "Actual"
+        return row
+
+    # a CoSMo dump row for the index'th row of a dump file, spread over the sites and characteristics. rejects are rows
+    # for a site that isn't imported, or rows failing validation
+    def cosmo_dump_row(i, reject=False):
+        site = COSMO_SITES[i % len(COSMO_SITES)]
+        characteristic_index = (i // len(COSMO_SITES)) % len(COSMO_CHARACTERISTICS)
+        characteristic, unit, lowest, spread = COSMO_CHARACTERISTICS[characteristic_index]
+
+        # timestamps are unique per site and characteristic
+        timestamp = datetime.datetime(2019, 1, 1) + datetime.timedelta(
+            minutes=15 * (i // (len(COSMO_SITES) * len(COSMO_CHARACTERISTICS))))
+
+        row = SyntheticDumps.cosmo_row(i, site)
+        row["ActivityStartDate"] = timestamp.strftime("%Y-%m-%d")
+        row["ActivityStartTime"] = timestamp.strftime("%H:%M:%S")
+        row["CharacteristicName"] = characteristic
+        row["ResultUnit"] = unit
+        row["ResultValue"] = "%.3f" % (lowest + spread * ((i * 7919) % 1000) / 1000)
+
+        if reject:
+            kind = (i // REJECT_EVERY) % 3
+            if kind == 0:
+                row["MonitoringLocationID"] = "XXXX01"
+            elif kind == 1:
+                row["ActivityStartTime"] = ""
+            else:
+                row["CharacteristicName"] = "Conductivity"
+                row["ResultValue"] = "-1.0"
+
+        return row
+
+    # a CNV rainfall dump row for the index'th row of a dump file, five minutes apart. rejects are missing rainfall or
+    # an air temperature out of range
+    def cnv_dump_row(i, reject=False):
+        timestamp = datetime.datetime(2015, 1, 1) + datetime.timedelta(minutes=5 * i)
+
+        row = {
+            "yyyy/MM/dd HH:mm:ss": timestamp.strftime("%Y/%m/%d %H:%M:%S"),
+            "Air Temperature - 5 min Intervals (°C)": "%.1f" % (5 + (i % 300) / 20),
+            "Barometer 5 min Intervals (mbar)": "%.2f" % (1000 + (i % 500) / 20),
+            "Hourly Rainfall (mm)": "%.1f" % ((i % 7) / 5) if i % 12 == 0 else "",
+            "Rainfall (mm)": "%.1f" % ((i % 3) / 5)
+        }
+
+        if reject:
+            if (i // REJECT_EVERY) % 2 == 0:
+                row["Rainfall (mm)"] = ""
+            else:
+                row["Air Temperature - 5 min Intervals (°C)"] = "99.0"
+
+        return row
+
+    # write a CoSMo CSV dump file of row_count rows, every column of the export
+    def write_cosmo_csv(dump_file, row_count):
+        with open(dump_file, "w", newline="", encoding="utf-8") as csvfile:
+            writer = csv.DictWriter(csvfile, fieldnames=COSMO_SCHEMA)
+            writer.writeheader()
+
+            for i in range(row_count):
+                writer.writerow(SyntheticDumps.cosmo_dump_row(i, i % REJECT_EVERY == REJECT_EVERY - 1))
+
+    # write a CNV rainfall CSV dump file of row_count rows, below the two metadata lines of the export
+    def write_cnv_csv(dump_file, row_count):
+        with open(dump_file, "w", newline="", encoding="utf-8") as csvfile:
+            csvfile.write("North Vancouver District - Rainfall\r\n")
+            csvfile.write("Station: Synthetic Benchmark Gauge\r\n")
+
+            writer = csv.DictWriter(csvfile, fieldnames=CNV_SCHEMA)
+            writer.writeheader()
+
+            for i in range(row_count):
+                writer.writerow(SyntheticDumps.cnv_dump_row(i, i % REJECT_EVERY == REJECT_EVERY - 1))
+
+    # write a Flowworks JSON dump file of row_count datapoints, fifteen minutes apart. written as it goes, so sizes past
+    # what fits in memory are fine
+    def write_flowworks_json(dump_file, row_count):
+        start = datetime.datetime(2021, 1, 1)
+
+        with open(dump_file, "w", encoding="utf-8") as filehandle:
+            filehandle.write('{"resultCode":0,"msg":"Successfully retrieved data","datapoints":[')
+
+            for i in range(row_count):
+                timestamp = start + datetime.timedelta(minutes=15 * i)
+                filehandle.write('%s{"date":"%s","value":%.5f}' % (
+                    "," if i > 0 else "", timestamp.strftime("%Y-%m-%dT%H:%M:%S"), 10 + (i % 1000) / 300))
+
+            filehandle.write("]}")
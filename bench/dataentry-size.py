@@ -0,0 +1,146 @@
+from pathlib import Path
+import sys
+import argparse
+import csv
+import gc
+import io
+import timeit
+import tracemalloc
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+from src.data.DataEntry import DataEntry
+from src.cosmo.CosmoDataEntry import CosmoDataEntry
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from SyntheticDumps import SyntheticDumps, COSMO_SCHEMA, CNV_SCHEMA
+
+# memory held per data entry and entries built per second, for the compact list-backed entries against the dict-backed
+# entries they replaced. no database needed.
+#
+# rows are read with csv.DictReader from synthetic dumps, as the import scripts read them. a dict-backed entry keeps the
+# reader's dict for its row, a compact entry copies the values it needs into a list and the dict is freed. compact
+# entries are also built straight from csv.reader rows, which skips the dict altogether.
+#
+# memory is what the entries still hold once they're all built, measured with tracemalloc, so it counts the entries,
+# their containers and their values. construction is timed separately, without tracemalloc.
+
+
+# CosmoDataEntry as it was before entries were compact: the row's dict and an instance dict
+class DictCosmoDataEntry(DataEntry):
+
+    _validate_data = CosmoDataEntry._validate_data
+    get_db_destination = CosmoDataEntry.get_db_destination
+
+    def __init__(self, entry_obj):
+        super().__init__(entry_obj)
+
+        for field in ['ActivityEndDate', 'ActivityEndTime', 'AnalysisStartDate', 'AnalysisStartTime']:
+            if self.get(field) == '' or self.get(field) is None:
+                self.set(field, None)
+
+        self.monitoringLocationID = self.get("MonitoringLocationID")
+
+
+# CNVRainfallDataEntry as it was before entries were compact
+class DictCNVRainfallDataEntry(DataEntry):
+
+    _validate_data = CNVRainfallDataEntry._validate_data
+    get_db_destination = CNVRainfallDataEntry.get_db_destination
+
+    def __init__(self, entry_obj):
+        super().__init__(entry_obj)
+
+        self.site = CNVRainfallDataEntry.SITE
+
+        if self.get('Hourly Rainfall (mm)') == '':
+            self.set('Hourly Rainfall (mm)', None)
+
+
+# source: schema, row builder, entry classes
+SOURCES = {
+    "cosmo": (COSMO_SCHEMA, SyntheticDumps.cosmo_dump_row, DictCosmoDataEntry, CosmoDataEntry),
+    "cnv": (CNV_SCHEMA, SyntheticDumps.cnv_dump_row, DictCNVRainfallDataEntry, CNVRainfallDataEntry)
+}
+
+
+# the rows as CSV text, without rejects
+def csv_text(schema, build_row, row_count):
+    text = io.StringIO()
+
+    writer = csv.DictWriter(text, fieldnames=schema)
+    writer.writeheader()
+
+    for i in range(row_count):
+        writer.writerow(build_row(i))
+
+    return text.getvalue()
+
+
+def dict_rows(text):
+    return csv.DictReader(io.StringIO(text), delimiter=',', strict=True)
+
+
+def list_rows(text):
+    reader = csv.reader(io.StringIO(text), delimiter=',', strict=True)
+    next(reader)
+
+    return reader
+
+
+def build(entry_class, rows):
+    return [entry_class(row) for row in rows]
+
+
+# bytes held per entry once every row has been built into one
+def entry_size(entry_class, rows, row_count):
+    gc.collect()
+    tracemalloc.start()
+
+    entries = build(entry_class, rows)
+    gc.collect()
+
+    held = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    del entries
+
+    return held / row_count
+
+
+def main(parsed_args):
+    row_count = getattr(parsed_args, "rows")
+
+    print("%-8s %-26s %-6s %10s %12s %14s %12s" %
+          ("source", "entry", "rows", "entries", "build (s)", "entries/sec", "bytes/entry"))
+
+    for source in getattr(parsed_args, "sources"):
+        schema, build_row, dict_class, compact_class = SOURCES[source]
+        text = csv_text(schema, build_row, row_count)
+
+        runs = [
+            (dict_class, "dict", dict_rows),
+            (compact_class, "dict", dict_rows),
+            (compact_class, "list", list_rows)
+        ]
+
+        for entry_class, row_kind, rows in runs:
+            start_time = timeit.default_timer()
+            entries = build(entry_class, rows(text))
+            elapsed = timeit.default_timer() - start_time
+            del entries
+
+            size = entry_size(entry_class, rows(text), row_count)
+
+            print("%-8s %-26s %-6s %10d %12.3f %14.1f %12.1f" %
+                  (source, entry_class.__name__, row_kind, row_count, elapsed, row_count / elapsed, size))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description='Measure memory per data entry and construction time, compact entries against dict-backed ones.')
+    parser.add_argument('-n', dest='rows', type=int, default=100000, help='Number of entries to build per run.')
+    parser.add_argument('--sources', nargs='+', choices=list(SOURCES), default=list(SOURCES),
+                        help='Sources to measure. Default: all')
+
+    main(parser.parse_args())
@@ -0,0 +1,132 @@
+from pathlib import Path
+import sys
+import argparse
+import timeit
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+from src.importer.DBImporter import DBImporter, EXECUTE_MODES, EXECUTE_MODE_STATEMENT, DUPLICATE_POLICY_ERROR
+from src.cosmo.CosmoDataEntry import CosmoDataEntry
+from SyntheticDumps import SyntheticDumps, COSMO_SCHEMA
+
+# rows per second through DBImporter.add for each execute mode, on synthetic CoSMo rows. no database needed.
+#
+# entries are built up front from a smaller set of distinct rows and added round robin, so the timing covers add
+# alone. pending rows are released every FLUSH_ROWS rows, as a streaming import would.
+#
+# each mode is measured twice: with the compiled per-table insert plans add uses, and with the per-row string building
+# add did before them, as the baseline.
+
+DISTINCT_ROWS = 10000
+FLUSH_ROWS = 50000
+
+SENSORS = ["WAGG01", "WAGG02", "MOSQ01", "MACK02", "HAST01"]
+
+
+# DBImporter.add as it was before insert plans: columns are resolved for every row, logging each remapped field, and
+# statement mode builds each literal insert by concatenation
+class BaselineDBImporter(DBImporter):
+
+    def __init__(self, db_config_file):
+        super().__init__(db_config_file)
+
+        # parameterized statement per destination table, built on its first row
+        self.batch_prefixes = {}
+
+    def _add(self, entry):
+
+        table = entry.get_db_destination()
+
+        if self.execute_mode != EXECUTE_MODE_STATEMENT:
+
+            if table not in self.batch_rows:
+                columns = self._resolve_columns()
+                self.batch_prefixes[table] = (self._baseline_prefix(table, columns) +
+                                              "(" + ",".join(["%s"] * len(columns)) + ")")
+                self.batch_rows[table] = []
+
+            values = self._baseline_values(entry)
+            self.batch_rows[table].append(tuple(values))
+
+            self.pending_bytes += sum(len(str(value)) for value in values if value is not None) + 8 * len(values)
+        else:
+            insert = (self._baseline_prefix(table, self._resolve_columns()) +
+                      self._baseline_literal(self._baseline_values(entry)) + ";")
+            self.inserts.append(insert)
+
+            self.pending_bytes += len(insert)
+
+        self.added_count += 1
+
+    # INSERT INTO table_name (column1, column2, column3, ...) VALUES
+    def _baseline_prefix(self, table, columns):
+        if self.duplicate_policy != DUPLICATE_POLICY_ERROR:
+            return "INSERT IGNORE INTO " + table + " (" + ",".join(columns) + ") VALUES "
+
+        return "INSERT INTO " + table + " (" + ",".join(columns) + ") VALUES "
+
+    def _baseline_values(self, entry):
+        values = []
+
+        for field in self.schema:
+            if entry.is_defined(field):
+                values.append(entry.get(field))
+            else:
+                values.append(None)
+
+        return values
+
+    # (value1, value2, value3, ...)
+    def _baseline_literal(self, values):
+        values_segment = "("
+
+        for value in values:
+            if value is None:
+                values_segment += "NULL,"
+            else:
+                values_segment += "'%s'," % value
+
+        if values_segment[-1] == ",":
+            values_segment = values_segment.rstrip(", ")
+
+        return values_segment + ")"
+
+
+def run_mode(importer_class, mode, entries, row_count):
+    db_importer = importer_class(None)
+    db_importer.set_importer_name("bench-add-%s" % mode)
+    db_importer.set_execute_mode(mode)
+    db_importer.set_schema(COSMO_SCHEMA)
+
+    start_time = timeit.default_timer()
+
+    for i in range(row_count):
+        db_importer.add(entries[i % len(entries)])
+
+        if i % FLUSH_ROWS == 0:
+            db_importer._clear_pending()
+
+    return timeit.default_timer() - start_time
+
+
+def main(parsed_args):
+    row_count = getattr(parsed_args, "rows")
+
+    print("Building %d entries..." % DISTINCT_ROWS)
+    entries = [CosmoDataEntry(SyntheticDumps.cosmo_row(i, SENSORS[i % len(SENSORS)])) for i in range(DISTINCT_ROWS)]
+
+    print("%-12s %10s %14s %14s %9s" % ("mode", "rows", "baseline/sec", "plans/sec", "speedup"))
+    for mode in EXECUTE_MODES:
+        baseline_elapsed = run_mode(BaselineDBImporter, mode, entries, row_count)
+        elapsed = run_mode(DBImporter, mode, entries, row_count)
+
+        print("%-12s %10d %14.1f %14.1f %8.2fx" % (mode, row_count, row_count / baseline_elapsed,
+                                                   row_count / elapsed, baseline_elapsed / elapsed))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure DBImporter.add throughput on synthetic CoSMo rows.')
+    parser.add_argument('-n', dest='rows', type=int, default=1000000, help='Number of rows to add per mode.')
+
+    main(parser.parse_args())
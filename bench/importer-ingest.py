@@ -0,0 +1,393 @@
+from pathlib import Path
+import sys
+import argparse
+import csv
+import importlib.util
+import json
+import os
+import platform
+import re
+import shutil
+import subprocess
+import timeit
+from datetime import datetime
+
+import ijson
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+from src.data.TableTemplate import TableTemplate
+from src.importer.DBConnectionPool import DBConnectionPool
+from SyntheticDumps import SyntheticDumps, COSMO_SITES
+
+# end to end ingest throughput of each importer on synthetic dump files, from 10k rows up to tens of millions.
+#
+# for each importer and dump size, a synthetic dump file is generated once and kept in the work directory. each run then
+# times three stages:
+#   parse: reading the dump file into rows, as the import script does
+#   validate: reading the rows again and building data entries from the ones the importer wants
+#   write: the import script run end to end against a target, less the parse and validate time
+# the import script runs as a child process so its peak RSS can be measured on its own. parse and validate run in this
+# process, so the write time is an estimate that also carries the script's start up.
+#
+# targets:
+#   sqlite: --sink sqlite, a local SQLite database file
+#   mysql-script: a dry run to a SQL script with --dump-file, building every insert the database would be sent. the
+#       stand-in for mysql when there's no server to hand
+#   mysql: a live database, given with -cfg. point it at a throwaway database: the destination tables are dropped and
+#       recreated before each run, and dropped when the benchmark is done
+#
+# results are written to a JSON file, and --compare prints the speedup of each run over an earlier results file.
+
+TARGET_SQLITE = "sqlite"
+TARGET_MYSQL_SCRIPT = "mysql-script"
+TARGET_MYSQL = "mysql"
+
+TARGETS = [
+    TARGET_SQLITE,
+    TARGET_MYSQL_SCRIPT,
+    TARGET_MYSQL
+]
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+
+# rows between flushes of each import
+FLUSH_ROWS = 50000
+
+# importer name: import script, dump file writer, dump file extension, destination tables
+IMPORTERS = {
+    "cosmo": (path_root / "src/cosmo/cosmo-import.py", SyntheticDumps.write_cosmo_csv, "csv", COSMO_SITES),
+    "cnv-rainfall": (path_root / "src/cnv/cnv-rainfall-import.py", SyntheticDumps.write_cnv_csv, "csv", ["CNV"]),
+    "flowworks": (path_root / "src/flowworks/flowworks-import.py", SyntheticDumps.write_flowworks_json, "json",
+                  ["DNV"])
+}
+
+# setup/sql template of each importer's tables
+TABLE_TEMPLATES = {
+    "cosmo": path_root / "setup/sql/CoSMo/nssk-cosmo-sensor-table.sql.template",
+    "cnv-rainfall": path_root / "setup/sql/cnv_rainfall/nssk-cnv-rainfall.sql.template",
+    "flowworks": path_root / "setup/sql/flowworks/nssk-flowworks.sql.template"
+}
+
+# data entry class in each import script
+ENTRY_CLASSES = {
+    "cosmo": "CosmoDataEntry",
+    "cnv-rainfall": "CNVRainfallDataEntry",
+    "flowworks": "FlowworksDataEntry"
+}
+
+# outcome line printed by the import scripts
+WRITTEN_PATTERN = re.compile(r"(?:Completed|Wrote) (\d+) inserts")
+
+
+# generate a dump file, unless it's already in the work directory
+def dump_file(work_dir, importer, row_count):
+    writer, extension = IMPORTERS[importer][1:3]
+    dump_path = work_dir / ("%s_%d.%s" % (importer, row_count, extension))
+
+    if not dump_path.exists():
+        print("Generating %s..." % dump_path)
+
+        start_time = timeit.default_timer()
+        writer(str(dump_path) + ".part", row_count)
+        os.replace(str(dump_path) + ".part", dump_path)
+
+        print("Generated %d rows in %.3f sec" % (row_count, timeit.default_timer() - start_time))
+
+    return dump_path
+
+
+# the import script, loaded as a module for its row filter and data entry class. run in the work directory, where the
+# script's log file goes
+def load_script(importer, work_dir):
+    script = IMPORTERS[importer][0]
+
+    sys.path.insert(0, str(script.parent))
+    spec = importlib.util.spec_from_file_location(importer.replace("-", "_"), script)
+    module = importlib.util.module_from_spec(spec)
+
+    cwd = os.getcwd()
+    os.chdir(work_dir)
+    try:
+        spec.loader.exec_module(module)
+    finally:
+        os.chdir(cwd)
+
+    return module
+
+
+# dump rows as the import script reads them
+def read_rows(importer, filehandle):
+    if importer == "flowworks":
+        return ijson.items(filehandle, "datapoints.item")
+
+    if importer == "cnv-rainfall":
+        # two metadata lines above the schema
+        next(filehandle)
+        next(filehandle)
+
+    return csv.DictReader(filehandle, delimiter=',', strict=True)
+
+
+# seconds to read every row of the dump, and the number of rows
+def time_parse(importer, dump_path):
+    row_count = 0
+
+    start_time = timeit.default_timer()
+    with open(dump_path, newline='', encoding='utf-8') as filehandle:
+        for row in read_rows(importer, filehandle):
+            row_count += 1
+
+    return timeit.default_timer() - start_time, row_count
+
+
+# seconds to read every row of the dump and build data entries from the wanted ones, and the number of invalid rows
+def time_validate(importer, script, dump_path):
+    want = getattr(script, "want_row", None) or getattr(script, "want_entry")
+    entry_class = getattr(script, ENTRY_CLASSES[importer])
+
+    invalid_count = 0
+
+    start_time = timeit.default_timer()
+    with open(dump_path, newline='', encoding='utf-8') as filehandle:
+        for row in read_rows(importer, filehandle):
+            if not want(row):
+                continue
+
+            try:
+                entry_class(row)
+            except Exception:
+                invalid_count += 1
+
+    return timeit.default_timer() - start_time, invalid_count
+
+
+def recreate_tables(config_file, importer):
+    template = TableTemplate(TABLE_TEMPLATES[importer])
+
+    with DBConnectionPool.get(config_file).connection() as connection:
+        with connection.cursor() as cursor:
+            for table in IMPORTERS[importer][3]:
+                cursor.execute("DROP TABLE IF EXISTS %s;" % table)
+                for statement in template.mysql(table).split(";"):
+                    if statement.strip() != "":
+                        cursor.execute(statement)
+        connection.commit()
+
+
+def drop_tables(config_file, importers):
+    with DBConnectionPool.get(config_file).connection() as connection:
+        with connection.cursor() as cursor:
+            for importer in importers:
+                for table in IMPORTERS[importer][3]:
+                    cursor.execute("DROP TABLE IF EXISTS %s;" % table)
+        connection.commit()
+
+
+# run the import script end to end. returns wall seconds, peak RSS in MB, rows written and the script's output
+def run_import(importer, dump_path, target, run_dir, config_file, import_args):
+    command = [sys.executable, str(IMPORTERS[importer][0])]
+
+    if target == TARGET_SQLITE:
+        command += ["--sink", "sqlite", "--sink-path", str(run_dir / ("%s.sqlite" % importer))]
+    elif target == TARGET_MYSQL_SCRIPT:
+        command += ["--dry-run", "--dump-file", str(run_dir / ("%s.sql" % importer))]
+    else:
+        command += ["-cfg", str(Path(config_file).resolve()), "--insert-mode", "batch"]
+
+    command += ["--flush-rows", str(FLUSH_ROWS)] + import_args + [str(dump_path)]
+
+    # the scripts import from the repository root and their own directory
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join(
+        [str(path_root)] + ([environment["PYTHONPATH"]] if "PYTHONPATH" in environment else []))
+
+    with open(run_dir / ("%s_%s.out" % (importer, target)), "w+", encoding="utf-8") as output:
+        start_time = timeit.default_timer()
+        process = subprocess.Popen(command, cwd=run_dir, env=environment, stdout=output, stderr=subprocess.STDOUT)
+
+        # rusage of the script alone
+        pid, status, rusage = os.wait4(process.pid, 0)
+        elapsed = timeit.default_timer() - start_time
+        process.returncode = os.waitstatus_to_exitcode(status)
+
+        output.seek(0)
+        text = output.read()
+
+    if process.returncode != 0:
+        raise Exception("%s import to %s failed:\n%s" % (importer, target, text[-2000:]))
+
+    # ru_maxrss is in KB on linux, bytes on macOS
+    peak_rss = rusage.ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+    match = WRITTEN_PATTERN.search(text)
+    written_count = int(match.group(1)) if match is not None else None
+
+    return elapsed, peak_rss, written_count, text
+
+
+def run(importer, script, dump_path, target, run_dir, config_file, import_args):
+    if target == TARGET_MYSQL:
+        recreate_tables(config_file, importer)
+
+    parse_elapsed, row_count = time_parse(importer, dump_path)
+    validate_elapsed, invalid_count = time_validate(importer, script, dump_path)
+    total_elapsed, peak_rss, written_count, text = run_import(importer, dump_path, target, run_dir, config_file,
+                                                              import_args)
+
+    # validating reads the dump again, so it includes parsing
+    write_elapsed = max(total_elapsed - validate_elapsed, 0.001)
+    validate_elapsed = max(validate_elapsed - parse_elapsed, 0.001)
+
+    return {
+        "importer": importer,
+        "target": target,
+        "rows": row_count,
+        "dump_bytes": dump_path.stat().st_size,
+        "invalid_rows": invalid_count,
+        "rows_written": written_count,
+        "parse_sec": round(parse_elapsed, 3),
+        "parse_rows_per_sec": round(row_count / parse_elapsed, 1),
+        "validate_sec": round(validate_elapsed, 3),
+        "validate_rows_per_sec": round(row_count / validate_elapsed, 1),
+        "write_sec": round(write_elapsed, 3),
+        "write_rows_per_sec": round((written_count or 0) / write_elapsed, 1),
+        "total_sec": round(total_elapsed, 3),
+        "peak_rss_mb": round(peak_rss, 1)
+    }
+
+
+# the commit benchmarked, if this is a git checkout
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=path_root, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results):
+    print("%-13s %-13s %10s %12s %12s %12s %10s %10s" %
+          ("importer", "target", "rows", "parse/s", "validate/s", "write/s", "total (s)", "rss (MB)"))
+
+    for result in results:
+        print("%-13s %-13s %10d %12.1f %12.1f %12.1f %10.3f %10.1f" %
+              (result["importer"], result["target"], result["rows"], result["parse_rows_per_sec"],
+               result["validate_rows_per_sec"], result["write_rows_per_sec"], result["total_sec"],
+               result["peak_rss_mb"]))
+
+
+# speedup of each run over the same run in an earlier results file
+def print_comparison(results, compare_file):
+    with open(compare_file, encoding='utf-8') as filehandle:
+        baseline = json.load(filehandle)
+
+    baseline_results = {(result["importer"], result["target"], result["rows"]): result
+                        for result in baseline["results"]}
+
+    print("\n==========\nCompared to %s (commit %s)" % (compare_file, baseline.get("commit")))
+    print("%-13s %-13s %10s %10s %10s %10s %10s" %
+          ("importer", "target", "rows", "parse", "validate", "write", "rss"))
+
+    for result in results:
+        earlier = baseline_results.get((result["importer"], result["target"], result["rows"]))
+        if earlier is None:
+            continue
+
+        print("%-13s %-13s %10d %9.2fx %9.2fx %9.2fx %9.2fx" %
+              (result["importer"], result["target"], result["rows"],
+               result["parse_rows_per_sec"] / earlier["parse_rows_per_sec"],
+               result["validate_rows_per_sec"] / earlier["validate_rows_per_sec"],
+               result["write_rows_per_sec"] / max(earlier["write_rows_per_sec"], 0.1),
+               result["peak_rss_mb"] / earlier["peak_rss_mb"]))
+
+
+def main(parsed_args):
+    config_file = getattr(parsed_args, "db_cfg_file")
+    config_file = config_file[0] if config_file is not None else None
+
+    importers = getattr(parsed_args, "importers")
+    sizes = getattr(parsed_args, "sizes")
+    work_dir = Path(getattr(parsed_args, "work_dir")).resolve()
+
+    targets = getattr(parsed_args, "targets")
+    if targets is None:
+        targets = [TARGET_SQLITE, TARGET_MYSQL_SCRIPT] + ([TARGET_MYSQL] if config_file is not None else [])
+
+    if TARGET_MYSQL in targets and config_file is None:
+        print("Error- Need a DB config file for --targets mysql")
+        exit(1)
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    dump_files = {(importer, size): dump_file(work_dir, importer, size) for importer in importers for size in sizes}
+
+    if getattr(parsed_args, "generate_only"):
+        return
+
+    results = []
+    for importer in importers:
+        script = load_script(importer, work_dir)
+
+        for size in sizes:
+            for target in targets:
+                print("\n==========\nBenchmarking %s with %d rows to %s" % (importer, size, target))
+
+                run_dir = work_dir / ("run_%s_%d_%s" % (importer, size, target))
+                shutil.rmtree(run_dir, ignore_errors=True)
+                run_dir.mkdir()
+
+                results.append(run(importer, script, dump_files[(importer, size)], target, run_dir, config_file,
+                                   getattr(parsed_args, "import_args")))
+
+                if not getattr(parsed_args, "keep"):
+                    shutil.rmtree(run_dir, ignore_errors=True)
+
+    if TARGET_MYSQL in targets:
+        drop_tables(config_file, importers)
+
+    print("\n==========")
+    print_results(results)
+
+    output_file = getattr(parsed_args, "output")
+    with open(output_file, "w", encoding='utf-8') as filehandle:
+        json.dump({
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "flush_rows": FLUSH_ROWS,
+            "results": results
+        }, filehandle, indent=2)
+
+    print("\nWrote results to %s" % output_file)
+
+    if getattr(parsed_args, "compare") is not None:
+        print_comparison(results, getattr(parsed_args, "compare"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Measure end to end importer throughput on synthetic dump files.')
+    parser.add_argument('-cfg', nargs=1, dest='db_cfg_file',
+                        help='Database config file in json format, for the mysql target. Ex: bench.json')
+    parser.add_argument('-n', nargs='+', dest='sizes', type=int, default=DEFAULT_SIZES,
+                        help='Dump sizes in rows. Default: %s' % " ".join(str(size) for size in DEFAULT_SIZES))
+    parser.add_argument('--importers', nargs='+', dest='importers', choices=list(IMPORTERS), default=list(IMPORTERS),
+                        help='Importers to benchmark. Default: all')
+    parser.add_argument('--targets', nargs='+', dest='targets', choices=TARGETS,
+                        help='Where to import to. Default: sqlite and mysql-script, and mysql with -cfg')
+    parser.add_argument('--work-dir', dest='work_dir', default='./ingest',
+                        help='Directory for the generated dump files and import output. Default: ./ingest')
+    parser.add_argument('--generate-only', action='store_true', dest='generate_only',
+                        help='Generate the dump files and exit.')
+    parser.add_argument('--keep', action='store_true', dest='keep',
+                        help='Keep the imported files and script output of each run.')
+    parser.add_argument('--import-args', nargs=argparse.REMAINDER, dest='import_args', default=[],
+                        help='Further options passed to every import script, e.g. --import-args --typed')
+    parser.add_argument('-o', dest='output', default='ingest-results.json',
+                        help='Results file. Default: ingest-results.json')
+    parser.add_argument('--compare', dest='compare',
+                        help='Earlier results file to print speedups against.')
+
+    main(parser.parse_args())
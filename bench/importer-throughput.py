@@ -0,0 +1,100 @@
+from pathlib import Path
+import sys
+import argparse
+import timeit
+from string import Template
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+from src.importer.DBImporter import DBImporter, EXECUTE_MODES
+from src.importer.DBBulkLoader import DBBulkLoader
+from src.importer.DBConnectionPool import DBConnectionPool
+from src.cosmo.CosmoDataEntry import CosmoDataEntry
+from SyntheticDumps import SyntheticDumps, BENCH_TABLE, COSMO_SCHEMA
+
+# compare insert throughput of the DBImporter execute modes and the DBBulkLoader against a live database
+#
+# rows go to a scratch table built from the CoSMo sensor table template. the table is
+# dropped and recreated before each mode runs, and dropped when the benchmark is done.
+# the configured user needs CREATE and DROP on the configured database.
+
+BULK_LOAD = "bulk-load"
+
+# import methods in the order they are benchmarked. the first is the baseline for speedups
+METHODS = EXECUTE_MODES + [BULK_LOAD]
+
+COSMO_TABLE_TEMPLATE = str(path_root / "setup/sql/CoSMo/nssk-cosmo-sensor-table.sql.template")
+
+def recreate_table(config_file):
+    create_table_sql = Template(open(COSMO_TABLE_TEMPLATE).read()).substitute(MONITORING_LOCATION_ID=BENCH_TABLE)
+
+    with DBConnectionPool.get(config_file).connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS %s;" % BENCH_TABLE)
+            for statement in create_table_sql.split(";"):
+                if statement.strip() != "":
+                    cursor.execute(statement)
+        connection.commit()
+
+
+def run_method(config_file, method, row_count, commit_size):
+    recreate_table(config_file)
+
+    if method == BULK_LOAD:
+        db_importer = DBBulkLoader(config_file)
+    else:
+        db_importer = DBImporter(config_file)
+        db_importer.set_execute_mode(method)
+
+    db_importer.set_importer_name("bench-%s" % method)
+    db_importer.set_commit_size(commit_size)
+    db_importer.set_schema(COSMO_SCHEMA)
+
+    add_start_time = timeit.default_timer()
+    for i in range(row_count):
+        db_importer.add(CosmoDataEntry(SyntheticDumps.cosmo_row(i)))
+    add_elapsed = timeit.default_timer() - add_start_time
+
+    execute_start_time = timeit.default_timer()
+    db_importer.execute()
+    execute_elapsed = timeit.default_timer() - execute_start_time
+
+    return add_elapsed, execute_elapsed, db_importer.insert_count
+
+
+def main(parsed_args):
+    config_file = getattr(parsed_args, "db_cfg_file")[0]
+    row_count = getattr(parsed_args, "rows")
+    commit_size = getattr(parsed_args, "commit_size")
+
+    results = {}
+    for method in METHODS:
+        print("\n==========\nBenchmarking '%s' with %d rows" % (method, row_count))
+        results[method] = run_method(config_file, method, row_count, commit_size)
+
+    # clean up the scratch table
+    with DBConnectionPool.get(config_file).connection() as connection:
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE IF EXISTS %s;" % BENCH_TABLE)
+
+    print("\n==========")
+    print("%-12s %10s %12s %12s %14s" % ("method", "rows", "add (s)", "execute (s)", "rows/sec"))
+    for method, (add_elapsed, execute_elapsed, insert_count) in results.items():
+        print("%-12s %10d %12.3f %12.3f %14.1f" %
+              (method, insert_count, add_elapsed, execute_elapsed, insert_count / execute_elapsed))
+
+    baseline = results[METHODS[0]]
+    for method in METHODS[1:]:
+        print("%s execute speedup over %s: %.1fx" % (method, METHODS[0], baseline[1] / results[method][1]))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Compare importer throughput on a live database.')
+    parser.add_argument('-cfg', nargs=1, dest='db_cfg_file', required=True,
+                        help='Database config file in json format. Ex: bench.json')
+    parser.add_argument('-n', dest='rows', type=int, default=20000, help='Number of rows to insert per mode.')
+    parser.add_argument('--commit-size', dest='commit_size', type=int, default=1000,
+                        help='DBImporter commit size.')
+
+    main(parser.parse_args())
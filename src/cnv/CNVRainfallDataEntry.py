@@ -5,31 +5,56 @@ path_root = Path(__file__).parents[2]
 sys.path.append(str(path_root))
 
 # depends on adding src to sys.path
-from src.data.DataEntry import DataEntry
+from src.data.BatchValidator import BatchValidator
+from src.data.CompactDataEntry import CompactDataEntry
+from src.data.EntrySchema import EntrySchema
 from src.exception.DataValidationException import DataValidationException
 
 
-# yyyy/MM/dd HH:mm:ss
-# Air Temperature - 5 min Intervals (°C)
-# Barometer 5 min Intervals (mbar)
-# Hourly Rainfall (mm)
-# Rainfall (mm)
-
-
-class CNVRainfallDataEntry(DataEntry):
+class CNVRainfallDataEntry(CompactDataEntry):
+
+    __slots__ = ("site",)
+
+    # only one site: set in generate_db_setup.py
+    SITE = "CNV"
+
+    # columns of the CNV rainfall dump file, and those _validate_data parses as numbers
+    SCHEMA = EntrySchema([
+        "yyyy/MM/dd HH:mm:ss",
+        "Air Temperature - 5 min Intervals (°C)",
+        "Barometer 5 min Intervals (mbar)",
+        "Hourly Rainfall (mm)",
+        "Rainfall (mm)"
+    ], [
+        "Air Temperature - 5 min Intervals (°C)",
+        "Barometer 5 min Intervals (mbar)",
+        "Rainfall (mm)"
+    ])
+
+    # _validate_data's rules, for validating a chunk of rows at once
+    VALIDATOR = BatchValidator(SCHEMA, [
+        BatchValidator.required("Rainfall (mm)", "Missing Rainfall (mm) [%s]"),
+        BatchValidator.required("yyyy/MM/dd HH:mm:ss", "Missing yyyy/MM/dd HH:mm:ss [%s]"),
+        BatchValidator.number("Air Temperature - 5 min Intervals (°C)",
+                              "found invalid Air Temperature - 5 min Intervals (°C) [%s]"),
+        BatchValidator.within("Air Temperature - 5 min Intervals (°C)", -80, 80,
+                              "found out-of-range Air Temperature - 5 min Intervals (°C) [%s]"),
+        BatchValidator.number("Barometer 5 min Intervals (mbar)",
+                              "found invalid Barometer 5 min Intervals (mbar) [%s]"),
+        BatchValidator.number("Rainfall (mm)", "found invalid Rainfall (mm) [%s]")
+    ])
 
     # row_obj is any structure that can be indexed and is iterable
     # csv, json, raw array
-    def __init__(self, entry_obj):
+    def __init__(self, entry_obj, prepared=False):
 
         # raise exception if theres a problem
-        super().__init__(entry_obj)
+        super().__init__(entry_obj, prepared)
 
         # at this point we have a valid entry, but still want to clean it up
         # TODO: remove alphanumeric+ chars used in sql syntax [ ] { } | " ' ;
 
-        # only one site: set in generate_db_setup.py
-        self.site = "CNV"
+        self.site = CNVRainfallDataEntry.SITE
 
         ##################
         # value buckets - these can be empty in the dump
@@ -4,8 +4,12 @@ import logging
 import timeit
 
 from datetime import datetime
+from pathlib import Path
 from CNVRainfallDataEntry import CNVRainfallDataEntry
-from src.importer.DBImporter import DBImporter
+from src.data.CompactDataEntry import CompactDataEntry, ENTRY_CHUNK_ROWS
+from src.importer.ImporterOptions import ImporterOptions
+from src.importer.FailureSink import FailureSink
+from src.importer.ImportMetrics import STAGE_FILTER, STAGE_CONSTRUCT
 
 ################
 # logging
@@ -59,12 +63,64 @@ schema_field_mapping = {
     "Rainfall (mm)": "Rainfall"
 }
 
+# dump fields making up the table's primary key
+cnv_rainfall_key_fields = [
+    "yyyy/MM/dd HH:mm:ss"
+]
+
+# dump fields making up the measurement timestamp
+cnv_rainfall_timestamp_fields = [
+    "yyyy/MM/dd HH:mm:ss"
+]
+
+# setup/sql template the table is created from. typed imports convert values to its column types
+cnv_rainfall_table_template = Path(__file__).parents[2] / "setup/sql/cnv_rainfall/nssk-cnv-rainfall.sql.template"
+
 
 def want_row(in_row):
     # only one site for now: accept it all
     return True
 
 
+# build entries for a chunk of wanted rows, each (position in the dump, row), and add them to the importer. returns the
+# rows added and the rows rejected
+def add_entries(db_importer, chunk, invalid_rows):
+    added_count = 0
+    invalid_count = 0
+
+    construct_start_time = timeit.default_timer()
+    entries = CompactDataEntry.build_entries(CNVRainfallDataEntry, [row for position, row in chunk])
+    db_importer.metrics.observe(STAGE_CONSTRUCT, timeit.default_timer() - construct_start_time, rows=len(chunk))
+
+    for (position, row), data_entry in zip(chunk, entries):
+        db_importer.set_position(position)
+
+        try:
+
+            # test random validation failures (1/1000 => ~.1% failure rate)
+            # if random.randint(0, 1000) == 20:
+            #     raise DataValidationException("Random validation failure")
+
+            # the row failed validation
+            if isinstance(data_entry, Exception):
+                raise data_entry
+
+            db_importer.add(data_entry)
+            added_count += 1
+        except Exception as e:
+
+            # push object into collection
+            # log collection at end to file
+
+            logger.error("Error constructing CNVRainfallDataEntry")
+            logger.error(e)
+
+            invalid_rows.write(row, FailureSink.reason(e))
+            invalid_count += 1
+
+    return added_count, invalid_count
+
+
 ###############################
 
 # open csv file
@@ -111,7 +167,7 @@ def main(parsed_args):
         dry_run = True
     else:
         # data import - make sure we have a config file to connect to the database
-        if db_config_filename is None:
+        if db_config_filename is None and ImporterOptions.needs_database(parsed_args):
             print("Error- Need a DB config file for the import")
             exit(1)
 
@@ -131,13 +187,27 @@ def main(parsed_args):
     # no quote char
     rows_processed = 0
 
-    invalid_rows = []
     invalid_row_count = 0
 
-    db_importer = DBImporter(db_config_filename)
+    db_importer = ImporterOptions.build_importer(parsed_args, db_config_filename)
     db_importer.set_importer_name("cnv-rainfall")
     db_importer.set_schema(cnv_rainfall_dump_schema)
     db_importer.set_schema_mapping(schema_field_mapping)
+    db_importer.set_key_fields(cnv_rainfall_key_fields)
+    db_importer.set_timestamp_fields(cnv_rainfall_timestamp_fields)
+    db_importer.set_table_template(cnv_rainfall_table_template)
+    ImporterOptions.apply(parsed_args, db_importer)
+
+    # invalid rows are written out as they're found
+    invalid_rows_file = "./cnv-rainfall_invalid_rows_%s.log" % datetime.now().strftime("%Y%m%d-%H%M%S")
+    invalid_rows = db_importer.build_failure_sink(invalid_rows_file)
+
+    db_importer.read_watermarks([CNVRainfallDataEntry.SITE])
+    resume_position = ImporterOptions.start_checkpoint(parsed_args, db_importer, data_dump_filename)
+    rows_read = 0
+
+    # wanted rows waiting for their entries to be built
+    chunk = []
 
     csvread_start_time = timeit.default_timer()
     with open(data_dump_filename, newline='', encoding='utf-8') as csvfile:
@@ -150,6 +220,13 @@ def main(parsed_args):
 
         field_names = reader.fieldnames
 
+        # rows read and written, shown together
+        progress = db_importer.progress
+        progress.track_file(csvfile)
+
+        # stage timings, if they're kept
+        metrics = db_importer.metrics
+
         logger.info("CSV file schema:")
         # schema
         for field in field_names:
@@ -160,58 +237,82 @@ def main(parsed_args):
         print("Extracting data from CSV file...")
 
         # row is a CSV object
-        for row in reader:
+        for row in metrics.timed(reader):
+
+            rows_read += 1
+
+            # resuming: rows up to the checkpoint are already in the database
+            if rows_read <= resume_position:
+                continue
 
             # narrow our incoming data here
             # want only some rows
-            if want_row(row):
-                try:
-
-                    # test random validation failures (1/1000 => ~.1% failure rate)
-                    # if random.randint(0, 1000) == 20:
-                    #     raise DataValidationException("Random validation failure")
+            # timed per row only with metrics on, the timer calls cost as much as the filter
+            if metrics.enabled:
+                filter_start_time = timeit.default_timer()
+                wanted = want_row(row)
+                metrics.observe(STAGE_FILTER, timeit.default_timer() - filter_start_time)
+            else:
+                wanted = want_row(row)
 
-                    db_importer.add(CNVRainfallDataEntry(row))
-                    rows_processed += 1
-                except Exception as e:
+            if wanted:
 
-                    # push object into collection
-                    # log collection at end to file
+                # incremental imports drop rows older than what the table already has, before parsing them
+                if not db_importer.is_new(CNVRainfallDataEntry.SITE, row):
+                    continue
 
-                    logger.error("Error constructing CNVRainfallDataEntry")
-                    logger.error(e)
+                # entries are built a chunk of rows at a time
+                chunk.append((rows_read, row))
 
-                    invalid_rows.append(row)
-                    invalid_row_count += 1
+                if len(chunk) >= ENTRY_CHUNK_ROWS:
+                    added_count, invalid_count = add_entries(db_importer, chunk, invalid_rows)
+                    rows_processed += added_count
+                    invalid_row_count += invalid_count
+                    chunk = []
 
-                print("\r\tRows processed: %d. Validation failures: %d" %
-                      (rows_processed, invalid_row_count), end='', flush=True)
+                    progress.parsed(rows_processed, invalid_row_count)
             else:
                 # use sparingly
                 if logger.isEnabledFor(logging.DEBUG):
                     logger.debug("Rejecting row:\n%s\n---------", row)
 
+        if len(chunk) > 0:
+            added_count, invalid_count = add_entries(db_importer, chunk, invalid_rows)
+            rows_processed += added_count
+            invalid_row_count += invalid_count
+
+            progress.parsed(rows_processed, invalid_row_count)
+
     csvread_elapsed = (timeit.default_timer() - csvread_start_time)
 
-    log_msg = ("\nProcessed %d rows from dump file %s in %.3f sec. Found %d validation failures" %
+    progress.finish()
+
+    metrics.count("rows_read", rows_read)
+    metrics.count("rows_valid", rows_processed)
+    metrics.count("rows_invalid", invalid_row_count)
+
+    log_msg = ("Processed %d rows from dump file %s in %.3f sec. Found %d validation failures" %
                (rows_processed, data_dump_filename, csvread_elapsed, invalid_row_count))
     print(log_msg, flush=True)
     logger.info(log_msg)
 
     ################
     # log read/parse failures here. not needed for database write
-    if invalid_row_count > 0:
-        date_time = datetime.now()
-        invalid_row_file = "./cnv-rainfall_invalid_rows_%s.log" % (date_time.strftime("%Y%m%d-%H%M%S"))
+    invalid_rows.close()
 
-        log_msg = "Found %d invalid rows. Logging to file '%s'" % (invalid_row_count, invalid_row_file)
+    if invalid_row_count > 0:
+        if invalid_rows.written_count < invalid_row_count:
+            log_msg = ("Found %d invalid rows. Logging %d of them to file '%s'" %
+                       (invalid_row_count, invalid_rows.written_count, invalid_rows.failure_file))
+        else:
+            log_msg = "Found %d invalid rows. Logging to file '%s'" % (invalid_row_count, invalid_rows.failure_file)
 
         print(log_msg)
         logger.info(log_msg)
 
-        with open(invalid_row_file, 'w', encoding='utf-8') as filehandle:
-            for invalid_row in invalid_rows:
-                filehandle.write("%s\n" % invalid_row)
+        for line in invalid_rows.report():
+            print("\t%s" % line)
+            logger.info(line)
     else:
         log_msg = "Found no rejected rows."
 
@@ -256,6 +357,8 @@ if __name__ == "__main__":
                         help='Database config file in json format. Ex: cnv-rainfall.json')
     parser.add_argument(nargs=1, dest='data_dump_file',
                         help='CNV Rainfall data dump file. Ex: NorthVancouverCityHall_export_20240328073312.csv')
+    ImporterOptions.add_arguments(parser)
+    ImporterOptions.add_dump_arguments(parser)
 
-    # call main with parsed args
-    main(parser.parse_args())
+    # call main with parsed args, profiled with --profile
+    ImporterOptions.run(main, parser.parse_args(), logFile)
@@ -5,26 +5,35 @@ path_root = Path(__file__).parents[2]
 sys.path.append(str(path_root))
 
 # depends on adding src to sys.path
-from src.data.DataEntry import DataEntry
+from src.data.CompactDataEntry import CompactDataEntry
+from src.data.EntrySchema import EntrySchema
 from src.exception.DataValidationException import DataValidationException
 
 
-# CosmoTimeStamp
-# Conductance
-# RainfallAmount
-
-
 # database is determined externally
 # site is determined externally
 
-class ConductivityRainfallDataEntry(DataEntry):
+class ConductivityRainfallDataEntry(CompactDataEntry):
+
+    __slots__ = ("monitoringLocationID",)
+
+    # columns of a correlation query row, and those _validate_data parses as numbers
+    SCHEMA = EntrySchema([
+        "COSMO_TIMESTAMP",
+        "CONDUCTANCE_RESULT",
+        "CNV_RAINFALL",
+        "CNV_TIMESTAMP"
+    ], [
+        "CONDUCTANCE_RESULT",
+        "CNV_RAINFALL"
+    ])
 
     # row_obj is any structure that can be indexed and is iterable
     # csv, json, raw array
-    def __init__(self, entry_obj):
+    def __init__(self, entry_obj, prepared=False):
 
         # raise exception if theres a problem
-        super().__init__(entry_obj)
+        super().__init__(entry_obj, prepared)
 
         # monitoring location is the destination table name
         self.monitoringLocationID = None
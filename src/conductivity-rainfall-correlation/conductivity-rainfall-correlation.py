@@ -1,6 +1,6 @@
 from pprint import pprint
 
-from mysql.connector import connect, Error, IntegrityError
+from mysql.connector import Error, IntegrityError
 import datetime
 from string import Template
 
@@ -13,9 +13,10 @@ import timeit
 path_root = Path(__file__).parents[2]
 sys.path.append(str(path_root))
 
-from src.importer.DBImporter import DBImporter
-from src.importer.DBConfig import DBConfig
-from src.importer.DBConfigFactory import DBConfigFactory
+from src.importer.ImporterOptions import ImporterOptions
+from src.importer.DBConnectionPool import DBConnectionPool
+from src.importer.ImportProgress import ImportProgress
+from src.importer.ImportMetrics import STAGE_READ, STAGE_CONSTRUCT
 from ConductivityRainfallDataEntry import ConductivityRainfallDataEntry
 
 # correlate conductivity in cosmo data with rainfall amount in cnv rainfall data
@@ -80,20 +81,13 @@ def precheck(conf_file):
     # database created by setup script? => yes
     # table created by setup script? => yes
 
-    config = DBConfigFactory.build(conf_file)
+    connection_pool = DBConnectionPool.get(conf_file)
 
     #################
     # check that the source databases exist and the target database exists
     try:
-        with connect(
-                host=config[DBConfig.CONFIG_HOST],
-                port=int(config[DBConfig.CONFIG_PORT]),
-                user=config[DBConfig.CONFIG_USER],
-                password=config[DBConfig.CONFIG_PASS],
-                database=config[DBConfig.CONFIG_DBASE],
-        ) as connection:
-            target_db = config[DBConfig.CONFIG_DBASE]
-            config = None
+        with connection_pool.connection() as connection:
+            target_db = connection_pool.database
 
             try:
                 with connection.cursor() as cursor:
@@ -277,17 +271,10 @@ def get_measurement_date_windows(cursor, sensor_name):
 # search for matching rainfall measurements within a time window of a conductivity measurement.
 # sensor site table should be manually dropped before running (or TODO: automatically?)
 def run_correlation(sensor_name, db_config_filename, db_importer):
-    config = DBConfigFactory.build(db_config_filename)
 
+    # same pool as precheck and the importer. reuses the precheck connection rather than opening one per sensor
     try:
-        with (connect(
-                host=config[DBConfig.CONFIG_HOST],
-                port=int(config[DBConfig.CONFIG_PORT]),
-                user=config[DBConfig.CONFIG_USER],
-                password=config[DBConfig.CONFIG_PASS],
-                database=config[DBConfig.CONFIG_DBASE],
-        ) as connection):
-            config = None
+        with DBConnectionPool.get(db_config_filename).connection() as connection:
 
             try:
                 with connection.cursor() as cursor:
@@ -333,6 +320,9 @@ def run_correlation(sensor_name, db_config_filename, db_importer):
 
                     correlated_value_count = 0
 
+                    # stage timings, if they're kept
+                    metrics = db_importer.metrics
+
                     # cosmo_block_query = Template(open("sql/cosmo-block-query.sql.template").read())
 
                     cosmo_date_i = cosmo_start_time
@@ -377,9 +367,16 @@ def run_correlation(sensor_name, db_config_filename, db_importer):
                             CNV_RAINFALL_START_DATETIME=correlation_start_time,
                             CNV_RAINFALL_END_DATETIME=correlation_end_time
                         )
+                        block_start_time = timeit.default_timer()
+
                         cursor.execute(correlation_block_query_sql)
 
                         row = cursor.fetchone()
+
+                        # query and fetches for the block, timed as reading its rows
+                        block_read_elapsed = timeit.default_timer() - block_start_time
+                        block_row_count = 0
+
                         while row is not None:
 
                             # COSMO_TIMESTAMP, CONDUCTANCE_RESULT, CNV_RAINFALL, CNV_TIMESTAMP
@@ -389,26 +386,36 @@ def run_correlation(sensor_name, db_config_filename, db_importer):
                             # 2023-01-05 20:20:00, 118.0, 0.232, 2023-01-05 20:20:00
                             # 2023-01-05 20:20:00, 118.0, 0.232, 2023-01-05 20:25:00
 
-                            data_entry = {
-                                SCHEMA[0]: row[0],
-                                SCHEMA[1]: row[1],
-                                SCHEMA[2]: row[2],
-                                SCHEMA[3]: row[3]
-                            }
+                            # the row's columns are in SCHEMA order, so the entry is built from it directly.
+                            # timed per row only with metrics on, the timer calls cost as much as the construct
+                            if metrics.enabled:
+                                construct_start_time = timeit.default_timer()
+                                new_entry = ConductivityRainfallDataEntry(row)
+                                metrics.observe(STAGE_CONSTRUCT, timeit.default_timer() - construct_start_time,
+                                                sensor_name)
+                            else:
+                                new_entry = ConductivityRainfallDataEntry(row)
 
-                            new_entry = ConductivityRainfallDataEntry(data_entry)
                             new_entry.set_db_destination(sensor_name)
 
                             db_importer.add(new_entry)
 
                             correlated_value_count += 1
+                            block_row_count += 1
 
-                            print("\r\tCorrelations processed: %d" % correlated_value_count, end='', flush=True)
+                            db_importer.progress.parsed(correlated_value_count)
 
 
 
                             # grab next row
-                            row = cursor.fetchone()
+                            if metrics.enabled:
+                                fetch_start_time = timeit.default_timer()
+                                row = cursor.fetchone()
+                                block_read_elapsed += timeit.default_timer() - fetch_start_time
+                            else:
+                                row = cursor.fetchone()
+
+                        metrics.observe(STAGE_READ, block_read_elapsed, sensor_name, block_row_count)
 
                         # increment source block start time
                         # ensure overlapping time windows are managed by query, and here
@@ -416,8 +423,10 @@ def run_correlation(sensor_name, db_config_filename, db_importer):
                         cosmo_date_i = cosmo_date_i + datetime.timedelta(seconds=CORRELATION_INCREMENT)
 
                 correlation_processing_elapsed_time = (timeit.default_timer() - correlation_processing_start_time)
+                metrics.count("rows_correlated", correlated_value_count, sensor_name)
                 log_msg = "Completed correlation Processing in %.3f sec" % correlation_processing_elapsed_time
-                print("\n%s" % log_msg, flush=True)
+                db_importer.progress.finish()
+                print(log_msg, flush=True)
                 logger.info(log_msg)
 
             # iterate over cosmo timestamps and query resolved values
@@ -466,9 +475,11 @@ def main(parsed_args):
     print("Precheck passed. Running correlation...")
 
     # build the importer. target database is defined in the config
-    db_importer = DBImporter(db_config_filename)
+    db_importer = ImporterOptions.build_importer(parsed_args, db_config_filename)
     db_importer.set_importer_name("conductivity-rainfall-correlation")
+    db_importer.set_progress(ImportProgress("Correlated"))
     db_importer.set_schema(SCHEMA)
+    ImporterOptions.apply(parsed_args, db_importer)
 
     # for a sensor
     #   get the start date and end date
@@ -509,6 +520,7 @@ if __name__ == "__main__":
                         help='Output database insert statements. Does not write to database.')
     parser.add_argument('-cfg', nargs=1, dest='db_cfg_file',
                         help='Database config file in json format. Ex: conductivity-rainfall-correlation.json')
+    ImporterOptions.add_arguments(parser)
 
-    # call main with parsed args
-    main(parser.parse_args())
+    # call main with parsed args, profiled with --profile
+    ImporterOptions.run(main, parser.parse_args(), logFile)
@@ -5,60 +5,75 @@ path_root = Path(__file__).parents[2]
 sys.path.append(str(path_root))
 
 # depends on adding src to sys.path
-from src.data.DataEntry import DataEntry
+from src.data.BatchValidator import BatchValidator
+from src.data.CompactDataEntry import CompactDataEntry
+from src.data.EntrySchema import EntrySchema
 from src.exception.DataValidationException import DataValidationException
 
 
-# DatasetName
-# MonitoringLocationID
-# MonitoringLocationName
-# MonitoringLocationLatitude
-# MonitoringLocationLongitude
-# MonitoringLocationHorizontalCoordinateReferenceSystem
-# MonitoringLocationHorizontalAccuracyMeasure
-# MonitoringLocationHorizontalAccuracyUnit
-# MonitoringLocationVerticalMeasure
-# MonitoringLocationVerticalUnit
-# MonitoringLocationType
-# ActivityType
-# ActivityMediaName
-# ActivityStartDate
-# ActivityStartTime
-# ActivityEndDate
-# ActivityEndTime
-# ActivityDepthHeightMeasure
-# ActivityDepthHeightUnit
-# SampleCollectionEquipmentName
-# CharacteristicName
-# MethodSpeciation
-# ResultSampleFraction
-# ResultValue
-# ResultUnit
-# ResultValueType
-# ResultDetectionCondition
-# ResultDetectionQuantitationLimitMeasure
-# ResultDetectionQuantitationLimitUnit
-# ResultDetectionQuantitationLimitType
-# ResultStatusID
-# ResultComment
-# ResultAnalyticalMethodID
-# ResultAnalyticalMethodContext
-# ResultAnalyticalMethodName
-# AnalysisStartDate
-# AnalysisStartTime
-# AnalysisStartTimeZone
-# LaboratoryName
-# LaboratorySampleID
-
-
-class CosmoDataEntry(DataEntry):
+class CosmoDataEntry(CompactDataEntry):
+
+    __slots__ = ("monitoringLocationID",)
+
+    # columns of the CoSMo dump file
+    SCHEMA = EntrySchema([
+        "DatasetName",
+        "MonitoringLocationID",
+        "MonitoringLocationName",
+        "MonitoringLocationLatitude",
+        "MonitoringLocationLongitude",
+        "MonitoringLocationHorizontalCoordinateReferenceSystem",
+        "MonitoringLocationHorizontalAccuracyMeasure",
+        "MonitoringLocationHorizontalAccuracyUnit",
+        "MonitoringLocationVerticalMeasure",
+        "MonitoringLocationVerticalUnit",
+        "MonitoringLocationType",
+        "ActivityType",
+        "ActivityMediaName",
+        "ActivityStartDate",
+        "ActivityStartTime",
+        "ActivityEndDate",
+        "ActivityEndTime",
+        "ActivityDepthHeightMeasure",
+        "ActivityDepthHeightUnit",
+        "SampleCollectionEquipmentName",
+        "CharacteristicName",
+        "MethodSpeciation",
+        "ResultSampleFraction",
+        "ResultValue",
+        "ResultUnit",
+        "ResultValueType",
+        "ResultDetectionCondition",
+        "ResultDetectionQuantitationLimitMeasure",
+        "ResultDetectionQuantitationLimitUnit",
+        "ResultDetectionQuantitationLimitType",
+        "ResultStatusID",
+        "ResultComment",
+        "ResultAnalyticalMethodID",
+        "ResultAnalyticalMethodContext",
+        "ResultAnalyticalMethodName",
+        "AnalysisStartDate",
+        "AnalysisStartTime",
+        "AnalysisStartTimeZone",
+        "LaboratoryName",
+        "LaboratorySampleID"
+    ])
+
+    # _validate_data's rules, for validating a chunk of rows at once
+    VALIDATOR = BatchValidator(SCHEMA, [
+        BatchValidator.required("ActivityStartDate", "found invalid ActivityStartDate [%s]"),
+        BatchValidator.required("ActivityStartTime", "Found invalid ActivityStartTime [%s]"),
+        BatchValidator.required("CharacteristicName", "Found invalid CharacteristicName [%s]"),
+        BatchValidator.within("ResultValue", 0, None, "Found invalid Conductivity/Conductance value [%s]",
+                              ("CharacteristicName", ("Conductivity", "Specific conductance")))
+    ])
 
     # row_obj is any structure that can be indexed and is iterable
     # csv, json, raw array
-    def __init__(self, entry_obj):
+    def __init__(self, entry_obj, prepared=False):
 
         # raise exception if theres a problem
-        super().__init__(entry_obj)
+        super().__init__(entry_obj, prepared)
 
         # value buckets - db requires these as DATEs/TIMEs, but they may be empty
         # convert to None, which will eventually become nullable DATEs and TIMEs
@@ -98,10 +113,17 @@ class CosmoDataEntry(DataEntry):
         if fields['CharacteristicName'] == '' or fields['CharacteristicName'] is None:
             raise DataValidationException("Found invalid CharacteristicName [%s]" % fields['CharacteristicName'])
 
-        # check that conductance measurements are greater than 0. stored as string
-        if ((fields['CharacteristicName'] == 'Conductivity' or fields['CharacteristicName'] == 'Specific conductance')
-                and float(fields['ResultValue']) < 0):
-            raise DataValidationException("Found invalid Conductivity/Conductance value [%s]" % fields['ResultValue'])
+        # check that conductance measurements are numbers greater than 0. stored as string
+        if fields['CharacteristicName'] == 'Conductivity' or fields['CharacteristicName'] == 'Specific conductance':
+            try:
+                result_value = float(fields['ResultValue'])
+            except Exception:
+                raise DataValidationException("Found invalid Conductivity/Conductance value [%s]" %
+                                              fields['ResultValue'])
+
+            if result_value < 0:
+                raise DataValidationException("Found invalid Conductivity/Conductance value [%s]" %
+                                              fields['ResultValue'])
 
         # water levels outside the range of 10 to 11.5
         # ^^ values may not be accurate
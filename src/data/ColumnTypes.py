@@ -0,0 +1,140 @@
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+import re
+
+from src.exception.DataValidationException import DataValidationException
+
+# column types, as declared in the setup/sql table templates
+TYPE_VARCHAR = "varchar"
+TYPE_INT = "int"
+TYPE_FLOAT = "float"
+TYPE_DECIMAL = "decimal"
+TYPE_DATE = "date"
+TYPE_TIME = "time"
+TYPE_DATETIME = "datetime"
+
+COLUMN_TYPES = [
+    TYPE_VARCHAR,
+    TYPE_INT,
+    TYPE_FLOAT,
+    TYPE_DECIMAL,
+    TYPE_DATE,
+    TYPE_TIME,
+    TYPE_DATETIME
+]
+
+# dates and times the iso parsers don't take: slashes, single digit months, days and hours, no seconds
+LOOSE_DATETIME_PATTERN = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$')
+LOOSE_TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+
+
+# converts dump values, which arrive as text, to the python types the database driver sends natively for each column
+# type: int, float, Decimal, date, time and datetime.
+#
+# values are converted once, when the entry is added to the importer, so the server doesn't parse text into a DATE or
+# DECIMAL for every column of every row. empty values in typed columns become None, which is NULL. a value that can't
+# be converted raises a DataValidationException, the same as a row failing validation.
+
+class ColumnTypes(object):
+
+    # converter for a column type. None for text columns, which are left as they are
+    def converter(column_type):
+        if column_type == TYPE_VARCHAR:
+            return None
+
+        if column_type not in CONVERTERS:
+            raise Exception("Unknown column type %s" % column_type)
+
+        parse = CONVERTERS[column_type]
+
+        def convert(value):
+            if value is None or value == "":
+                return None
+
+            try:
+                return parse(value)
+            except (ValueError, ArithmeticError):
+                raise DataValidationException("Found invalid %s value [%s]" % (column_type, value))
+
+        return convert
+
+    # converters for the values of each field, in field order. None where a field is text or has no declared type
+    def converters(fields, column_types):
+        return [ColumnTypes.converter(column_types.get(field, TYPE_VARCHAR)) for field in fields]
+
+
+def _parse_int(value):
+    return int(value)
+
+
+def _parse_float(value):
+    return float(value)
+
+
+# text as it is, e.g. 12.34567800. the driver sends decimals as exact text in the binary protocol
+def _parse_decimal(value):
+    if isinstance(value, Decimal):
+        return value
+
+    result = Decimal(value)
+    if not result.is_finite():
+        raise InvalidOperation("not a finite number")
+
+    return result
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+
+    match = LOOSE_DATETIME_PATTERN.match(value)
+    if match is None:
+        raise ValueError("not a date and time")
+
+    return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)), int(match.group(4) or 0),
+                    int(match.group(5) or 0), int(match.group(6) or 0))
+
+
+def _parse_date(value):
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return value
+
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        pass
+
+    return _parse_datetime(value).date()
+
+
+# mysql TIME values read back from the database come as timedelta
+def _parse_time(value):
+    if isinstance(value, (time, timedelta)):
+        return value
+
+    try:
+        return time.fromisoformat(value)
+    except ValueError:
+        pass
+
+    match = LOOSE_TIME_PATTERN.match(value)
+    if match is None:
+        raise ValueError("not a time")
+
+    return time(int(match.group(1)), int(match.group(2)), int(match.group(3) or 0))
+
+
+CONVERTERS = {
+    TYPE_INT: _parse_int,
+    TYPE_FLOAT: _parse_float,
+    TYPE_DECIMAL: _parse_decimal,
+    TYPE_DATE: _parse_date,
+    TYPE_TIME: _parse_time,
+    TYPE_DATETIME: _parse_datetime
+}
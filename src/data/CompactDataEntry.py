@@ -0,0 +1,126 @@
+import pprint
+import time
+
+from src.data.BatchValidator import BatchValidator
+from src.data.DataEntry import DataEntry
+from src.exception.DataValidationException import DataValidationException
+from src.importer.ImportMetrics import STAGE_VALIDATE, STAGE_SCRUB
+
+# rows an import builds entries for at a time. see build_entries
+ENTRY_CHUNK_ROWS = 1000
+
+
+# a DataEntry holding its values in a list in the order of its source's schema, rather than the dict the dump reader
+# built for the row.
+#
+# subclasses set SCHEMA to their source's EntrySchema and list any attributes of their own in __slots__, so entries have
+# no instance dict. a CoSMo row's 40 fields then take a list of 40 values instead of a 40 key dict, and the row's dict
+# can be freed as soon as the entry is built.
+#
+# get, set and is_defined work as for a dict-backed entry, by field name. fields outside the schema can't be set.
+# validation is given the entry itself, so fields['name'] lookups in _validate_data work unchanged.
+#
+# an import builds its entries a chunk of rows at a time with build_entries: the rows are validated, together if the
+# subclass sets a VALIDATOR, then the rows that passed are scrubbed together a column at a time, and only then are
+# entries built for them.
+
+class CompactDataEntry(DataEntry):
+
+    __slots__ = ("entry_values",)
+
+    # EntrySchema of the source's dump rows. set by subclasses
+    SCHEMA = None
+
+    # BatchValidator with the rules of _validate_data, for validating a chunk of rows at once. optional
+    VALIDATOR = None
+
+    # entry_obj is a dict keyed by field, or a sequence in schema order. prepared: entry_obj is a list of values in
+    # schema order that has already been validated and scrubbed, e.g. by build_entries
+    def __init__(self, entry_obj, prepared=False):
+
+        if prepared:
+            self.entry_values = entry_obj
+        else:
+            self.entry_values = self.SCHEMA.values(entry_obj)
+
+            self._prepare(self, self.entry_values)
+
+    def _scrub(self, values):
+        self.SCHEMA.scrubber.scrub_values(values)
+
+    # entries of entry_class for a chunk of rows, in the same order. a row that fails validation or construction gets
+    # the exception it raised in place of its entry. with a VALIDATOR and numpy, rows failing validation get a
+    # DataValidationException with their reject reason instead
+    def build_entries(entry_class, rows):
+        metrics = DataEntry.metrics
+        start_time = time.perf_counter()
+
+        results = [None] * len(rows)
+        accepted = []
+
+        validator = entry_class.VALIDATOR
+
+        if validator is not None and BatchValidator.available():
+            read = []
+            for i, row in enumerate(rows):
+                try:
+                    results[i] = entry_class.SCHEMA.values(row)
+                    read.append(i)
+                except Exception as e:
+                    results[i] = e
+
+            # the whole chunk at once. entries are only built for the rows that pass
+            reasons = validator.reject_reasons([results[i] for i in read])
+
+            for i, reason in zip(read, reasons):
+                if reason is None:
+                    accepted.append(i)
+                else:
+                    results[i] = DataValidationException(reason)
+        else:
+            for i, row in enumerate(rows):
+                try:
+                    entry = entry_class.__new__(entry_class)
+                    entry.entry_values = entry_class.SCHEMA.values(row)
+                    entry._validate_data(entry)
+
+                    accepted.append(i)
+                    results[i] = entry.entry_values
+                except Exception as e:
+                    results[i] = e
+
+        validated_time = time.perf_counter()
+        entry_class.SCHEMA.scrubber.scrub_rows([results[i] for i in accepted])
+
+        if metrics is not None:
+            metrics.observe(STAGE_VALIDATE, validated_time - start_time, rows=len(rows))
+            metrics.observe(STAGE_SCRUB, time.perf_counter() - validated_time, rows=len(accepted))
+
+        for i in accepted:
+            try:
+                results[i] = entry_class(results[i], True)
+            except Exception as e:
+                results[i] = e
+
+        return results
+
+    def __getitem__(self, field_name):
+        return self.entry_values[self.SCHEMA.index[field_name]]
+
+    def get(self, field_name):
+        return self.entry_values[self.SCHEMA.index[field_name]]
+
+    def is_defined(self, field_name):
+        return self.entry_values[self.SCHEMA.index[field_name]] is not None
+
+    def set(self, field_name, value):
+        self.entry_values[self.SCHEMA.index[field_name]] = value
+
+    def _get_entry_data(self):
+        return self.entry_values
+
+    def values_getter(self, fields):
+        return self.SCHEMA.getter(fields)
+
+    def to_s(self):
+        pprint.pprint(dict(zip(self.SCHEMA.fields, self.entry_values)))
@@ -1,9 +1,20 @@
+from operator import itemgetter
+
 import pprint
-import re
+import time
+
+from src.data.EntryScrubber import EntryScrubber
+from src.importer.ImportMetrics import STAGE_VALIDATE, STAGE_SCRUB
 
 
 class DataEntry:
 
+    # dict-backed entries keep an instance dict. see CompactDataEntry for entries without one
+    __slots__ = ()
+
+    # times validation and scrubbing of every entry when set. see ImportMetrics
+    metrics = None
+
     # row_obj is any structure that can be indexed and is iterable
     # csv, json, raw array
     # TODO: maybe standardize on dict. defer dict creation to the import, who will have context
@@ -13,25 +24,37 @@ class DataEntry:
         # is indexable
         # is iterable
 
-        self._validate_data(entry_obj)
+        self._prepare(entry_obj, entry_obj)
 
-        # at this point basic validation has passed, but still want to clean it up
-        # remove alphanumeric+ chars used in sql syntax [ ] { } | " ' ;
+        self.entry_data = entry_obj
 
-        ##################
-        # scrub invalid characters from values
-        # [ #$%[]{},"'| ]
+    # validate fields, then scrub values. the same object for dict-backed entries
+    def _prepare(self, fields, values):
+        metrics = DataEntry.metrics
 
-        scrub_pattern = re.compile(r'[\[\]\'\"\$\#\@\!\{\}\,\|]')
+        if metrics is None:
+            self._validate_data(fields)
+            self._scrub(values)
+        else:
+            start_time = time.perf_counter()
+            self._validate_data(fields)
 
-        for field in entry_obj:
-            value = str(entry_obj[field])
+            validated_time = time.perf_counter()
+            self._scrub(values)
 
-            value = re.sub(scrub_pattern, '', value)
+            metrics.observe(STAGE_VALIDATE, validated_time - start_time)
+            metrics.observe(STAGE_SCRUB, time.perf_counter() - validated_time)
 
-            entry_obj[field] = value
+    # at this point basic validation has passed, but still want to clean it up
+    # remove alphanumeric+ chars used in sql syntax [ ] { } | " ' ;
+    def _scrub(self, entry_obj):
 
-        self.entry_data = entry_obj
+        ##################
+        # scrub invalid characters from values
+        # [ #$%[]{},"'| ]
+
+        for field in entry_obj:
+            entry_obj[field] = EntryScrubber.scrub_value(entry_obj[field])
 
     def _validate_data(self, entry_obj):
         # require override, even if the overrider just returns true
@@ -56,6 +79,15 @@ class DataEntry:
     def _get_entry_data(self):
         return self.entry_data
 
+    # function returning the values of fields, in that order, from _get_entry_data. built once per destination table
+    def values_getter(self, fields):
+        # itemgetter returns a bare value rather than a tuple when there's only one field
+        if len(fields) == 1:
+            field = fields[0]
+            return lambda entry_data: (entry_data[field],)
+
+        return itemgetter(*fields)
+
     # def get_entry_date(self):
     #     pass
     #
@@ -0,0 +1,55 @@
+from operator import itemgetter
+
+from src.data.EntryScrubber import EntryScrubber
+from src.exception.DataValidationException import DataValidationException
+
+
+# the fields of a source's dump rows, in dump order, and the position of each field.
+#
+# compact entries hold a row's values in a list in schema order rather than the dict the dump reader built for the row,
+# and find a field's value by its position here. see CompactDataEntry
+
+class EntrySchema:
+
+    # numeric_fields are those the entries' validation parses as numbers. see EntryScrubber
+    def __init__(self, fields, numeric_fields=()):
+        self.fields = list(fields)
+
+        self.scrubber = EntryScrubber(self.fields, numeric_fields)
+
+        # field: position
+        self.index = {field: i for i, field in enumerate(self.fields)}
+
+        # itemgetter returns a bare value rather than a tuple when there's only one field
+        if len(self.fields) == 1:
+            field = self.fields[0]
+            self.mapping_getter = lambda entry_obj: (entry_obj[field],)
+        else:
+            self.mapping_getter = itemgetter(*self.fields)
+
+    # a row's values in schema order, from a dict keyed by field like csv.DictReader's rows, or from a sequence already
+    # in schema order like csv.reader's. fields the schema doesn't have are left out
+    def values(self, entry_obj):
+        if hasattr(entry_obj, "keys"):
+            return list(self.mapping_getter(entry_obj))
+
+        values = list(entry_obj)
+
+        if len(values) != len(self.fields):
+            raise DataValidationException("Expected %d values, found %d" % (len(self.fields), len(values)))
+
+        return values
+
+    # function returning the values of fields, in that order, from a list of values in schema order
+    def getter(self, fields):
+        indexes = [self.index[field] for field in fields]
+
+        # every field in schema order: the values as they are
+        if indexes == list(range(len(self.fields))):
+            return tuple
+
+        if len(indexes) == 1:
+            index = indexes[0]
+            return lambda values: (values[index],)
+
+        return itemgetter(*indexes)
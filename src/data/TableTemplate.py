@@ -0,0 +1,78 @@
+from string import Template
+
+import re
+
+from src.data.ColumnTypes import COLUMN_TYPES, TYPE_VARCHAR
+
+# CREATE TABLE $SITE ( ... ); with one column definition per line
+CREATE_TABLE_PATTERN = re.compile(r'CREATE TABLE \$(\w+) \((.*?)\);', re.S)
+
+# MeasurementTimestamp DATETIME, or AirTemperature DECIMAL(9,7),
+COLUMN_PATTERN = re.compile(r'^\s*(\w+)\s+(\w+)(?:\((\d+)(?:,\s*(\d+))?\))?\s*,?\s*$')
+
+# ALTER TABLE $SITE ADD PRIMARY KEY (MeasurementTimestamp);
+PRIMARY_KEY_PATTERN = re.compile(r'ADD PRIMARY KEY \(([^)]*)\)')
+
+
+# the layout of a table as set up by a setup/sql template: its columns, their types and its primary key.
+#
+# the templates create the mysql tables. sinks that write somewhere other than mysql build their tables from the same
+# template, so a table has the same columns and types wherever it's written. the table name is the template's
+# placeholder, e.g. $SITE, substituted with the destination table.
+
+class TableTemplate:
+
+    def __init__(self, template_file):
+        self.template_file = str(template_file)
+
+        with open(self.template_file, encoding='utf-8') as filehandle:
+            self.template = filehandle.read()
+
+        match = CREATE_TABLE_PATTERN.search(self.template)
+        if match is None:
+            raise Exception("No CREATE TABLE statement in table template %s" % self.template_file)
+
+        # MONITORING_LOCATION_ID or SITE
+        self.placeholder = match.group(1)
+
+        # column names in table order, their types, and the length, or precision and scale, given with the type
+        self.columns = []
+        self.column_types = {}
+        self.column_sizes = {}
+
+        for line in match.group(2).splitlines():
+            if len(line.strip()) <= 0:
+                continue
+
+            column_match = COLUMN_PATTERN.match(line)
+            if column_match is None:
+                raise Exception("Could not read column definition [%s] in table template %s" %
+                                (line.strip(), self.template_file))
+
+            column = column_match.group(1)
+            column_type = column_match.group(2).lower()
+
+            if column_type not in COLUMN_TYPES:
+                raise Exception("Unknown column type %s in table template %s" % (column_type, self.template_file))
+
+            self.columns.append(column)
+            self.column_types[column] = column_type
+            self.column_sizes[column] = tuple(int(size) for size in column_match.group(3, 4) if size is not None)
+
+        key_match = PRIMARY_KEY_PATTERN.search(self.template)
+        if key_match is None:
+            self.key_columns = []
+        else:
+            self.key_columns = [column.strip() for column in key_match.group(1).split(",")]
+
+    # type of a column. columns the template doesn't have are text
+    def column_type(self, column):
+        return self.column_types.get(column, TYPE_VARCHAR)
+
+    # types of the columns, keyed by the dump field written to each. fields and columns in the same order
+    def field_types(self, fields, columns):
+        return {field: self.column_type(column) for field, column in zip(fields, columns)}
+
+    # the mysql statements setting up a destination table
+    def mysql(self, table):
+        return Template(self.template).substitute({self.placeholder: table})
@@ -0,0 +1,4 @@
+# Exception for failures writing an import to a storage sink other than the database
+
+class StorageSinkException(Exception):
+    pass
@@ -15,6 +15,9 @@ from src.data.DataEntry import DataEntry
 
 class FlowworksDataEntry(DataEntry):
 
+    # only one site: set in generate_db_setup.py
+    SITE = "DNV"
+
     # row_obj is any structure that can be indexed and is iterable
     # csv, json, raw array
     def __init__(self, entry_obj):
@@ -27,8 +30,7 @@ class FlowworksDataEntry(DataEntry):
         # at this point we have a valid entry, but still want to clean it up
         # TODO: remove alphanumeric+ chars used in sql syntax [ ] { } | " ' ;
 
-        # only one site: set in generate_db_setup.py
-        self.site = "DNV"
+        self.site = FlowworksDataEntry.SITE
 
         ##################
         # value buckets - some entries can be incomplete
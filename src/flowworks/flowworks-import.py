@@ -4,8 +4,11 @@ import logging
 import timeit
 
 from datetime import datetime
+from pathlib import Path
 from FlowworksDataEntry import FlowworksDataEntry
-from src.importer.DBImporter import DBImporter
+from src.importer.ImporterOptions import ImporterOptions
+from src.importer.FailureSink import FailureSink
+from src.importer.ImportMetrics import STAGE_FILTER, STAGE_CONSTRUCT
 
 ################
 # logging
@@ -47,6 +50,19 @@ schema_field_mapping = {
     "value": "FlowReading"
 }
 
+# dump fields making up the table's primary key
+flowworks_key_fields = [
+    "date"
+]
+
+# dump fields making up the measurement timestamp
+flowworks_timestamp_fields = [
+    "date"
+]
+
+# setup/sql template the table is created from. typed imports convert values to its column types
+flowworks_table_template = Path(__file__).parents[2] / "setup/sql/flowworks/nssk-flowworks.sql.template"
+
 
 def want_entry(in_row):
     # only one site for now: accept it all
@@ -97,7 +113,7 @@ def main(parsed_args):
         dry_run = True
     else:
         # data import - make sure we have a config file to connect to the database
-        if db_config_filename is None:
+        if db_config_filename is None and ImporterOptions.needs_database(parsed_args):
             print("Error- Need a DB config file for the import")
             exit(1)
 
@@ -117,13 +133,24 @@ def main(parsed_args):
     # no quote char
     entries_processed = 0
 
-    invalid_entry = []
     invalid_entry_count = 0
 
-    db_importer = DBImporter(db_config_filename)
+    db_importer = ImporterOptions.build_importer(parsed_args, db_config_filename)
     db_importer.set_importer_name("flowworks")
     db_importer.set_schema(flowworks_dump_schema)
     db_importer.set_schema_mapping(schema_field_mapping)
+    db_importer.set_key_fields(flowworks_key_fields)
+    db_importer.set_timestamp_fields(flowworks_timestamp_fields)
+    db_importer.set_table_template(flowworks_table_template)
+    ImporterOptions.apply(parsed_args, db_importer)
+
+    # invalid entries are written out as they're found
+    invalid_entry_file = "./flowworks_invalid_entries_%s.log" % datetime.now().strftime("%Y%m%d-%H%M%S")
+    invalid_entry = db_importer.build_failure_sink(invalid_entry_file)
+
+    db_importer.read_watermarks([FlowworksDataEntry.SITE])
+    resume_position = ImporterOptions.start_checkpoint(parsed_args, db_importer, data_dump_filename)
+    entries_read = 0
 
     # TODO: move to ijson. json.loads will load the entire file into memory. stupid.
     print("Extracting data from JSON file...")
@@ -131,18 +158,55 @@ def main(parsed_args):
     with open(data_dump_filename, 'r') as filehandle:
         # we want the "datapoints" item in the json. ijson needs "datapoints.item"
         json_read_start_time = timeit.default_timer()
-        for entry in ijson.items(filehandle, "datapoints.item"):
+
+        # rows read and written, shown together
+        progress = db_importer.progress
+        progress.track_file(filehandle)
+
+        # stage timings, if they're kept
+        metrics = db_importer.metrics
+
+        for entry in metrics.timed(ijson.items(filehandle, "datapoints.item")):
+
+            entries_read += 1
+
+            # resuming: entries up to the checkpoint are already in the database
+            if entries_read <= resume_position:
+                continue
+
+            db_importer.set_position(entries_read)
 
             # narrow our incoming data here
             # want only some rows
-            if want_entry(entry):
+            # timed per row only with metrics on, the timer calls cost as much as the filter
+            if metrics.enabled:
+                filter_start_time = timeit.default_timer()
+                wanted = want_entry(entry)
+                metrics.observe(STAGE_FILTER, timeit.default_timer() - filter_start_time)
+            else:
+                wanted = want_entry(entry)
+
+            if wanted:
+
+                # incremental imports drop entries older than what the table already has, before parsing them
+                if not db_importer.is_new(FlowworksDataEntry.SITE, entry):
+                    continue
+
                 try:
 
                     # test random validation failures (1/1000 => ~.1% failure rate)
                     # if random.randint(0, 1000) == 20:
                     #     raise DataValidationException("Random validation failure")
 
-                    db_importer.add(FlowworksDataEntry(entry))
+                    if metrics.enabled:
+                        construct_start_time = timeit.default_timer()
+                        data_entry = FlowworksDataEntry(entry)
+                        metrics.observe(STAGE_CONSTRUCT, timeit.default_timer() - construct_start_time,
+                                        data_entry.get_db_destination())
+                    else:
+                        data_entry = FlowworksDataEntry(entry)
+
+                    db_importer.add(data_entry)
                     entries_processed += 1
                 except Exception as e:
 
@@ -152,11 +216,10 @@ def main(parsed_args):
                     logger.error("Error constructing FlowworksDataEntry")
                     logger.error(e)
 
-                    invalid_entry.append(entry)
+                    invalid_entry.write(entry, FailureSink.reason(e))
                     invalid_entry_count += 1
 
-                print("\r\tEntries processed: %d. Validation failures: %d" %
-                      (entries_processed, invalid_entry_count), end='', flush=True)
+                progress.parsed(entries_processed, invalid_entry_count)
             else:
                 # use sparingly
                 if logger.isEnabledFor(logging.DEBUG):
@@ -164,25 +227,35 @@ def main(parsed_args):
 
     json_read_elapsed = (timeit.default_timer() - json_read_start_time)
 
-    log_msg = ("\nProcessed %d rows from dump file %s in %.3f sec. Found %d validation failures" %
+    progress.finish()
+
+    metrics.count("rows_read", entries_read)
+    metrics.count("rows_valid", entries_processed)
+    metrics.count("rows_invalid", invalid_entry_count)
+
+    log_msg = ("Processed %d rows from dump file %s in %.3f sec. Found %d validation failures" %
                (entries_processed, data_dump_filename, json_read_elapsed, invalid_entry_count))
     print(log_msg, flush=True)
     logger.info(log_msg)
 
     ################
     # log read/parse failures here. not needed for database write
-    if invalid_entry_count > 0:
-        date_time = datetime.now()
-        invalid_entry_file = "./flowworks_invalid_entries_%s.log" % (date_time.strftime("%Y%m%d-%H%M%S"))
+    invalid_entry.close()
 
-        log_msg = "Found %d invalid entries. Logging to file '%s'" % (invalid_entry_count, invalid_entry_file)
+    if invalid_entry_count > 0:
+        if invalid_entry.written_count < invalid_entry_count:
+            log_msg = ("Found %d invalid entries. Logging %d of them to file '%s'" %
+                       (invalid_entry_count, invalid_entry.written_count, invalid_entry.failure_file))
+        else:
+            log_msg = ("Found %d invalid entries. Logging to file '%s'" %
+                       (invalid_entry_count, invalid_entry.failure_file))
 
         print(log_msg)
         logger.info(log_msg)
 
-        with open(invalid_entry_file, 'w', encoding='utf-8') as filehandle:
-            for invalid_entry in invalid_entry:
-                filehandle.write("%s\n" % invalid_entry)
+        for line in invalid_entry.report():
+            print("\t%s" % line)
+            logger.info(line)
     else:
         log_msg = "Found no rejected entries."
 
@@ -227,6 +300,8 @@ if __name__ == "__main__":
                         help='Database config file in json format. Ex: flowworks.json')
     parser.add_argument(nargs=1, dest='data_dump_file',
                         help='Flowworks data dump file. Ex: 20240329-145659_flowworks.json')
+    ImporterOptions.add_arguments(parser)
+    ImporterOptions.add_dump_arguments(parser)
 
-    # call main with parsed args
-    main(parser.parse_args())
+    # call main with parsed args, profiled with --profile
+    ImporterOptions.run(main, parser.parse_args(), logFile)
@@ -0,0 +1,229 @@
+from array import array
+from itertools import islice
+
+# distinct values a column is dictionary encoded for. columns with more distinct values, like timestamps and readings,
+# are held as plain lists instead. codes take 1 byte per row up to 256 distinct values, and 2 bytes after
+DICTIONARY_MAX = 4096
+
+# rows held as tuples until they're encoded into the columns together
+ENCODE_ROWS = 1024
+
+# rows decoded at a time when iterating
+DECODE_ROWS = 4096
+
+
+# stands in for the dictionary of a plain column, looking each value up as itself so plain and encoded columns are
+# appended to the same way
+class PlainColumn:
+    def __getitem__(self, value):
+        return value
+
+
+PLAIN_COLUMN = PlainColumn()
+
+
+# pending rows for one destination table, held column by column.
+#
+# dump rows repeat most of their values: the dataset, the site, units, coordinates. each row's values used to be held as
+# a tuple of separate strings. here a column with few distinct values keeps each distinct value once, and a 1 or 2
+# byte code per row in an array. columns that turn out to have many distinct values fall back to a plain list of values.
+# a bitmap per column marks the null rows, so null and distinct counts come without a pass over the rows.
+#
+# only columns of strings are encoded. a column is held plain from its first value of another type, like the dates and
+# decimals of typed imports.
+#
+# appended rows are held as they are until ENCODE_ROWS of them have built up, then encoded a column at a time, which
+# keeps the per value work out of the interpreter loop.
+#
+# rows are only turned back into tuples when they're written, a slice or DECODE_ROWS rows at a time. a buffer indexes,
+# slices, iterates and counts like a list of row tuples.
+
+class ColumnBuffer:
+
+    def __init__(self, column_count):
+        self.column_count = column_count
+        self.row_count = 0
+
+        # encoded columns: the code of each distinct value, the distinct values, and the code for each row.
+        # plain columns: PLAIN_COLUMN, None, and the value for each row
+        self.dictionaries = [{} for i in range(column_count)]
+        self.values = [[] for i in range(column_count)]
+        self.codes = [array('B') for i in range(column_count)]
+
+        # bit r of a column's bitmap is set if row r is null. grown as nulls turn up
+        self.nulls = [bytearray() for i in range(column_count)]
+
+        # rows appended since the columns were last encoded
+        self.staged = []
+
+    def __len__(self):
+        return self.row_count + len(self.staged)
+
+    def append(self, row):
+        self.staged.append(row)
+
+        if len(self.staged) >= ENCODE_ROWS:
+            self._encode()
+
+    # move the staged rows into the columns
+    def _encode(self):
+        staged = self.staged
+        if len(staged) <= 0:
+            return
+
+        self.staged = []
+
+        for column, values in enumerate(zip(*staged)):
+            done = 0
+
+            while done < len(values):
+                codes = self.codes[column]
+                dictionary = self.dictionaries[column]
+
+                if dictionary is PLAIN_COLUMN:
+                    codes.extend(islice(values, done, None))
+                    break
+
+                # values seen before, the usual case. extend stops at the first new value, leaving the values before it
+                # appended
+                try:
+                    codes.extend(map(dictionary.__getitem__, islice(values, done, None)))
+                    break
+                except KeyError:
+                    done = len(codes) - self.row_count
+                    self._append_value(column, values[done])
+                    done += 1
+
+            # only columns with a null somewhere need scanning for them
+            if (self._is_plain(column) or None in self.dictionaries[column]) and None in values:
+                for i, value in enumerate(values):
+                    if value is None:
+                        self._set_null(column, self.row_count + i)
+
+        self.row_count += len(staged)
+
+    def _append_value(self, column, value):
+        dictionary = self.dictionaries[column]
+
+        if dictionary is PLAIN_COLUMN or value in dictionary:
+            self.codes[column].append(dictionary[value])
+            return
+
+        values = self.values[column]
+
+        # only strings are encoded. values looked up by equality would come back as the first equal value seen, so
+        # Decimal('0.20') as Decimal('0.2'), or 1.0 and True as 1
+        if len(values) >= DICTIONARY_MAX or (value is not None and type(value) is not str):
+            self._make_plain(column)
+            self.codes[column].append(value)
+            return
+
+        code = len(values)
+        dictionary[value] = code
+        values.append(value)
+
+        if code == 256:
+            self.codes[column] = array('H', self.codes[column])
+
+        self.codes[column].append(code)
+
+    def _set_null(self, column, row_index):
+        nulls = self.nulls[column]
+
+        byte = row_index >> 3
+        if byte >= len(nulls):
+            nulls.extend(bytes(byte - len(nulls) + 1))
+
+        nulls[byte] |= 1 << (row_index & 7)
+
+    # stop encoding a column with too many distinct values to be worth it
+    def _make_plain(self, column):
+        self.codes[column] = list(map(self.values[column].__getitem__, self.codes[column]))
+        self.dictionaries[column] = PLAIN_COLUMN
+        self.values[column] = None
+
+    def _is_plain(self, column):
+        return self.dictionaries[column] is PLAIN_COLUMN
+
+    # every value in a column, in row order
+    def column(self, column, start=0, stop=None):
+        self._encode()
+
+        if self._is_plain(column):
+            return self.codes[column][start:stop]
+
+        return list(map(self.values[column].__getitem__, self.codes[column][start:stop]))
+
+    # a row tuple, or a list of row tuples for a slice
+    def __getitem__(self, index):
+        self._encode()
+
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self.row_count)
+            if step != 1:
+                return list(zip(*(self.column(column) for column in range(self.column_count))))[index]
+
+            if start >= stop:
+                return []
+
+            return list(zip(*(self.column(column, start, stop) for column in range(self.column_count))))
+
+        if index < 0:
+            index += self.row_count
+        if not 0 <= index < self.row_count:
+            raise IndexError("row index out of range")
+
+        return tuple(self.codes[column][index] if self._is_plain(column) else
+                     self.values[column][self.codes[column][index]] for column in range(self.column_count))
+
+    def __iter__(self):
+        return self.iterate()
+
+    # row tuples from row start onwards
+    def iterate(self, start=0):
+        self._encode()
+
+        for chunk_start in range(start, self.row_count, DECODE_ROWS):
+            yield from self[chunk_start:chunk_start + DECODE_ROWS]
+
+    # a new buffer holding the rows at the given indexes, in order
+    def select(self, indexes):
+        self._encode()
+
+        selected = ColumnBuffer(self.column_count)
+        selected.row_count = len(indexes)
+
+        for column in range(self.column_count):
+            codes = self.codes[column]
+
+            if self._is_plain(column):
+                selected.dictionaries[column] = PLAIN_COLUMN
+                selected.values[column] = None
+                selected.codes[column] = list(map(codes.__getitem__, indexes))
+            else:
+                # copied, so rows appended to either buffer can't widen the other's codes
+                selected.dictionaries[column] = dict(self.dictionaries[column])
+                selected.values[column] = list(self.values[column])
+                selected.codes[column] = array(codes.typecode, map(codes.__getitem__, indexes))
+
+            nulls = self.nulls[column]
+            if len(nulls) > 0:
+                for new_index, index in enumerate(indexes):
+                    if (index >> 3) < len(nulls) and nulls[index >> 3] & (1 << (index & 7)):
+                        selected._set_null(column, new_index)
+
+        return selected
+
+    def null_count(self, column):
+        self._encode()
+
+        return sum(bin(byte).count("1") for byte in self.nulls[column])
+
+    # distinct values in a column, or None if there are too many to have been kept track of
+    def distinct_count(self, column):
+        self._encode()
+
+        if self._is_plain(column):
+            return None
+
+        return len(self.values[column])
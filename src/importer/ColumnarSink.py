@@ -0,0 +1,204 @@
+from datetime import time
+from decimal import Decimal
+from pathlib import Path
+
+from src.data.ColumnTypes import TYPE_INT, TYPE_FLOAT, TYPE_DECIMAL, TYPE_DATE, TYPE_TIME, TYPE_DATETIME
+from src.exception.StorageSinkException import StorageSinkException
+from src.importer.StorageSink import StorageSink
+
+# optional: Parquet output with pyarrow, otherwise NumPy .npy files with numpy
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+try:
+    import numpy
+    import numpy.lib.format
+except ImportError:
+    numpy = None
+
+FORMAT_PARQUET = "parquet"
+FORMAT_NPY = "npy"
+
+# numpy dtype for each template column type. numbers are float so nulls can be NaN, and dates and times are NaT when
+# null. text is fixed width unicode, sized to the longest value
+NPY_DTYPES = {
+    TYPE_INT: "float64",
+    TYPE_FLOAT: "float64",
+    TYPE_DECIMAL: "float64",
+    TYPE_DATE: "datetime64[D]",
+    TYPE_TIME: "timedelta64[s]",
+    TYPE_DATETIME: "datetime64[s]"
+}
+
+
+# writes an import to a directory of columnar files for analysis, one table at a time.
+#
+# with pyarrow installed each destination table is a Parquet file, <table>.parquet, with a row group per flush and
+# column types from the table template: decimals keep their precision and scale, dates and times are native. without
+# pyarrow, each column of a table is a NumPy .npy file, <table>/<column>.npy, readable with numpy.load. each flush is
+# written to part files as it comes, and the parts are joined into one file per column when the sink is closed, so the
+# import never holds more than a flush in memory.
+#
+# columnar files have no keys. every row is written, and duplicates in the dump are kept.
+
+class ColumnarSink(StorageSink):
+
+    def __init__(self, sink_path, template_file):
+        super().__init__(sink_path, template_file)
+
+        if pyarrow is not None:
+            self.file_format = FORMAT_PARQUET
+        elif numpy is not None:
+            self.file_format = FORMAT_NPY
+        else:
+            raise StorageSinkException("Columnar output needs pyarrow or numpy installed")
+
+        self.output_dir = Path(self.sink_path)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        # parquet: open writer for each table
+        self.parquet_writers = {}
+
+        # npy: part files written so far and the columns of each table, keyed by table
+        self.part_counts = {}
+        self.part_columns = {}
+
+        self.closed = False
+
+        self.logger.info("Writing %s files to %s" % (self.file_format, self.output_dir))
+
+    def write_rows(self, db_importer, plan, rows):
+
+        values = []
+        for row in rows:
+            converted = self._convert(db_importer, plan, row)
+            if converted is not None:
+                values.append(converted)
+
+        if len(values) <= 0:
+            return
+
+        columns = list(zip(*values))
+
+        try:
+            if self.file_format == FORMAT_PARQUET:
+                self._write_parquet(plan, columns)
+            else:
+                self._write_npy(plan, columns)
+
+        except (OSError, ValueError, ArithmeticError) as e:
+            raise StorageSinkException("Error writing %s to %s: %s" % (plan.table, self.output_dir, e))
+
+        db_importer.insert_count += len(values)
+
+    # pyarrow type of a template column
+    def _parquet_type(self, column):
+        column_type = self.template.column_type(column)
+        sizes = self.template.column_sizes.get(column, ())
+
+        if column_type == TYPE_INT:
+            return pyarrow.int64()
+        elif column_type == TYPE_FLOAT:
+            return pyarrow.float64()
+        elif column_type == TYPE_DECIMAL:
+            precision, scale = sizes if len(sizes) == 2 else (38, 10)
+            return pyarrow.decimal128(precision, scale)
+        elif column_type == TYPE_DATE:
+            return pyarrow.date32()
+        elif column_type == TYPE_TIME:
+            return pyarrow.time32("s")
+        elif column_type == TYPE_DATETIME:
+            return pyarrow.timestamp("s")
+
+        return pyarrow.string()
+
+    def _write_parquet(self, plan, columns):
+        writer = self.parquet_writers.get(plan.table)
+
+        if writer is None:
+            schema = pyarrow.schema([(column, self._parquet_type(column)) for column in plan.columns])
+            writer = pyarrow.parquet.ParquetWriter(str(self.output_dir / ("%s.parquet" % plan.table)), schema)
+            self.parquet_writers[plan.table] = writer
+
+        arrays = []
+        for field, values in zip(writer.schema, columns):
+            if pyarrow.types.is_decimal(field.type):
+                # decimals are stored at the column's scale. more digits than that would be refused
+                quantum = Decimal(1).scaleb(-field.type.scale)
+                values = [None if value is None else value.quantize(quantum) for value in values]
+
+            arrays.append(pyarrow.array(values, type=field.type))
+
+        writer.write_table(pyarrow.Table.from_arrays(arrays, schema=writer.schema))
+
+    # numpy values for a template column
+    def _npy_array(self, column, values):
+        dtype = NPY_DTYPES.get(self.template.column_type(column))
+
+        if dtype is None:
+            return numpy.array(["" if value is None else str(value) for value in values], dtype=str)
+
+        if dtype == "float64":
+            return numpy.array([numpy.nan if value is None else float(value) for value in values], dtype=dtype)
+
+        if dtype == "timedelta64[s]":
+            return numpy.array(["NaT" if value is None else
+                                value.hour * 3600 + value.minute * 60 + value.second if isinstance(value, time) else
+                                int(value.total_seconds()) for value in values], dtype=dtype)
+
+        return numpy.array(["NaT" if value is None else value for value in values], dtype=dtype)
+
+    def _write_npy(self, plan, columns):
+        table_dir = self.output_dir / plan.table
+        table_dir.mkdir(exist_ok=True)
+
+        part = self.part_counts.get(plan.table, 0)
+
+        for column, values in zip(plan.columns, columns):
+            numpy.save(table_dir / ("%s.part%05d.npy" % (column, part)), self._npy_array(column, values))
+
+        self.part_counts[plan.table] = part + 1
+        self.part_columns[plan.table] = plan.columns
+
+    # join a table's part files into one .npy file per column
+    def _join_npy_parts(self, table):
+        table_dir = self.output_dir / table
+        part_count = self.part_counts[table]
+
+        for column in self.part_columns[table]:
+            part_files = [table_dir / ("%s.part%05d.npy" % (column, part)) for part in range(part_count)]
+            parts = [numpy.load(part_file, mmap_mode="r") for part_file in part_files]
+
+            # text parts are each as wide as their own longest value
+            dtype = numpy.result_type(*parts)
+
+            joined = numpy.lib.format.open_memmap(table_dir / ("%s.npy" % column), mode="w+", dtype=dtype,
+                                                  shape=(sum(len(part) for part in parts),))
+
+            offset = 0
+            for part in parts:
+                joined[offset:offset + len(part)] = part
+                offset += len(part)
+
+            joined.flush()
+            del joined, parts
+
+            for part_file in part_files:
+                part_file.unlink()
+
+    def close(self):
+        if self.closed:
+            return
+
+        self.closed = True
+
+        for writer in self.parquet_writers.values():
+            writer.close()
+
+        for table in self.part_counts:
+            self._join_npy_parts(table)
+
+        self.logger.info("Wrote %s files to %s" % (self.file_format, self.output_dir))
@@ -0,0 +1,97 @@
+import threading
+
+# weight of the newest measurement in the smoothed insert rate
+RATE_SMOOTHING = 0.5
+
+# commit sizes grow by at most this factor per commit, and halve on a back off
+GROWTH_MAX = 2.0
+
+
+# rows per commit for each destination table, adjusted as the import runs so each commit takes about target_seconds.
+#
+# after every commit the rows committed and the time the inserts and commit took give an insert rate for the table.
+# the next commit size is the smoothed rate times the target, growing at most GROWTH_MAX times per commit so one fast
+# commit doesn't overshoot. lock waits, deadlocks and failed inserts halve the size, since smaller transactions hold
+# fewer locks and cost less to replay.
+#
+# the sizes chosen for each table are kept for the import's report.
+
+class CommitSizer:
+
+    def __init__(self, initial_size, min_size, max_size, target_seconds):
+        self.initial_size = initial_size
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_seconds = target_seconds
+
+        # current size and smoothed rows per second, keyed by table. None for the statement mode insert list
+        self.sizes = {}
+        self.rates = {}
+
+        # commits, rows, seconds, smallest and largest size, and back offs, keyed by table
+        self.stats = {}
+
+        # shared by the writers of a pool or pipeline
+        self.lock = threading.Lock()
+
+    def size(self, table):
+        return self.sizes.get(table, self.initial_size)
+
+    # a commit of rows took seconds, inserts included
+    def record(self, table, rows, seconds):
+        if rows <= 0:
+            return
+
+        with self.lock:
+            rate = rows / max(seconds, 1e-6)
+
+            if table in self.rates:
+                rate = RATE_SMOOTHING * rate + (1 - RATE_SMOOTHING) * self.rates[table]
+            self.rates[table] = rate
+
+            size = self.size(table)
+            new_size = int(min(rate * self.target_seconds, size * GROWTH_MAX))
+
+            self.sizes[table] = min(max(new_size, self.min_size), self.max_size)
+
+            stats = self._stats(table)
+            stats["commits"] += 1
+            stats["rows"] += rows
+            stats["seconds"] += seconds
+            stats["min_size"] = min(stats["min_size"], size)
+            stats["max_size"] = max(stats["max_size"], size)
+
+    # halve the size for a table. None backs off every table
+    def back_off(self, table=None):
+        with self.lock:
+            tables = [table] if table is not None else list(self.sizes)
+
+            for table in tables:
+                self.sizes[table] = max(self.size(table) // 2, self.min_size)
+
+                # measure again at the smaller size rather than growing straight back
+                self.rates.pop(table, None)
+
+                self._stats(table)["back_offs"] += 1
+
+    def _stats(self, table):
+        if table not in self.stats:
+            self.stats[table] = dict(commits=0, rows=0, seconds=0.0, min_size=self.size(table),
+                                     max_size=self.size(table), back_offs=0)
+
+        return self.stats[table]
+
+    # a line per table describing the sizes it used
+    def report(self):
+        lines = []
+
+        for table in sorted(self.stats, key=str):
+            stats = self.stats[table]
+
+            average = stats["seconds"] / stats["commits"] if stats["commits"] > 0 else 0.0
+
+            lines.append("%s: %d rows per commit (%d-%d over %d commits, %.3f sec average, %d back offs)" %
+                         (table if table is not None else "all tables", self.size(table), stats["min_size"],
+                          stats["max_size"], stats["commits"], average, stats["back_offs"]))
+
+        return lines
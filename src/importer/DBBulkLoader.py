@@ -0,0 +1,206 @@
+from mysql.connector import Error
+from pathlib import Path
+
+import logging
+import shutil
+import tempfile
+import time
+
+from src.importer.DBImporter import DBImporter, DUPLICATE_POLICY_UPSERT
+from src.importer.ImportMetrics import STAGE_BUILD, STAGE_EXECUTE
+
+# duplicate key. LOAD DATA LOCAL skips duplicate rows with a warning rather than failing the load
+ER_DUP_ENTRY = 1062
+
+# SHOW WARNINGS lists at most max_error_count warnings. raise it to the server maximum for the session
+MAX_ERROR_COUNT = 65535
+
+# values are written in the default LOAD DATA field format: tab separated, newline terminated, backslash escaped
+TSV_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r", "\0": "\\0"})
+TSV_NULL = "\\N"
+
+
+# bulk-load sink for first-time imports into empty or near-empty tables.
+# entries are written to a tab separated file per destination table as they are added, and each file is loaded with
+# a single LOAD DATA LOCAL INFILE statement on execute.
+#
+# the server must allow local infile (local_infile=1, see docker/conf.d/my-custom.cnf).
+#
+# unlike INSERT, LOAD DATA LOCAL does not fail rows in strict mode. duplicate rows are skipped and values that don't
+# fit their column are coerced, both with a warning. skipped rows are reported as duplicates and the remaining
+# warnings as errors. with the upsert duplicate policy the load uses REPLACE, and duplicate rows overwrite the existing
+# rows instead.
+
+class DBBulkLoader(DBImporter):
+
+    def __init__(self, db_config_file):
+        super().__init__(db_config_file)
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        # temporary directory holding the load files. created on the first add
+        self.load_dir = None
+
+        # per destination table: open load file, db columns in file order, and rows written
+        self.load_files = {}
+        self.load_columns = {}
+        self.load_counts = {}
+
+    def _connection_options(self):
+        return {"allow_local_infile": True}
+
+    def pending_count(self):
+        return sum(self.load_counts.values())
+
+    # entry is a DataEntry object
+    def _add(self, entry):
+
+        # check if a schema is defined
+        if self.schema is None or len(self.schema) <= 0:
+            raise Exception("Database schema must be defined")
+
+        # get the table to store the entry
+        table = entry.get_db_destination()
+
+        if table not in self.load_files:
+            if self.load_dir is None:
+                self.load_dir = Path(tempfile.mkdtemp(prefix="nssk-bulk-load-%s-" % self.importer_name))
+                self.logger.info("Writing bulk load files to %s" % self.load_dir)
+
+            self.load_columns[table] = self._insert_plan(table).columns
+            self.load_files[table] = open(self.load_dir / ("%s.tsv" % table), 'w', encoding='utf-8', newline='')
+            self.load_counts[table] = 0
+
+        start_time = time.monotonic()
+
+        line = "\t".join(TSV_NULL if value is None else str(value).translate(TSV_ESCAPES)
+                         for value in self._insert_plan(table).values(entry))
+
+        self.load_files[table].write("%s\n" % line)
+
+        self.metrics.observe(STAGE_BUILD, time.monotonic() - start_time, table)
+
+        self.load_counts[table] += 1
+        self.added_count += 1
+
+    # load files live on disk, there is nothing to release
+    def flush(self):
+        for filehandle in self.load_files.values():
+            filehandle.flush()
+
+    def _close_files(self):
+        for filehandle in self.load_files.values():
+            if not filehandle.closed:
+                filehandle.close()
+
+    def _load_statement(self, table):
+        load_file = (self.load_dir / ("%s.tsv" % table)).as_posix()
+
+        # LOCAL loads IGNORE duplicates by default
+        duplicate_handling = "REPLACE " if self.duplicate_policy == DUPLICATE_POLICY_UPSERT else ""
+
+        return ("LOAD DATA LOCAL INFILE '%s' %sINTO TABLE %s CHARACTER SET utf8mb4 "
+                "FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' (%s);" %
+                (load_file, duplicate_handling, table, ",".join(self.load_columns[table])))
+
+    # dry run: keep the load files and print the statements that would load them
+    def dump(self):
+        self._close_files()
+
+        for table in self.load_files:
+            print("-- %d rows" % self.load_counts[table])
+            print("%s" % self._load_statement(table))
+
+        self._write_metrics()
+
+    def _load_table(self, table):
+
+        written = self.load_counts[table]
+
+        start_time = time.monotonic()
+        self.cursor.execute(self._load_statement(table))
+        self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, written)
+
+        loaded = self.cursor.rowcount
+        warning_count = self.cursor.warning_count
+
+        self._commit(self.connection, table, written)
+
+        warnings = []
+        if warning_count > 0:
+            self.cursor.execute("SHOW WARNINGS;")
+            warnings = self.cursor.fetchall()
+
+        # (Level, Code, Message)
+        for warning in warnings:
+            line = "-- %s: %s" % (table, warning[2])
+
+            if warning[1] == ER_DUP_ENTRY:
+                self.duplicates.append(line)
+            else:
+                self.logger.warning("Warning loading %s: %s" % (table, warning[2]))
+                self.errors.append((line, "MySQL warning %d" % warning[1]))
+
+        if self.duplicate_policy == DUPLICATE_POLICY_UPSERT:
+            # a replaced row is deleted and inserted again, counting as 2 affected rows. every warning is a coerced value
+            replaced = loaded - written
+
+            self.insert_count += written - replaced
+            self.updated_count += replaced
+            self.duplicate_count += replaced
+            self.error_count += warning_count
+        else:
+            # rows missing from the load were skipped as duplicates. any other warning is a coerced value on a row
+            # that was still loaded
+            skipped = written - loaded
+
+            self.insert_count += loaded
+            self.duplicate_count += skipped
+            self.error_count += max(warning_count - skipped, 0)
+
+        if warning_count > len(warnings):
+            self.logger.warning("Only %d of %d warnings loading %s were reported by the server" %
+                                (len(warnings), warning_count, table))
+
+        self._write_failures()
+        self._print_progress()
+
+    def execute(self):
+
+        if self.added_count <= 0:
+            raise Exception("no inserts to make")
+
+        self._close_files()
+
+        if self._connect():
+            try:
+                self.cursor.execute("SET SESSION max_error_count = %d;" % MAX_ERROR_COUNT)
+            except Error as e:
+                self.logger.warning("Could not raise max_error_count, some warnings may go unreported: %s" % e)
+
+            for table in self.load_files:
+                try:
+                    self._load_table(table)
+                except Error as e:
+                    # the load is a single statement. a failure rolls back the whole table
+                    self.logger.error("Error loading table %s: %s" % (table, e))
+                    self.failed = True
+                    self.dropped_count += self.load_counts[table]
+
+            self._close()
+
+            if self.show_progress:
+                self.progress.finish()
+        else:
+            self.failed = True
+            self.dropped_count += self.added_count
+
+        if self.failed:
+            msg = "Keeping bulk load files in %s" % self.load_dir
+            print("\n%s" % msg)
+            self.logger.warning(msg)
+        else:
+            shutil.rmtree(self.load_dir, ignore_errors=True)
+
+        self._write_reports()
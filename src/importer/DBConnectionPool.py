@@ -0,0 +1,142 @@
+from mysql.connector import connect, Error
+from contextlib import contextmanager
+
+import atexit
+import logging
+import threading
+
+from src.importer.DBConfig import DBConfig
+from src.importer.DBConfigFactory import DBConfigFactory
+
+# shared pools, keyed by config file and connection options
+POOLS = {}
+POOLS_LOCK = threading.Lock()
+
+
+# database connections shared across a run.
+#
+# the config file is read once, and connections are opened on demand and handed back to the pool when a caller is done
+# with them, so the connection handshake and authentication happen once per connection rather than once per phase,
+# sensor or flush. idle connections are checked with a ping before they're handed out again.
+#
+# the pool keeps the database password for as long as the process runs, so it can open new connections.
+
+class DBConnectionPool:
+
+    def __init__(self, config_file, connection_options):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        config = DBConfigFactory.build(config_file)
+
+        self.database = config[DBConfig.CONFIG_DBASE]
+
+        self.connection_args = dict(
+            host=config[DBConfig.CONFIG_HOST],
+            port=int(config[DBConfig.CONFIG_PORT]),
+            user=config[DBConfig.CONFIG_USER],
+            password=config[DBConfig.CONFIG_PASS],
+            database=config[DBConfig.CONFIG_DBASE],
+            **connection_options
+        )
+
+        config = None
+
+        self.idle = []
+        self.lock = threading.Lock()
+
+        self.opened_count = 0
+
+    # the shared pool for a config file, built on first use. connection_options are extra mysql.connector connection
+    # arguments
+    def get(config_file, connection_options=None):
+        if connection_options is None:
+            connection_options = {}
+
+        key = (config_file, tuple(sorted(connection_options.items())))
+
+        with POOLS_LOCK:
+            if key not in POOLS:
+                POOLS[key] = DBConnectionPool(config_file, connection_options)
+
+            return POOLS[key]
+
+    # close every idle connection in every pool. registered to run at exit
+    def close_all():
+        with POOLS_LOCK:
+            for pool in POOLS.values():
+                pool.close()
+
+    # an open connection, reused if one is idle
+    def acquire(self):
+
+        while True:
+            with self.lock:
+                if len(self.idle) <= 0:
+                    break
+
+                connection = self.idle.pop()
+
+            try:
+                connection.ping(reconnect=False)
+                return connection
+            except Error as e:
+                self.logger.info("Dropping dead pooled connection: %s" % e)
+                self.discard(connection)
+
+        connection = connect(**self.connection_args)
+
+        with self.lock:
+            self.opened_count += 1
+
+        self.logger.debug("Opened pooled connection %d" % self.opened_count)
+
+        return connection
+
+    # hand a connection back for reuse. anything left uncommitted is rolled back
+    def release(self, connection):
+        try:
+            connection.rollback()
+        except Error as e:
+            self.logger.info("Dropping pooled connection that failed to roll back: %s" % e)
+            self.discard(connection)
+            return
+
+        with self.lock:
+            self.idle.append(connection)
+
+    # close a connection that's broken or no longer wanted
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    # with pool.connection() as connection: ...
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        broken = False
+
+        try:
+            yield connection
+        except Error:
+            broken = True
+            raise
+        finally:
+            if broken:
+                self.discard(connection)
+            else:
+                self.release(connection)
+
+    def close(self):
+        with self.lock:
+            idle = self.idle
+            self.idle = []
+
+        for connection in idle:
+            self.discard(connection)
+
+
+atexit.register(DBConnectionPool.close_all)
@@ -1,15 +1,108 @@
-from mysql.connector import connect, Error, IntegrityError
-from datetime import datetime
+from mysql.connector import Error, IntegrityError, DataError
+from datetime import datetime, date, time as time_of_day, timedelta
+from itertools import chain
 
 import logging
-
-from src.importer.DBConfig import DBConfig
-from src.importer.DBConfigFactory import DBConfigFactory
+import re
+import threading
+import time
+
+from src.data.ColumnTypes import ColumnTypes
+from src.data.TableTemplate import TableTemplate
+from src.importer.ColumnBuffer import ColumnBuffer
+from src.importer.CommitSizer import CommitSizer
+from src.importer.DBConnectionPool import DBConnectionPool
+from src.importer.DBWritePipeline import DBWritePipeline, DEFAULT_PIPELINE_DEPTH
+from src.importer.FailureSink import FailureSink, FAILURE_COMPRESSIONS
+from src.importer.ImportMetrics import ImportMetrics, STAGE_BUILD, STAGE_EXECUTE, STAGE_COMMIT
+from src.importer.ImportProgress import ImportProgress
+from src.importer.InsertPlan import InsertPlan
+from src.importer.KeySet import KeySet
+from src.importer.MySQLSink import MySQLSink
 
 DEFAULT_COMMIT_SIZE = 100
 COMMIT_SIZE_MIN = 10
 COMMIT_SIZE_MAX = 50000
 
+# adaptive commit sizing aims for commits taking this long, inserts included
+DEFAULT_COMMIT_TARGET_SECONDS = 0.5
+COMMIT_TARGET_SECONDS_MIN = 0.05
+COMMIT_TARGET_SECONDS_MAX = 30
+
+# statement: one literal INSERT statement per row, executed one at a time
+# batch: rows held as parameter tuples per destination table and sent with executemany
+# multirow: rows held per destination table and sent as multi-row INSERT statements sized to max_allowed_packet
+# prepared: rows held per destination table and sent as multi-row server-side prepared statements, values in the binary
+# protocol rather than as text
+EXECUTE_MODE_STATEMENT = "statement"
+EXECUTE_MODE_BATCH = "batch"
+EXECUTE_MODE_MULTIROW = "multirow"
+EXECUTE_MODE_PREPARED = "prepared"
+
+EXECUTE_MODES = [
+    EXECUTE_MODE_STATEMENT,
+    EXECUTE_MODE_BATCH,
+    EXECUTE_MODE_MULTIROW,
+    EXECUTE_MODE_PREPARED
+]
+
+DEFAULT_EXECUTE_MODE = EXECUTE_MODE_STATEMENT
+
+# streaming mode flushes pending inserts to the database once either threshold is passed
+DEFAULT_FLUSH_ROWS = 50000
+DEFAULT_FLUSH_BYTES = 64 * 1024 * 1024
+FLUSH_ROWS_MIN = 100
+FLUSH_BYTES_MIN = 64 * 1024
+
+# multirow statements are sized to the server's max_allowed_packet, less some headroom, and capped so a single
+# statement doesn't hold a transaction open for too long. assume the mysql 5.7 default if the server won't say
+DEFAULT_MAX_ALLOWED_PACKET = 4 * 1024 * 1024
+MULTIROW_STATEMENT_BYTES_MAX = 16 * 1024 * 1024
+MULTIROW_PACKET_HEADROOM = 1024
+
+# most parameters a prepared statement can take. caps the rows per prepared statement
+PREPARED_PLACEHOLDERS_MAX = 65535
+
+# error: a duplicate row fails its insert and is reported with the full statement
+# ignore: INSERT IGNORE. the server skips duplicate rows and they're counted from the affected row count
+# upsert: as ignore, then rows in statements that hit duplicates are sent again with ON DUPLICATE KEY UPDATE so they
+# overwrite the existing rows
+DUPLICATE_POLICY_ERROR = "error"
+DUPLICATE_POLICY_IGNORE = "ignore"
+DUPLICATE_POLICY_UPSERT = "upsert"
+
+DUPLICATE_POLICIES = [
+    DUPLICATE_POLICY_ERROR,
+    DUPLICATE_POLICY_IGNORE,
+    DUPLICATE_POLICY_UPSERT
+]
+
+DEFAULT_DUPLICATE_POLICY = DUPLICATE_POLICY_ERROR
+
+# key values are compared in a canonical text form so keys read from the dump match keys read back from the database.
+# 2021-03-29T14:00:00, 2021/03/29 14:00:00 and datetime(2021, 3, 29, 14) are all 2021-03-29 14:00:00
+KEY_TIMESTAMP_PATTERN = re.compile(r'^(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?$')
+KEY_TIME_PATTERN = re.compile(r'^(\d{1,2}):(\d{2})(?::(\d{2}))?$')
+
+# errors worth reconnecting and retrying for: lost or refused connections and lock conflicts. anything else fails the
+# import. 2003 can't connect, 2006 server gone away, 2013 and 2055 lost connection, 1205 lock wait timeout, 1213 deadlock
+TRANSIENT_ERRNOS = {2003, 2006, 2013, 2055, 1205, 1213}
+
+# lock conflicts. adaptive commit sizing backs off on these
+LOCK_ERRNOS = {1205, 1213}
+
+# reconnect attempts after a transient error, waiting twice as long after each failed attempt
+RECONNECT_ATTEMPTS = 6
+RECONNECT_BACKOFF_SECONDS = 1
+RECONNECT_BACKOFF_MAX_SECONDS = 30
+
+# parallel writers, each with its own connection. keep well under the server's max_connections
+DEFAULT_WRITER_COUNT = 1
+WRITER_COUNT_MAX = 8
+
+# every failed row is counted by reason. duplicates all share one
+DUPLICATE_REASON = "Duplicate entry"
+
 
 class DBImporter:
 
@@ -27,54 +120,342 @@ class DBImporter:
 
         self.commit_size = DEFAULT_COMMIT_SIZE
 
+        # adaptive mode: rows per commit for each table, adjusted toward a target commit duration. see CommitSizer
+        self.commit_sizer = None
+
+        self.execute_mode = DEFAULT_EXECUTE_MODE
+
+        self.duplicate_policy = DEFAULT_DUPLICATE_POLICY
+
+        # upsert policy: ON DUPLICATE KEY UPDATE clause for the schema columns. built on first use
+        self.upsert_suffix = None
+
         self.schema = None
         self.schema_mapping = None
 
+        # typed values: dump values are converted to the type of their column as they're added. column types keyed by
+        # dump field, read from the table template unless they're set. see ColumnTypes
+        self.typed = False
+        self.column_types = None
+
+        # dump fields making up the destination tables' primary key
+        self.key_fields = None
+
+        # skip pending rows whose key is already in the database or was already sent. keys seen so far, the range of
+        # the leading key column already read back from the database, and the keys of pending rows, known once they're
+        # committed, keyed by destination table
+        self.skip_existing = False
+        self.known_keys = {}
+        self.prefetched_ranges = {}
+        self.pending_keys = {}
+
+        # incremental mode: dump rows older than the newest row already in their destination table are dropped before
+        # they're parsed. dump fields making up the row timestamp, and the newest timestamp and rows dropped keyed by
+        # destination table. tables with no rows have no watermark
+        self.incremental = False
+        self.timestamp_fields = None
+        self.watermarks = {}
+        self.watermark_skipped = {}
+
+        # dry run to a SQL script: flushes are written to the script instead of the database. see SQLDumpWriter
+        self.sql_dump = None
+
+        # where flushes are written: the configured mysql database, or a SQLite database or columnar files. see
+        # StorageSink. setup/sql template the destination tables are laid out by. writers share their owning importer's
+        # sink, and only the owner closes it
+        self.storage_sink = MySQLSink()
+        self.owns_storage_sink = True
+        self.table_template = None
+
+        # statement mode: literal insert statements in the order they were added
         self.inserts = []
 
+        # insert plan for each destination table, compiled when the first row for the table is added. see InsertPlan
+        self.insert_plans = {}
+
+        # batch mode: pending rows, keyed by destination table. see ColumnBuffer
+        self.batch_rows = {}
+
+        # batch mode: rows flushed and null values in each column, keyed by destination table, for the report
+        self.table_counts = {}
+        self.null_counts = {}
+
+        # streaming mode: write pending inserts whenever a flush threshold is passed instead of holding the
+        # entire dump until execute
+        self.streaming = False
+        self.flush_rows = DEFAULT_FLUSH_ROWS
+        self.flush_bytes = DEFAULT_FLUSH_BYTES
+
+        # pipelined mode: flushes are written by a background thread while more entries are added. see DBWritePipeline
+        self.pipelined = False
+        self.pipeline_depth = DEFAULT_PIPELINE_DEPTH
+        self.write_pipeline = None
+
+        # held while an entry is added, so several producer threads can feed one importer
+        self.lock = threading.RLock()
+
+        # approximate size of the pending inserts
+        self.pending_bytes = 0
+
+        # total rows handed to add, including rows already flushed
+        self.added_count = 0
+
+        # taken from the shared connection pool on the first flush, handed back by execute
+        self.connection_pool = None
+        self.connection = None
+        self.cursor = None
+
+        # prepared mode: cursor for server-side prepared statements, opened on first use
+        self.prepared_cursor = None
+
+        # read from the server when the connection is opened
+        self.max_allowed_packet = DEFAULT_MAX_ALLOWED_PACKET
+
+        # with more than one writer, flushes are handed to a writer pool that splits destination tables across
+        # several connections. built on the first flush
+        self.writer_count = DEFAULT_WRITER_COUNT
+        self.writer_pool = None
+
+        # writers in a pool leave progress output to the pool
+        self.show_progress = True
+        self.progress = ImportProgress()
+
+        # stage timings and counts, written out at the end of the run if asked for. see ImportMetrics
+        self.metrics = ImportMetrics()
+
+        # set when the database can't be reached or an insert fails hard. later flushes are dropped
+        self.failed = False
+        self.dropped_count = 0
+
+        # pending rows already committed, keyed by destination table (None in statement mode), and the counts as of
+        # the last commit. a flush interrupted by a transient error resumes from here after reconnecting
+        self.committed_offsets = {}
+        self.committed_counts = None
+
+        # checkpoint saved after every flush, and the number of dump rows read as of the last add
+        self.checkpoint = None
+        self.position = 0
+
+        # outcome of the import, accumulated across flushes
+        self.insert_count = 0
+        self.updated_count = 0
+        self.skipped_count = 0
+        self.duplicate_count = 0
+        self.error_count = 0
+
+        # failed statements of the current flush: duplicate inserts, and (insert, reason) for other failed inserts.
+        # moved to the failure sinks once the flush is done
+        self.duplicates = []
+        self.errors = []
+
+        # duplicates and errors reports, written as flushes complete. built on the first failure. writers leave their
+        # failures to the importer that owns them. see FailureSink
+        self.report_failures = True
+        self.duplicate_sink = None
+        self.error_sink = None
+        self.failure_limit = None
+        self.failure_sample_first = None
+        self.failure_sample_every = 1
+        self.failure_compression = None
+
     def set_importer_name(self, new_name):
         self.importer_name = new_name
 
+    # share a progress reporter with the caller, so rows read and rows written are shown together
+    def set_progress(self, progress):
+        self.progress = progress
+
+    def set_metrics(self, metrics):
+        self.metrics = metrics
+
     def set_commit_size(self, size):
         if COMMIT_SIZE_MIN <= size <= COMMIT_SIZE_MAX:
             self.commit_size = size
         else:
             self.logger.warning("Rejecting invalid commit size")
 
-    # set the schema to expect for the data, and to inform construction of inserts.
-    # schema should be an ordered array of fields.
-    # must be defined before invocations of add
-    def set_schema(self, schema):
-        self.schema = schema
+    # adjust the rows per commit for each destination table so commits take about target_seconds, starting from the
+    # commit size. multirow statements are also capped at the commit size
+    def set_adaptive_commit(self, target_seconds):
+        if COMMIT_TARGET_SECONDS_MIN <= target_seconds <= COMMIT_TARGET_SECONDS_MAX:
+            self.commit_sizer = CommitSizer(self.commit_size, COMMIT_SIZE_MIN, COMMIT_SIZE_MAX, target_seconds)
+        else:
+            self.logger.warning("Rejecting invalid commit target")
 
-    def set_schema_mapping(self, schema_mapping):
-        self.schema_mapping = schema_mapping
+    # rows to commit at a time for a table. None for the statement mode insert list
+    def _commit_size(self, table):
+        if self.commit_sizer is not None:
+            return self.commit_sizer.size(table)
 
-    # entry is a DataEntry object
-    def add(self, entry):
+        return self.commit_size
 
-        # TODO: constraints around entry object
-        # is entry a subclass of DataEntry?
-        # is the entry object value collection the same size as the schema?
+    # a commit of rows to a table took seconds, inserts included
+    def _record_commit(self, table, rows, seconds):
+        if self.commit_sizer is not None:
+            self.commit_sizer.record(table, rows, seconds)
 
-        # check if a schema is defined
-        if self.schema is None or len(self.schema) <= 0:
-            raise "Database schema must be defined"
+    # lock conflicts or failed inserts. smaller commits from here on. table None backs off every table
+    def _back_off_commits(self, table=None):
+        if self.commit_sizer is not None:
+            self.commit_sizer.back_off(table)
+
+    # must be set before invocations of add
+    def set_execute_mode(self, mode):
+        if mode in EXECUTE_MODES:
+            self.execute_mode = mode
+        else:
+            self.logger.warning("Rejecting invalid execute mode %s" % mode)
+
+    # how rows that already exist in the database are handled. must be set before invocations of add
+    def set_duplicate_policy(self, policy):
+        if policy in DUPLICATE_POLICIES:
+            self.duplicate_policy = policy
+            self.insert_plans = {}
+        else:
+            self.logger.warning("Rejecting invalid duplicate policy %s" % policy)
+
+    # write to several destination tables in parallel, one connection per writer.
+    # needs an insert mode that groups rows by table
+    def set_writer_count(self, count):
+        if 1 <= count <= WRITER_COUNT_MAX:
+            self.writer_count = count
+        else:
+            self.logger.warning("Rejecting invalid writer count")
+
+    # most failed rows to write to each report. failures past the limit are only counted
+    def set_failure_limit(self, limit):
+        if limit >= 0:
+            self.failure_limit = limit
+        else:
+            self.logger.warning("Rejecting invalid failure limit")
+
+    # write the first failed rows of each report, then one in every. counts stay exact
+    def set_failure_sampling(self, first, every):
+        if first >= 0 and every >= 1:
+            self.failure_sample_first = first
+            self.failure_sample_every = every
+        else:
+            self.logger.warning("Rejecting invalid failure sampling")
+
+    # compress the failure reports, gz or xz
+    def set_failure_compression(self, compression):
+        if compression in FAILURE_COMPRESSIONS:
+            self.failure_compression = compression
+        else:
+            self.logger.warning("Rejecting invalid failure compression %s" % compression)
+
+    # a sink for failed rows with the failure report settings. file_name is completed with the compression extension
+    def build_failure_sink(self, file_name):
+        if self.failure_compression is not None:
+            file_name = "%s.%s" % (file_name, self.failure_compression)
+
+        return FailureSink(file_name, self.failure_limit, self.failure_sample_first, self.failure_sample_every)
+
+    # flush to the database as entries are added, keeping memory use bounded by the flush thresholds
+    def set_streaming(self, streaming):
+        self.streaming = streaming
 
-        statement = "INSERT INTO"
+    # dry run: write inserts to a SQL script as they're flushed, rather than printing them all at the end
+    def set_sql_dump(self, sql_dump):
+        self.sql_dump = sql_dump
 
-        # build fields segment based on db schema
+    # setup/sql template of the destination tables. storage sinks lay tables out by it, and typed imports convert values
+    # to its column types
+    def set_table_template(self, table_template):
+        self.table_template = table_template
+        self.insert_plans = {}
 
-        # INSERT INTO table_name (column1, column2, column3, ...)
-        # VALUES (value1, value2, value3, ...);
+    # write flushes to a storage sink other than the database. needs an insert mode that groups rows by table
+    def set_storage_sink(self, storage_sink):
+        self.storage_sink = storage_sink
 
-        # INSERT INTO Customers (CustomerName, ContactName, Address, City, PostalCode, Country)
-        # VALUES ('Cardinal', 'Tom B. Erichsen', 'Skagen 21', 'Stavanger', '4006', 'Norway');
+    # write flushes in the background while entries are still being added. needs streaming
+    def set_pipelined(self, pipelined):
+        self.pipelined = pipelined
 
-        fields_segment = "("
-        values_segment = "VALUES ("
+    def set_flush_rows(self, rows):
+        if rows >= FLUSH_ROWS_MIN:
+            self.flush_rows = rows
+        else:
+            self.logger.warning("Rejecting invalid flush row threshold")
+
+    def set_flush_bytes(self, size):
+        if size >= FLUSH_BYTES_MIN:
+            self.flush_bytes = size
+        else:
+            self.logger.warning("Rejecting invalid flush byte threshold")
+
+    # set the schema to expect for the data, and to inform construction of inserts.
+    # schema should be an ordered array of fields.
+    # must be defined before invocations of add
+    def set_schema(self, schema):
+        self.schema = schema
+        self.upsert_suffix = None
+        self.insert_plans = {}
+
+    def set_schema_mapping(self, schema_mapping):
+        self.schema_mapping = schema_mapping
+        self.upsert_suffix = None
+        self.insert_plans = {}
+
+    # types of the destination table columns, keyed by dump field, in place of the table template's. fields not listed
+    # are text
+    def set_column_types(self, column_types):
+        self.column_types = column_types
+        self.insert_plans = {}
+
+    # convert values to the types of their columns as they're added, rather than sending text for the server to parse.
+    # needs column types. must be set before invocations of add
+    def set_typed(self, typed):
+        self.typed = typed
+        self.insert_plans = {}
+
+    # dump fields making up the primary key of every destination table, leading column first
+    def set_key_fields(self, key_fields):
+        self.key_fields = key_fields
+
+    # save a checkpoint of the import after every flush. see ImportCheckpoint
+    def set_checkpoint(self, checkpoint):
+        self.checkpoint = checkpoint
+
+    # number of dump rows read so far, including the row about to be added. recorded in checkpoints
+    def set_position(self, position):
+        self.position = position
+
+    # pick up the counts of an interrupted import from its checkpoint
+    def restore(self, state):
+        self.added_count = state["added_count"]
+        self.insert_count = state["insert_count"]
+        self.updated_count = state["updated_count"]
+        self.duplicate_count = state["duplicate_count"]
+        self.error_count = state["error_count"]
+        self.skipped_count = state["skipped_count"]
+        self.dropped_count = state["dropped_count"]
+
+    # dump fields making up the row timestamp, date first. combined with a space if there is more than one
+    def set_timestamp_fields(self, timestamp_fields):
+        self.timestamp_fields = timestamp_fields
+
+    # only import rows at or after the newest row in their destination table. see read_watermarks and is_new
+    def set_incremental(self, incremental):
+        self.incremental = incremental
+
+    # read existing keys back from the database and drop rows that are already there, or repeated in the dump, before
+    # they're sent. needs key fields and an insert mode that groups rows by table
+    def set_skip_existing(self, skip_existing):
+        self.skip_existing = skip_existing
+
+    # total number of rows waiting to be written
+    def pending_count(self):
+        if self.execute_mode != EXECUTE_MODE_STATEMENT:
+            return sum(len(rows) for rows in self.batch_rows.values())
+
+        return len(self.inserts)
+
+    # resolve the db column names for the schema, applying the schema mapping if there is one
+    def _resolve_columns(self):
+        columns = []
 
-        # build values
         for field in self.schema:
 
             # remap field if we have a defined mapping
@@ -82,173 +463,1064 @@ class DBImporter:
                 mapped_field = self.schema_mapping[field]
                 if mapped_field is not None:
                     self.logger.debug("Remapping dump field '%s' to db field '%s'" % (field, mapped_field))
-                    fields_segment += "%s," % mapped_field
+                    columns.append(mapped_field)
                 else:
                     msg = "Could not resolve field mapping for %s: " % field
                     self.logger.error(msg)
                     raise Exception(msg)
             else:
                 # no mapping
-                fields_segment += "%s," % field
+                columns.append(field)
 
-            # convert py None values to mysql NULL values
-            if entry.is_defined(field):
-                value = entry.get(field)
-                if value is None:
-                    values_segment += "NULL,"
-                else:
-                    values_segment += "'%s'," % value
-            else:
-                values_segment += "NULL,"
+        return columns
+
+    # the insert plan for a destination table, compiled on first use
+    def _insert_plan(self, table):
+        plan = self.insert_plans.get(table)
+
+        if plan is None:
+            columns = self._resolve_columns()
+
+            column_types = self.column_types
+            if column_types is None and self.table_template is not None:
+                column_types = TableTemplate(self.table_template).field_types(self.schema, columns)
+
+            converters = None
+            if self.typed and column_types is not None:
+                converters = ColumnTypes.converters(self.schema, column_types)
+
+            plan = InsertPlan(table, self.schema, columns, self.duplicate_policy != DUPLICATE_POLICY_ERROR, converters)
+            self.insert_plans[table] = plan
 
-        # chop trailing comma if there is one at the end
-        if fields_segment[-1] == ",":
-            fields_segment = fields_segment.rstrip(", ")
+        return plan
 
-        # chop trailing comma if there is one at the end
-        if values_segment[-1] == ",":
-            values_segment = values_segment.rstrip(", ")
+    # AS new ON DUPLICATE KEY UPDATE column1=new.column1, column2=new.column2, ...
+    def _build_upsert_suffix(self):
+        if self.upsert_suffix is None:
+            self.upsert_suffix = (" AS new ON DUPLICATE KEY UPDATE " +
+                                  ",".join("%s=new.%s" % (column, column) for column in self._resolve_columns()))
 
-        # close segments
-        fields_segment += ") "
-        values_segment += ");"
+        return self.upsert_suffix
 
-        # entry is a DataEntry
-        # entry fields
+    # entry is a DataEntry object. safe to call from several threads
+    def add(self, entry):
+        with self.lock:
+            self._add(entry)
+
+    def _add(self, entry):
+
+        # TODO: constraints around entry object
+        # is entry a subclass of DataEntry?
+        # is the entry object value collection the same size as the schema?
+
+        # check if a schema is defined
+        if self.schema is None or len(self.schema) <= 0:
+            raise Exception("Database schema must be defined")
 
         # get the table to store the entry
         table = entry.get_db_destination()
 
-        statement += (" " + table + " " + fields_segment + values_segment)
+        start_time = time.monotonic()
+
+        plan = self.insert_plans.get(table)
+        if plan is None:
+            plan = self._insert_plan(table)
+
+        values = plan.values(entry)
+
+        if self.execute_mode != EXECUTE_MODE_STATEMENT:
+            rows = self.batch_rows.get(table)
+            if rows is None:
+                rows = self.batch_rows[table] = ColumnBuffer(len(plan.fields))
+
+            rows.append(values)
+
+            self.pending_bytes += plan.size(values)
+        else:
+            insert = plan.literal(values)
+            self.inserts.append(insert)
+
+            self.pending_bytes += len(insert)
+
+        self.metrics.observe(STAGE_BUILD, time.monotonic() - start_time, table)
+
+        self.added_count += 1
+
+        if self.streaming and (self.pending_count() >= self.flush_rows or self.pending_bytes >= self.flush_bytes):
+            self.flush()
 
-        self.inserts.append(statement)
+    # canonical key for a row's key values
+    def _build_key(self, values):
+        key = []
 
-        #TODO call execute if inserts grows to large
+        for value in values:
+            if isinstance(value, datetime):
+                value = value.strftime("%Y-%m-%d %H:%M:%S")
+            elif isinstance(value, date):
+                value = value.strftime("%Y-%m-%d")
+            elif isinstance(value, timedelta):
+                # mysql TIME
+                seconds = int(value.total_seconds())
+                value = "%02d:%02d:%02d" % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+            elif isinstance(value, time_of_day):
+                value = value.strftime("%H:%M:%S")
+            elif value is not None:
+                value = str(value)
 
-    # dump our inserts. for debugging
+                canonical = self._canonical_timestamp(value)
+                if canonical is not None:
+                    value = canonical
+
+            key.append(value)
+
+        return tuple(key)
+
+    # canonical text for a date, time or timestamp string, or None if it isn't one
+    def _canonical_timestamp(self, value):
+        match = KEY_TIMESTAMP_PATTERN.match(value)
+        if match is not None:
+            canonical = "%s-%02d-%02d" % (match.group(1), int(match.group(2)), int(match.group(3)))
+            if match.group(4) is not None:
+                canonical += " %02d:%s:%s" % (int(match.group(4)), match.group(5), match.group(6) or "00")
+
+            return canonical
+
+        match = KEY_TIME_PATTERN.match(value)
+        if match is not None:
+            return "%02d:%s:%s" % (int(match.group(1)), match.group(2), match.group(3) or "00")
+
+        return None
+
+    # incremental mode: read the newest row timestamp of each destination table. call once, before reading the dump
+    def read_watermarks(self, tables):
+
+        if not self.incremental:
+            return
+
+        if self.timestamp_fields is None:
+            self.logger.warning("Incremental import needs timestamp fields, importing every row")
+            return
+
+        if not self._connect():
+            self.logger.warning("Could not read watermarks, importing every row")
+            return
+
+        columns = self._resolve_columns()
+        timestamp_columns = [columns[self.schema.index(field)] for field in self.timestamp_fields]
+
+        if len(timestamp_columns) > 1:
+            # mysql TIMESTAMP(date, time)
+            timestamp_expression = "TIMESTAMP(%s)" % ",".join(timestamp_columns)
+        else:
+            timestamp_expression = timestamp_columns[0]
+
+        for table in tables:
+            try:
+                self.cursor.execute("SELECT MAX(%s) FROM %s;" % (timestamp_expression, table))
+                newest = self.cursor.fetchone()[0]
+            except Error as e:
+                self.logger.warning("Could not read watermark for %s, importing every row: %s" % (table, e))
+                continue
+
+            self.watermarks[table] = None if newest is None else self._build_key([newest])[0]
+            self.watermark_skipped[table] = 0
+
+            self.logger.info("Watermark for %s: %s" % (table, self.watermarks[table]))
+
+    # incremental mode: whether a raw dump row, before it's built into a DataEntry, is at or after its destination
+    # table's watermark. rows at the watermark are kept, the table may only have some of them.
+    # rows without a readable timestamp are kept and left to validation
+    def is_new(self, table, row):
+
+        watermark = self.watermarks.get(table)
+        if watermark is None:
+            return True
+
+        values = [row.get(field) for field in self.timestamp_fields]
+        if None in values:
+            return True
+
+        timestamp = self._canonical_timestamp(" ".join(str(value) for value in values))
+        if timestamp is None or timestamp >= watermark:
+            return True
+
+        self.watermark_skipped[table] += 1
+        return False
+
+    # read the keys of existing rows whose leading key column is between lower and upper into the table's key set
+    def _prefetch_keys(self, table, key_columns, lower, upper):
+        self.logger.debug("Reading existing keys from %s between %s and %s" % (table, lower, upper))
+
+        self.cursor.execute("SELECT %s FROM %s WHERE %s BETWEEN %%s AND %%s" %
+                            (",".join(key_columns), table, key_columns[0]), (lower, upper))
+
+        self.known_keys[table].update(self._build_key(row) for row in self.cursor)
+
+    # drop pending rows whose key is already in the database, was already sent during this import, or is repeated in
+    # the pending rows. existing keys are read back for the part of the pending rows' leading key range that hasn't been
+    # read yet. the kept rows' keys are only known once they're committed, see _record_pending_keys
+    def _skip_known_rows(self):
+
+        if self.key_fields is None or self.execute_mode == EXECUTE_MODE_STATEMENT:
+            self.logger.warning("Skipping existing rows needs key fields and a per-table insert mode, sending all rows")
+            self.skip_existing = False
+            return
+
+        key_indexes = [self.schema.index(field) for field in self.key_fields]
+
+        columns = self._resolve_columns()
+        key_columns = [columns[i] for i in key_indexes]
+
+        for table, rows in self.batch_rows.items():
+
+            if len(rows) <= 0:
+                continue
+
+            keys = [self._build_key(values) for values in zip(*(rows.column(i) for i in key_indexes))]
+
+            if table not in self.known_keys:
+                self.known_keys[table] = KeySet()
+
+            # canonical dates and timestamps order the same as text. primary key columns can't be null, rows
+            # without a leading key value are left for the server to reject
+            lower = min((key[0] for key in keys if key[0] is not None), default=None)
+            upper = max((key[0] for key in keys if key[0] is not None), default=None)
+
+            try:
+                if lower is not None and table not in self.prefetched_ranges:
+                    self._prefetch_keys(table, key_columns, lower, upper)
+
+                    self.prefetched_ranges[table] = (lower, upper)
+
+                elif lower is not None:
+                    prefetched_lower, prefetched_upper = self.prefetched_ranges[table]
+
+                    if lower < prefetched_lower:
+                        self._prefetch_keys(table, key_columns, lower, prefetched_lower)
+                    if upper > prefetched_upper:
+                        self._prefetch_keys(table, key_columns, prefetched_upper, upper)
+
+                    self.prefetched_ranges[table] = (min(lower, prefetched_lower), max(upper, prefetched_upper))
+
+            except Error as e:
+                # existing rows go to the database and are handled by the duplicate policy
+                self.logger.warning("Could not read existing keys from %s: %s" % (table, e))
+
+            known_keys = self.known_keys[table]
+            kept_keys = set()
+            kept_indexes = []
+
+            for i, key in enumerate(keys):
+                if key in known_keys or key in kept_keys:
+                    self.skipped_count += 1
+                else:
+                    kept_keys.add(key)
+                    kept_indexes.append(i)
+
+            self.pending_keys[table] = kept_keys
+
+            if len(kept_indexes) < len(rows):
+                self.logger.info("Skipping %d known rows for %s" % (len(rows) - len(kept_indexes), table))
+
+                self.batch_rows[table] = rows.select(kept_indexes)
+
+    # the pending rows are committed. later flushes skip rows repeating their keys. rows that weren't committed are left
+    # out, so a repeat of one is sent again rather than lost
+    def _record_pending_keys(self):
+        for table, keys in self.pending_keys.items():
+            self.known_keys[table].update(keys)
+
+        self.pending_keys = {}
+
+    # dump our inserts. for debugging, or a dry run
     def dump(self):
 
-        for insert in self.inserts:
-            print("%s" % insert)
+        if self.sql_dump is not None:
+            self.flush()
+            self.sql_dump.close()
 
-    # execute insert statements in bulk
-    def execute(self):
+            if self.show_progress:
+                self.progress.finish()
 
-        total_inserts = len(self.inserts)
+            msg = ("Wrote %d inserts in %d statements to %s" %
+                   (self.sql_dump.row_count, self.sql_dump.statement_count, self.sql_dump.dump_file))
+            print(msg)
+            self.logger.info(msg)
 
-        if total_inserts <= 0:
-            raise Exception("no inserts to make")
+            self._write_metrics()
+            return
+
+        if self.execute_mode != EXECUTE_MODE_STATEMENT:
+            for table, rows in self.batch_rows.items():
+                plan = self._insert_plan(table)
+                for row in rows:
+                    print("%s" % plan.literal(row))
+        else:
+            for insert in self.inserts:
+                print("%s" % insert)
 
-        config = DBConfigFactory.build(self.db_config_file)
+        self._write_metrics()
 
-        print("Starting import...")
+    # writers: pool writers still running, whose counts haven't been merged yet
+    def _print_progress(self, writers=()):
+        if not self.show_progress:
+            return
 
-        insert_count = 0
-        duplicate_count = 0
-        error_count = 0
+        self.progress.wrote(self.insert_count + sum(writer.insert_count for writer in writers),
+                            self.added_count,
+                            self.duplicate_count + sum(writer.duplicate_count for writer in writers),
+                            self.error_count + sum(writer.error_count for writer in writers))
 
-        duplicates = []
-        errors = []
+    # run a single insert, recording duplicates and errors. returns True if the row was written
+    def _execute_one(self, cursor, insert, params=None, failed_insert=None):
+
+        # literal statement to report if the insert fails
+        if failed_insert is None:
+            failed_insert = insert
 
-        # build database connection
         try:
-            with connect(
-                    host=config[DBConfig.CONFIG_HOST],
-                    port=int(config[DBConfig.CONFIG_PORT]),
-                    user=config[DBConfig.CONFIG_USER],
-                    password=config[DBConfig.CONFIG_PASS],
-                    database=config[DBConfig.CONFIG_DBASE],
-            ) as connection:
+            if self.duplicate_policy != DUPLICATE_POLICY_ERROR:
+                return self._execute_counted(cursor, cursor.execute, insert, params, 1) > 0
+
+            cursor.execute(insert, params)
+            return True
+
+        except IntegrityError as e:
+
+            # print("error: %s " % e.args[1])
+
+            # Arguments: (IntegrityError(1062, "1062 (23000): Duplicate entry '2019-06-12-10:00:00-Temperature, water' for key 'WAGG01.PRIMARY'", '23000'),)
+            if " Duplicate entry " in e.args[1] and " for key " in e.args[1]:
+
+                self.logger.warning(
+                    "Attempted to insert duplicate row:\n%s\nContinuing..." % failed_insert)
+                self.duplicate_count += 1
+
+                self.duplicates.append(failed_insert)
+            else:
+                # problem but not a duplicate row
+                raise e
+        except Error as e:
+            if e.errno in TRANSIENT_ERRNOS:
+                raise e
+
+            self.logger.warning("Error running an insert:\n%s\nContinuing...\n" % failed_insert)
+            self.logger.warning(e)
+
+            self.errors.append((failed_insert, FailureSink.reason(e)))
+
+            self.error_count += 1
+
+        return False
+
+    # ignore and upsert policies: run an INSERT IGNORE of row_count rows with execute (cursor.execute or
+    # cursor.executemany) and count the outcome from the affected rows instead of one exception per duplicate.
+    # returns the number of rows inserted
+    def _execute_counted(self, cursor, execute, statement, params, row_count):
+
+        statement = statement.rstrip(";")
+
+        execute(statement, params)
+
+        inserted = cursor.rowcount
+        duplicates = row_count - inserted
+
+        # IGNORE turns duplicate keys and values that don't fit their column into warnings. warnings beyond the skipped
+        # rows are coerced values on rows that were still written
+        self.duplicate_count += duplicates
+        self.error_count += max(cursor.warning_count - duplicates, 0)
+
+        if duplicates > 0 and self.duplicate_policy == DUPLICATE_POLICY_UPSERT:
+            # rows inserted by the first pass are unchanged by the second. a changed row counts as 2 affected rows
+            execute(statement + self._build_upsert_suffix(), params)
+            self.updated_count += cursor.rowcount // 2
+
+        return inserted
+
+    # one cursor.execute per literal statement
+    def _execute_statements(self, connection, cursor):
+
+        uncommitted = 0
+        start_time = time.monotonic()
 
-                config[DBConfig.CONFIG_PASS] = None
-                config = None
+        # run inserts
+        for i in range(self.committed_offsets.get(None, 0), len(self.inserts)):
+
+            execute_start_time = time.monotonic()
+            inserted = self._execute_one(cursor, self.inserts[i])
+            self.metrics.observe(STAGE_EXECUTE, time.monotonic() - execute_start_time)
+
+            if inserted:
+
+                self.insert_count += 1
+                uncommitted += 1
+
+                # commit every commit size inserts
+                if uncommitted >= self._commit_size(None):
+                    self._commit(connection, None, uncommitted)
+                    self._mark_committed(None, i + 1)
+                    self._record_commit(None, uncommitted, time.monotonic() - start_time)
+
+                    uncommitted = 0
+                    start_time = time.monotonic()
+
+            self._print_progress()
+
+        # commit remaining inserts
+        self._commit(connection, None, uncommitted)
+        self._mark_committed(None, len(self.inserts))
+        self._record_commit(None, uncommitted, time.monotonic() - start_time)
+
+    # executemany per table, commit size rows at a time
+    def _execute_batches(self, connection, cursor):
+
+        for table, rows in self.batch_rows.items():
+
+            plan = self._insert_plan(table)
+            statement = plan.statement
+
+            i = self.committed_offsets.get(table, 0)
+            while i < len(rows):
+                chunk = rows[i:i + self._commit_size(table)]
+                start_time = time.monotonic()
 
                 try:
-                    with connection.cursor() as cursor:
+                    # mysql.connector rewrites an executemany INSERT into a single multi-row INSERT
+                    if self.duplicate_policy != DUPLICATE_POLICY_ERROR:
+                        self.insert_count += self._execute_counted(cursor, cursor.executemany, statement, chunk,
+                                                                   len(chunk))
+                    else:
+                        cursor.executemany(statement, chunk)
+                        self.insert_count += len(chunk)
+
+                    self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(chunk))
+                    self._commit(connection, table, len(chunk))
 
-                        insert_count = 0
+                    self._record_commit(table, len(chunk), time.monotonic() - start_time)
 
-                        # print out an initial count of 0 otherwise it appears to hang
-                        print("\r\t%d / %d" % (insert_count, total_inserts), end='', flush=True)
+                except Error as e:
+                    if e.errno in TRANSIENT_ERRNOS:
+                        raise e
 
-                        # run inserts
-                        for insert in self.inserts:
+                    self._back_off_commits(table)
 
-                            try:
-                                cursor.execute(insert)
+                    # a single duplicate or bad value fails the whole multi-row insert and nothing in the chunk
+                    # is written. replay the chunk row by row to isolate the failures
+                    self.logger.debug("Batch insert into %s failed, replaying %d rows individually: %s" %
+                                      (table, len(chunk), e))
 
-                                # commit every COMMIT_SIZE inserts
-                                if insert_count % self.commit_size == 0:
-                                    connection.commit()
+                    for row in chunk:
+                        if self._execute_one(cursor, statement, row, plan.literal(row)):
+                            self.insert_count += 1
 
-                                insert_count += 1
+                    self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(chunk))
+                    self._commit(connection, table, len(chunk))
 
-                            except IntegrityError as e:
+                i += len(chunk)
+                self._mark_committed(table, i)
 
-                                # print("error: %s " % e.args[1])
+                self._print_progress()
 
-                                # Arguments: (IntegrityError(1062, "1062 (23000): Duplicate entry '2019-06-12-10:00:00-Temperature, water' for key 'WAGG01.PRIMARY'", '23000'),)
-                                if " Duplicate entry " in e.args[1] and " for key " in e.args[1]:
+    # multi-row prepared statements per table, commit size rows at a time. values go in the binary protocol, so the
+    # server neither parses them from text nor needs them quoted and escaped
+    def _execute_prepared(self, connection, cursor):
 
-                                    self.logger.warning(
-                                        "Attempted to insert duplicate row:\n%s\nContinuing..." % insert)
-                                    duplicate_count += 1
+        for table, rows in self.batch_rows.items():
 
-                                    duplicates.append(insert)
-                                else:
-                                    # problem but not a duplicate row
-                                    raise e
-                            except Error as e:
-                                self.logger.warning("Error running an insert:\n%s\nContinuing...\n" % insert)
-                                self.logger.warning(e)
+            plan = self._insert_plan(table)
 
-                                errors.append(insert)
+            rows_max = max(PREPARED_PLACEHOLDERS_MAX // len(plan.columns), 1)
 
-                                error_count += 1
+            i = self.committed_offsets.get(table, 0)
+            while i < len(rows):
+                chunk = rows[i:i + min(self._commit_size(table), rows_max)]
 
-                            print("\r\t%d / %d (%d duplicates, %d errors)" %
-                                  (insert_count, total_inserts, duplicate_count, error_count),
-                                  end='', flush=True)
+                # every full chunk of a table shares one statement, prepared once
+                statement = plan.prepared_statement(len(chunk))
+                start_time = time.monotonic()
+
+                try:
+                    params = list(chain.from_iterable(chunk))
 
-                        # commit remaining inserts
-                        connection.commit()
+                    if self.duplicate_policy != DUPLICATE_POLICY_ERROR:
+                        self.insert_count += self._execute_counted(cursor, cursor.execute, statement, params,
+                                                                   len(chunk))
+                    else:
+                        cursor.execute(statement, params)
+                        self.insert_count += len(chunk)
+
+                    self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(chunk))
+                    self._commit(connection, table, len(chunk))
+
+                    self._record_commit(table, len(chunk), time.monotonic() - start_time)
 
                 except Error as e:
-                    self.logger.error("Error running inserts", e)
+                    if e.errno in TRANSIENT_ERRNOS:
+                        raise e
+
+                    self._back_off_commits(table)
+
+                    # as with batches, one bad row fails the whole statement. replay the chunk row by row
+                    self.logger.debug("Prepared insert into %s failed, replaying %d rows individually: %s" %
+                                      (table, len(chunk), e))
+
+                    for row in chunk:
+                        if self._execute_one(cursor, plan.prepared_statement(1), row, plan.literal(row)):
+                            self.insert_count += 1
+
+                    self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(chunk))
+                    self._commit(connection, table, len(chunk))
+
+                i += len(chunk)
+                self._mark_committed(table, i)
+
+                self._print_progress()
+
+    # prepared mode: the cursor for prepared statements on the current connection
+    def _prepared_cursor(self):
+        if self.prepared_cursor is None:
+            self.prepared_cursor = self.connection.cursor(prepared=True)
+
+        return self.prepared_cursor
+
+    # largest multirow statement to send
+    def _multirow_statement_budget(self):
+        return min(self.max_allowed_packet, MULTIROW_STATEMENT_BYTES_MAX) - MULTIROW_PACKET_HEADROOM
+
+    # multi-row INSERT statements per table, as many rows per statement as fit in the statement budget
+    def _execute_multirow(self, connection, cursor):
+
+        budget = self._multirow_statement_budget()
+
+        for table, rows in self.batch_rows.items():
+
+            plan = self._insert_plan(table)
+            prefix = plan.prefix
+            prefix_bytes = len(prefix.encode("utf-8")) + 1
+
+            offset = self.committed_offsets.get(table, 0)
+
+            chunk = []
+            chunk_bytes = prefix_bytes
+            build_start_time = time.monotonic()
+
+            for i, row in enumerate(rows.iterate(offset), offset):
+                values = plan.literal_values(row)
+
+                # values and the separating comma
+                row_bytes = len(values.encode("utf-8")) + 1
+
+                if len(chunk) > 0 and (chunk_bytes + row_bytes > budget or
+                                       (self.commit_sizer is not None and len(chunk) >= self._commit_size(table))):
+                    self.metrics.observe(STAGE_BUILD, time.monotonic() - build_start_time, table, len(chunk))
+                    self._execute_multirow_statement(connection, cursor, table, prefix, chunk)
+                    self._mark_committed(table, i)
+
+                    chunk = []
+                    chunk_bytes = prefix_bytes
+                    build_start_time = time.monotonic()
+
+                chunk.append(values)
+                chunk_bytes += row_bytes
+
+            if len(chunk) > 0:
+                self.metrics.observe(STAGE_BUILD, time.monotonic() - build_start_time, table, len(chunk))
+                self._execute_multirow_statement(connection, cursor, table, prefix, chunk)
+                self._mark_committed(table, len(rows))
 
+    # one multirow statement and its commit, timed for adaptive commit sizing
+    def _execute_multirow_statement(self, connection, cursor, table, prefix, chunk):
+        start_time = time.monotonic()
+
+        if self._execute_multirow_chunk(connection, cursor, table, prefix, chunk):
+            self._record_commit(table, len(chunk), time.monotonic() - start_time)
+        else:
+            self._back_off_commits(table)
+
+    # insert a chunk of rows in one statement. if any row is a duplicate or has a bad value the whole statement fails,
+    # so split the chunk in half and retry each half until the failing rows are isolated and reported individually.
+    # returns False if the chunk had to be split
+    def _execute_multirow_chunk(self, connection, cursor, table, prefix, chunk):
+
+        start_time = time.monotonic()
+
+        if len(chunk) == 1:
+            if self._execute_one(cursor, prefix + chunk[0] + ";"):
+                self.insert_count += 1
+
+            self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table)
+            self._commit(connection, table, 1)
+            return True
+
+        try:
+            if self.duplicate_policy != DUPLICATE_POLICY_ERROR:
+                self.insert_count += self._execute_counted(cursor, cursor.execute, prefix + ",".join(chunk), None,
+                                                           len(chunk))
+            else:
+                cursor.execute(prefix + ",".join(chunk) + ";")
+                self.insert_count += len(chunk)
+
+            self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(chunk))
+            self._commit(connection, table, len(chunk))
+
+            self._print_progress()
+
+            return True
+
+        except (IntegrityError, DataError) as e:
+            self.logger.debug("Multi-row insert of %d rows failed, splitting: %s" % (len(chunk), e))
+
+            middle = len(chunk) // 2
+            self._execute_multirow_chunk(connection, cursor, table, prefix, chunk[:middle])
+            self._execute_multirow_chunk(connection, cursor, table, prefix, chunk[middle:])
+
+            return False
+
+    # commit rows inserted into a table, timed. table None for the statement mode insert list
+    def _commit(self, connection, table, rows):
+        start_time = time.monotonic()
+        connection.commit()
+        self.metrics.observe(STAGE_COMMIT, time.monotonic() - start_time, table, rows)
+
+    # pending rows up to offset are committed, with everything counted so far
+    def _mark_committed(self, table, offset):
+        self.committed_offsets[table] = offset
+        self.committed_counts = (self.insert_count, self.updated_count, self.duplicate_count, self.error_count,
+                                 len(self.duplicates), len(self.errors))
+
+    # forget counts for rows the server rolled back, they'll be sent again
+    def _restore_committed_counts(self):
+        (self.insert_count, self.updated_count, self.duplicate_count, self.error_count,
+         duplicates_length, errors_length) = self.committed_counts
+
+        del self.duplicates[duplicates_length:]
+        del self.errors[errors_length:]
+
+    def _clear_pending(self):
+        self.inserts = []
+        self.batch_rows = {}
+        self.pending_bytes = 0
+        self.committed_offsets = {}
+        self.pending_keys = {}
+
+    # extra mysql.connector connection arguments
+    def _connection_options(self):
+        return {}
+
+    # open the database connection if it isn't already. returns False if the database can't be reached
+    def _connect(self, reconnecting=False):
+        if self.connection is not None:
+            return True
+
+        try:
+            self.connection_pool = DBConnectionPool.get(self.db_config_file, self._connection_options())
+
+            self.connection = self.connection_pool.acquire()
+            self.cursor = self.connection.cursor()
+
+        except Exception as e:
+            self.logger.error("Error connecting to database: %s" % e)
+            return False
+
+        # statement size limit for multirow inserts
+        try:
+            self.cursor.execute("SELECT @@max_allowed_packet;")
+            self.max_allowed_packet = int(self.cursor.fetchone()[0])
         except Error as e:
-            self.logger.error("Error connecting to database", e)
+            self.logger.warning("Could not read max_allowed_packet, assuming %d bytes: %s" %
+                                (self.max_allowed_packet, e))
 
-        date_time = datetime.now()
+        if reconnecting:
+            self.logger.info("Reconnected to database")
+        elif self.show_progress:
+            self.progress.end_line()
+            print("Starting import...")
 
-        # duplicates report written to file
-        if duplicate_count > 0:
+            # print out an initial count of 0 otherwise it appears to hang
+            self._print_progress()
 
-            dupe_file = "./duplicates_%s_%s.sql" % (self.importer_name, date_time.strftime("%Y%m%d-%H%M%S"))
+        return True
 
-            msg = "Encountered duplicate entries. Dumping failed inserts to file %s" % dupe_file
+    # drop the connection after a transient error and open a new one, backing off between attempts
+    def _reconnect(self):
+        self._disconnect(broken=True)
 
-            print("\n\n%s" % msg)
+        wait = RECONNECT_BACKOFF_SECONDS
+
+        for attempt in range(RECONNECT_ATTEMPTS):
+            msg = "Lost database connection. Reconnecting in %d sec (attempt %d of %d)" % (wait, attempt + 1,
+                                                                                            RECONNECT_ATTEMPTS)
+            self.progress.end_line()
+            print(msg)
             self.logger.warning(msg)
 
-            with open(dupe_file, 'w', encoding='utf-8') as filehandle:
-                for insert in duplicates:
-                    filehandle.write("%s\n" % insert)
+            time.sleep(wait)
+
+            if self._connect(reconnecting=True):
+                return True
+
+            wait = min(wait * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+
+        return False
+
+    # add a writer's counts, duplicates and errors to ours and reset the writer's for its next flush
+    def _merge_writer(self, writer):
+        self.insert_count += writer.insert_count
+        self.updated_count += writer.updated_count
+        self.skipped_count += writer.skipped_count
+        self.duplicate_count += writer.duplicate_count
+        self.error_count += writer.error_count
+        self.dropped_count += writer.dropped_count
+
+        self.duplicates.extend(writer.duplicates)
+        self.errors.extend(writer.errors)
+
+        if writer.failed:
+            self.failed = True
+
+        writer.insert_count = 0
+        writer.updated_count = 0
+        writer.skipped_count = 0
+        writer.duplicate_count = 0
+        writer.error_count = 0
+        writer.dropped_count = 0
+        writer.duplicates = []
+        writer.errors = []
+
+    # a writer for the writer pool: same settings, its own connection and counters
+    def _build_writer(self):
+        writer = DBImporter(self.db_config_file)
+        writer.set_importer_name(self.importer_name)
+        writer.set_execute_mode(self.execute_mode)
+        writer.set_duplicate_policy(self.duplicate_policy)
+        writer.set_schema(self.schema)
+        writer.set_schema_mapping(self.schema_mapping)
+        writer.set_column_types(self.column_types)
+        writer.set_table_template(self.table_template)
+        writer.set_typed(self.typed)
+        writer.commit_size = self.commit_size
+        writer.commit_sizer = self.commit_sizer
+        writer.show_progress = False
+        writer.report_failures = False
+        writer.storage_sink = self.storage_sink
+        writer.owns_storage_sink = False
+        writer.metrics = self.metrics
+        return writer
+
+    def _use_writer_pool(self):
+        if self.writer_count <= 1:
+            return False
+
+        if self.execute_mode == EXECUTE_MODE_STATEMENT:
+            if self.writer_pool is None:
+                self.logger.warning("Writer pool needs a per-table insert mode, writing serially")
+            return False
+
+        return True
+
+    def _close(self):
+        if self.writer_pool is not None:
+            self.writer_pool.close()
+            self.writer_pool = None
+
+        if self.owns_storage_sink:
+            self.storage_sink.close()
+
+        self._disconnect()
+
+    # hand the connection back to the pool, or close it if it's broken
+    def _disconnect(self, broken=False):
+        if self.connection is None:
+            return
+
+        try:
+            self.cursor.close()
+
+            if self.prepared_cursor is not None:
+                self.prepared_cursor.close()
+        except Error as e:
+            self.logger.warning("Error closing database cursor: %s" % e)
+            broken = True
+
+        if broken:
+            self.connection_pool.discard(self.connection)
+        else:
+            self.connection_pool.release(self.connection)
+
+        self.cursor = None
+        self.prepared_cursor = None
+        self.connection = None
+
+    # write pending inserts to the storage sink and release them
+    def flush(self):
+
+        pending = self.pending_count()
+
+        if pending <= 0:
+            return
+
+        self._count_columns()
+
+        # dry run to a SQL script. nothing is sent to the database
+        if self.sql_dump is not None:
+            self._write_sql_dump()
+            self._clear_pending()
+            return
+
+        # hand the pending rows to the background writer and start on a fresh set
+        if self.pipelined:
+            if self.write_pipeline is None:
+                self.write_pipeline = DBWritePipeline(self, self.pipeline_depth)
+
+            self.write_pipeline.write(self.inserts, self.insert_plans, self.batch_rows, self.position,
+                                      self.added_count)
+
+            self.inserts = []
+            self.batch_rows = {}
+            self.pending_bytes = 0
+            return
+
+        # mysql, or a local storage sink
+        self.storage_sink.write(self, pending)
+
+        self._clear_pending()
+        self._write_failures()
+        self._save_checkpoint()
+
+    # send the pending rows over the importer's own connection, committing as it goes. after a transient error the rows
+    # not yet committed are sent again on a new connection. see MySQLSink
+    def _execute_pending(self, pending):
+        self._mark_committed(None, 0)
+
+        while True:
+            try:
+                if self.execute_mode == EXECUTE_MODE_BATCH:
+                    self._execute_batches(self.connection, self.cursor)
+                elif self.execute_mode == EXECUTE_MODE_MULTIROW:
+                    self._execute_multirow(self.connection, self.cursor)
+                elif self.execute_mode == EXECUTE_MODE_PREPARED:
+                    self._execute_prepared(self.connection, self._prepared_cursor())
+                else:
+                    self._execute_statements(self.connection, self.cursor)
+
+                break
+
+            except Error as e:
+                # whatever wasn't committed was rolled back. pick up from the last commit on a new connection
+                self._restore_committed_counts()
+
+                if e.errno in LOCK_ERRNOS:
+                    self._back_off_commits()
+
+                if e.errno in TRANSIENT_ERRNOS and self._reconnect():
+                    continue
+
+                self.logger.error("Error running inserts: %s" % e)
+                self.failed = True
+                self.dropped_count += pending - sum(self.committed_offsets.values())
+                break
+
+    # add the pending rows and their nulls to the per table counts
+    def _count_columns(self):
+        for table, rows in self.batch_rows.items():
+            if table not in self.table_counts:
+                self.table_counts[table] = 0
+                self.null_counts[table] = [0] * rows.column_count
+
+            self.table_counts[table] += len(rows)
+
+            null_counts = self.null_counts[table]
+            for column in range(rows.column_count):
+                null_counts[column] += rows.null_count(column)
+
+    def _write_sql_dump(self):
+        suffix = ""
+        if self.duplicate_policy == DUPLICATE_POLICY_UPSERT:
+            suffix = self._build_upsert_suffix()
+
+        if self.execute_mode != EXECUTE_MODE_STATEMENT:
+            for table, rows in self.batch_rows.items():
+                start_time = time.monotonic()
+                self.sql_dump.write_rows(self._insert_plan(table), rows, suffix)
+                self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(rows))
+        else:
+            start_time = time.monotonic()
+            self.sql_dump.write_statements(self.inserts, suffix)
+            self.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, None, len(self.inserts))
+
+    # every row added so far has been written. record how far into the dump that is. a pipelined flush records the
+    # position and rows added as of when it was queued
+    def _save_checkpoint(self, position=None, added_count=None):
+        if self.checkpoint is None or self.failed:
+            return
+
+        if position is None:
+            position = self.position
+
+        try:
+            self.checkpoint.save(position, self, added_count)
+        except OSError as e:
+            self.logger.warning("Could not save checkpoint: %s" % e)
+
+    # execute insert statements in bulk
+    def execute(self):
+
+        if self.added_count <= 0:
+            raise Exception("no inserts to make")
+
+        self.flush()
+
+        try:
+            if self.write_pipeline is not None:
+                self.write_pipeline.close()
+        finally:
+            self.write_pipeline = None
+            self._close()
+
+        if self.show_progress:
+            self.progress.finish()
+
+        if self.checkpoint is not None:
+            if self.failed:
+                msg = ("Import progress saved to %s. Run the import again with --resume to continue" %
+                       self.checkpoint.state_file)
+                print("\n\n%s" % msg)
+                self.logger.warning(msg)
+            else:
+                self.checkpoint.clear()
 
-        if error_count > 0:
-            errors_file = "./errors_%s_%s.sql" % (self.importer_name, date_time.strftime("%Y%m%d-%H%M%S"))
+        self._write_reports()
 
-            msg = "Encountered errors inserting entries. Dumping failed inserts to file %s" % errors_file
+    # move the failed statements of a flush to the duplicates and errors reports. the ignore and upsert policies only
+    # count duplicates
+    def _write_failures(self):
+        if not self.report_failures:
+            return
+
+        if len(self.duplicates) > 0:
+            if self.duplicate_sink is None:
+                self.duplicate_sink = self.build_failure_sink("./duplicates_%s_%s.sql" % (
+                    self.importer_name, datetime.now().strftime("%Y%m%d-%H%M%S")))
+
+            for insert in self.duplicates:
+                self.duplicate_sink.write(insert, DUPLICATE_REASON)
+
+            self.duplicates = []
+
+        if len(self.errors) > 0:
+            if self.error_sink is None:
+                self.error_sink = self.build_failure_sink("./errors_%s_%s.sql" % (
+                    self.importer_name, datetime.now().strftime("%Y%m%d-%H%M%S")))
+
+            for insert, reason in self.errors:
+                self.error_sink.write(insert, reason)
+
+            self.errors = []
+
+    # report where a failure sink's records went, and its counts by reason
+    def _report_failure_sink(self, sink, description):
+        sink.close()
+
+        if sink.written_count < sink.count:
+            msg = ("Encountered %d %s. Wrote %d of them to file %s" %
+                   (sink.count, description, sink.written_count, sink.failure_file))
+        else:
+            msg = "Encountered %d %s. Dumping failed inserts to file %s" % (sink.count, description, sink.failure_file)
+
+        print("\n\n%s" % msg)
+        self.logger.warning(msg)
+
+        for line in sink.report():
+            print("\t%s" % line)
+            self.logger.warning(line)
+
+    # finish the duplicates and errors reports, and report the outcome of the import
+    def _write_reports(self):
+
+        self._write_failures()
+
+        if self.duplicate_sink is not None:
+            self._report_failure_sink(self.duplicate_sink, "duplicate entries")
+
+        if self.error_sink is not None:
+            self._report_failure_sink(self.error_sink, "errors inserting entries")
+
+        if len(self.table_counts) > 0:
+            print("\n\nRows per destination table:")
+
+            columns = self._resolve_columns()
+
+            for table, count in sorted(self.table_counts.items()):
+                nulls = ["%s %d" % (column, null_count) for column, null_count in zip(columns, self.null_counts[table])
+                         if null_count > 0]
+
+                msg = "%s: %d rows" % (table, count)
+                if len(nulls) > 0:
+                    msg += ". Null values: %s" % ", ".join(nulls)
+
+                print("\t%s" % msg)
+                self.logger.info(msg)
+
+        if len(self.watermarks) > 0:
+            print("\n\nIncremental import watermarks:")
+
+            for table, watermark in sorted(self.watermarks.items()):
+                if watermark is None:
+                    msg = "%s: no existing rows" % table
+                else:
+                    msg = "%s: %s. Skipped %d older entries" % (table, watermark, self.watermark_skipped[table])
+
+                print("\t%s" % msg)
+                self.logger.info(msg)
+
+        if self.commit_sizer is not None and len(self.commit_sizer.stats) > 0:
+            print("\n\nAdaptive commit sizes:")
+
+            for msg in self.commit_sizer.report():
+                print("\t%s" % msg)
+                self.logger.info(msg)
+
+        if self.skipped_count > 0:
+            msg = ("Skipped %d entries already in the database or repeated in the dump" % self.skipped_count)
 
             print("\n\n%s" % msg)
-            self.logger.warning(msg)
+            self.logger.info(msg)
 
-            with open(errors_file, 'w', encoding='utf-8') as filehandle:
-                for insert in errors:
-                    filehandle.write("%s\n" % insert)
+        if self.dropped_count > 0:
+            msg = "Database import failed. %d entries were not written" % self.dropped_count
+
+            print("\n\n%s" % msg)
+            self.logger.error(msg)
 
         # report outcome
-        msg = ("Completed %d inserts. Encountered %d duplicates and %d errors" %
-               (insert_count, duplicate_count, error_count))
+        if self.duplicate_policy == DUPLICATE_POLICY_UPSERT:
+            msg = ("Completed %d inserts and %d updates. Encountered %d duplicates and %d errors" %
+                   (self.insert_count, self.updated_count, self.duplicate_count, self.error_count))
+        else:
+            msg = ("Completed %d inserts. Encountered %d duplicates and %d errors" %
+                   (self.insert_count, self.duplicate_count, self.error_count))
         self.logger.info(msg)
         print("\n%s" % msg)
+
+        self._write_metrics()
+
+    # count the outcome into the metrics and write them out, if they're kept
+    def _write_metrics(self):
+        if not self.metrics.enabled:
+            return
+
+        for table, count in self.table_counts.items():
+            self.metrics.count("rows_flushed", count, table)
+
+        self.metrics.count("rows_added", self.added_count)
+        self.metrics.count("rows_inserted", self.insert_count)
+        self.metrics.count("rows_updated", self.updated_count)
+        self.metrics.count("rows_skipped", self.skipped_count)
+        self.metrics.count("rows_duplicate", self.duplicate_count)
+        self.metrics.count("rows_error", self.error_count)
+        self.metrics.count("rows_dropped", self.dropped_count)
+
+        try:
+            self.metrics.write()
+        except OSError as e:
+            self.logger.warning("Could not write import metrics: %s" % e)
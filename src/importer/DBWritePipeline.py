@@ -0,0 +1,96 @@
+import logging
+import queue
+import threading
+
+# flushes waiting to be written. a producer adding rows blocks once this many are queued
+DEFAULT_PIPELINE_DEPTH = 2
+
+
+# writes flushes in the background so the dump keeps being read and parsed while earlier rows are written.
+#
+# the owning importer hands each flush's pending rows to the pipeline and starts filling a fresh set. a single writer
+# thread takes flushes off a bounded queue in order and writes them with a writer of its own, a DBImporter with its own
+# connection. the queue holds at most DEFAULT_PIPELINE_DEPTH flushes, so a producer that gets ahead of the database
+# waits rather than holding the whole dump in memory.
+#
+# after each flush is written its counts are merged into the owning importer, its failures are written to the owning
+# importer's reports and the checkpoint is saved as of that flush. counts are only ever changed from the writer thread.
+# if the writer thread fails unexpectedly the import is marked failed, that flush and anything queued after it are
+# counted as dropped, and the failure is raised again when the pipeline is closed.
+
+class DBWritePipeline:
+
+    def __init__(self, db_importer, depth=DEFAULT_PIPELINE_DEPTH):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.db_importer = db_importer
+
+        # the writer keeps the owning importer's write settings across flushes, including the keys seen so far
+        self.writer = db_importer._build_writer()
+        self.writer.writer_count = db_importer.writer_count
+        self.writer.key_fields = db_importer.key_fields
+        self.writer.skip_existing = db_importer.skip_existing
+
+        self.queue = queue.Queue(maxsize=depth)
+
+        # raised by the writer thread, handed back to the producer
+        self.error = None
+
+        self.thread = threading.Thread(target=self._run, name="%s-pipeline" % db_importer.importer_name, daemon=True)
+        self.thread.start()
+
+        self.logger.info("Started write pipeline with depth %d" % depth)
+
+    # queue a flush for writing. position and added_count are the owning importer's as of the flush, for its
+    # checkpoint. blocks while the queue is full
+    def write(self, inserts, insert_plans, batch_rows, position, added_count):
+        self.queue.put((inserts, insert_plans, batch_rows, position, added_count))
+
+    def _run(self):
+        while True:
+            flush = self.queue.get()
+
+            if flush is None:
+                return
+
+            inserts, insert_plans, batch_rows, position, added_count = flush
+
+            # after a failure, drain the queue so producers never block on it
+            if self.error is not None:
+                self.db_importer.dropped_count += self._row_count(inserts, batch_rows)
+                continue
+
+            try:
+                self.writer.inserts = inserts
+                self.writer.insert_plans = insert_plans
+                self.writer.batch_rows = batch_rows
+
+                self.writer.flush()
+
+                self.db_importer._merge_writer(self.writer)
+                self.db_importer._write_failures()
+                self.db_importer._save_checkpoint(position, added_count)
+                self.db_importer._print_progress()
+
+            except BaseException as e:
+                self.logger.error("Write pipeline failed: %s" % e)
+                self.error = e
+
+                self.db_importer.failed = True
+                self.db_importer.dropped_count += self._row_count(inserts, batch_rows)
+
+    def _row_count(self, inserts, batch_rows):
+        return len(inserts) + sum(len(rows) for rows in batch_rows.values())
+
+    # write everything queued, stop the writer thread and release its connection. raises a failure from the writer
+    # thread, if there was one
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+        self.writer._close()
+
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,89 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import logging
+
+# seconds between merged progress updates while the writers run
+PROGRESS_INTERVAL = 0.5
+
+
+# writes a flush's pending rows with several writers in parallel.
+#
+# each writer is a DBImporter with its own connection, its own counters and its own share of the destination tables.
+# a table is only ever written by one writer per flush, so writers don't wait on each other's InnoDB locks.
+# counters, duplicates and errors are merged back into the owning importer when the flush completes.
+
+class DBWriterPool:
+
+    def __init__(self, db_importer, writer_count):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.db_importer = db_importer
+
+        self.writers = [db_importer._build_writer() for i in range(writer_count)]
+
+        self.executor = ThreadPoolExecutor(max_workers=writer_count,
+                                           thread_name_prefix="%s-writer" % db_importer.importer_name)
+
+        self.logger.info("Built writer pool with %d writers" % writer_count)
+
+    # split tables across writers. biggest tables first, each to the writer with the fewest rows so far
+    def _partition(self, batch_rows):
+
+        assignments = [{} for writer in self.writers]
+        loads = [0] * len(self.writers)
+
+        for table in sorted(batch_rows, key=lambda t: len(batch_rows[t]), reverse=True):
+            rows = batch_rows[table]
+
+            if len(rows) <= 0:
+                continue
+
+            i = loads.index(min(loads))
+
+            assignments[i][table] = rows
+            loads[i] += len(rows)
+
+        return assignments
+
+    # write pending rows, keyed by destination table, and merge the outcome into the owning importer
+    def write(self, insert_plans, batch_rows):
+
+        futures = []
+
+        for writer, tables in zip(self.writers, self._partition(batch_rows)):
+            if len(tables) <= 0:
+                continue
+
+            self.logger.debug("Writer assigned tables %s" % ",".join(tables))
+
+            writer.insert_plans = insert_plans
+            writer.batch_rows = tables
+
+            futures.append(self.executor.submit(writer.flush))
+
+        # writers run quietly. report their combined progress from here
+        done, not_done = wait(futures, timeout=PROGRESS_INTERVAL)
+        while len(not_done) > 0:
+            self.db_importer._print_progress(self.writers)
+            done, not_done = wait(not_done, timeout=PROGRESS_INTERVAL)
+
+        try:
+            # re-raise anything unexpected from a writer thread
+            for future in futures:
+                future.result()
+        finally:
+            self._merge()
+
+        self.db_importer._print_progress()
+
+    def _merge(self):
+        for writer in self.writers:
+            self.db_importer._merge_writer(writer)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+
+        for writer in self.writers:
+            writer._close()
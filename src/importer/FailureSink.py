@@ -0,0 +1,107 @@
+import gzip
+import logging
+import lzma
+import re
+
+# compressed sinks get the extension added to their file name
+FAILURE_COMPRESSIONS = [
+    "gz",
+    "xz"
+]
+
+# values quoted or bracketed in failure messages, left out of the reason so failures with the same cause count together.
+# "Found invalid ActivityStartTime [25:00]" and "Found invalid ActivityStartTime [ab]" share a reason
+REASON_VALUE_PATTERN = re.compile(r"\s*\[[^\]]*\]|\s*'[^']*'|\s*\"[^\"]*\"")
+
+
+# failed rows of one kind, written to a file as they happen instead of held in memory until the end of the import.
+#
+# invalid dump rows, duplicate inserts and failed inserts each go to a sink of their own. a bad dump can fail millions
+# of rows, so the detail written can be capped at a number of records and sampled: every record up to sample_first, then
+# one in sample_every after that. every failure is counted by reason whether or not its detail is written, so the
+# summary stays exact.
+#
+# the file is only created once there is something to write. names ending .gz or .xz are compressed.
+
+class FailureSink:
+
+    # limit: most records to write, None for no limit. sample_first and sample_every: write the first sample_first
+    # records, then one in sample_every. None to write every record
+    def __init__(self, failure_file, limit=None, sample_first=None, sample_every=1):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.failure_file = str(failure_file)
+        self.limit = limit
+        self.sample_first = sample_first
+        self.sample_every = sample_every
+
+        # opened on the first record written
+        self.filehandle = None
+
+        self.count = 0
+        self.written_count = 0
+
+        # failures by reason, in the order reasons were first seen
+        self.reason_counts = {}
+
+    # reason a failure is counted under: the server error code for database errors, or the exception message without
+    # the values it quotes
+    def reason(e):
+        errno = getattr(e, "errno", None)
+        if errno is not None:
+            return "MySQL error %d" % errno
+
+        reason = REASON_VALUE_PATTERN.sub("", str(e)).strip()
+        if len(reason) <= 0:
+            return type(e).__name__
+
+        return reason
+
+    def _wanted(self):
+        if self.limit is not None and self.written_count >= self.limit:
+            return False
+
+        if self.sample_first is None or self.count <= self.sample_first:
+            return True
+
+        return (self.count - self.sample_first) % self.sample_every == 0
+
+    # count a failure, and write its record if it's sampled
+    def write(self, record, reason):
+        self.count += 1
+        self.reason_counts[reason] = self.reason_counts.get(reason, 0) + 1
+
+        if not self._wanted():
+            return
+
+        if self.filehandle is None:
+            self.filehandle = self._open()
+
+        self.filehandle.write("%s\n" % record)
+        self.written_count += 1
+
+    def _open(self):
+        self.logger.info("Writing failures to %s" % self.failure_file)
+
+        if self.failure_file.endswith(".gz"):
+            return gzip.open(self.failure_file, 'wt', encoding='utf-8', newline='')
+        elif self.failure_file.endswith(".xz"):
+            return lzma.open(self.failure_file, 'wt', encoding='utf-8', newline='')
+
+        return open(self.failure_file, 'w', encoding='utf-8', newline='')
+
+    # whether any failure records are in the file
+    def has_file(self):
+        return self.written_count > 0
+
+    # "reason: count" lines, most frequent first
+    def report(self):
+        return ["%s: %d" % (reason, count)
+                for reason, count in sorted(self.reason_counts.items(), key=lambda item: item[1], reverse=True)]
+
+    def close(self):
+        if self.filehandle is not None:
+            self.filehandle.close()
+            self.filehandle = None
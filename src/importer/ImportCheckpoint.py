@@ -0,0 +1,99 @@
+from datetime import datetime
+from pathlib import Path
+
+import hashlib
+import json
+import logging
+import os
+
+# bytes hashed from the start and end of the dump file for its fingerprint
+FINGERPRINT_SAMPLE_BYTES = 1024 * 1024
+
+
+# progress of an import, saved to a small json state file after every flush so an interrupted import can pick up
+# where it left off.
+#
+# a checkpoint records how many dump rows had been read when everything added so far was committed, along with the
+# import's counts. it belongs to one dump file, identified by its size, modification time and a hash of its first and
+# last megabyte, and is ignored if the dump has changed since.
+
+class ImportCheckpoint:
+
+    def __init__(self, state_file, data_dump_file):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.state_file = state_file
+        self.data_dump_file = data_dump_file
+
+        self.fingerprint = self._fingerprint()
+
+        self.flush_count = 0
+
+    def _fingerprint(self):
+        stat = os.stat(self.data_dump_file)
+
+        digest = hashlib.sha256()
+        with open(self.data_dump_file, 'rb') as filehandle:
+            digest.update(filehandle.read(FINGERPRINT_SAMPLE_BYTES))
+
+            if stat.st_size > FINGERPRINT_SAMPLE_BYTES:
+                filehandle.seek(max(stat.st_size - FINGERPRINT_SAMPLE_BYTES, FINGERPRINT_SAMPLE_BYTES))
+                digest.update(filehandle.read(FINGERPRINT_SAMPLE_BYTES))
+
+        return "%d-%d-%s" % (stat.st_size, stat.st_mtime_ns, digest.hexdigest())
+
+    # the saved state for this dump file, or None if there's nothing to resume
+    def load(self):
+        if not Path(self.state_file).exists():
+            self.logger.info("No checkpoint to resume from in %s" % self.state_file)
+            return None
+
+        with open(self.state_file, encoding='utf-8') as filehandle:
+            state = json.load(filehandle)
+
+        if state["data_dump_file"] != str(self.data_dump_file) or state["fingerprint"] != self.fingerprint:
+            self.logger.warning("Checkpoint in %s is for a different or changed dump file, ignoring it" %
+                                self.state_file)
+            return None
+
+        self.flush_count = state["flush_count"]
+
+        return state
+
+    # added_count overrides the importer's count of rows added, for a checkpoint taken while more rows were added
+    def save(self, position, db_importer, added_count=None):
+        self.flush_count += 1
+
+        if added_count is None:
+            added_count = db_importer.added_count
+
+        state = {
+            "data_dump_file": str(self.data_dump_file),
+            "fingerprint": self.fingerprint,
+            "position": position,
+            "flush_count": self.flush_count,
+            "saved_at": datetime.now().isoformat(timespec='seconds'),
+            "added_count": added_count,
+            "insert_count": db_importer.insert_count,
+            "updated_count": db_importer.updated_count,
+            "duplicate_count": db_importer.duplicate_count,
+            "error_count": db_importer.error_count,
+            "skipped_count": db_importer.skipped_count,
+            "dropped_count": db_importer.dropped_count,
+        }
+
+        # write then rename, so an interruption mid-write leaves the previous checkpoint intact
+        temp_file = "%s.tmp" % self.state_file
+        with open(temp_file, 'w', encoding='utf-8') as filehandle:
+            json.dump(state, filehandle, indent=2)
+
+        os.replace(temp_file, self.state_file)
+
+        self.logger.debug("Saved checkpoint at dump row %d" % position)
+
+    # the import completed, there's nothing to resume
+    def clear(self):
+        if Path(self.state_file).exists():
+            os.remove(self.state_file)
@@ -0,0 +1,232 @@
+from bisect import bisect_left
+from datetime import datetime
+
+import json
+import logging
+import os
+import threading
+import time
+
+# stages of an import, in the order a row goes through them
+# read: reading a row from the dump file, or a block of rows from the database
+# filter: deciding whether the row is wanted. want_row and want_entry
+# construct: building the DataEntry, validation and scrubbing included
+# validate and scrub: the DataEntry's own validation and character scrubbing
+# build: turning the entry into insert values or a literal statement, and building multirow statements
+# execute: sending inserts to the database, or to a storage sink
+# commit: committing them
+STAGE_READ = "read"
+STAGE_FILTER = "filter"
+STAGE_CONSTRUCT = "construct"
+STAGE_VALIDATE = "validate"
+STAGE_SCRUB = "scrub"
+STAGE_BUILD = "build"
+STAGE_EXECUTE = "execute"
+STAGE_COMMIT = "commit"
+
+STAGES = [
+    STAGE_READ,
+    STAGE_FILTER,
+    STAGE_CONSTRUCT,
+    STAGE_VALIDATE,
+    STAGE_SCRUB,
+    STAGE_BUILD,
+    STAGE_EXECUTE,
+    STAGE_COMMIT
+]
+
+# upper bounds in seconds of the stage duration buckets, from a single row's parse to a slow commit
+DURATION_BUCKETS = [0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0]
+
+# prefix of every exported metric name
+METRICS_PREFIX = "nssk_import"
+
+
+# timings and counts of an import, by stage and destination table, written to a JSON report and a Prometheus
+# node-exporter textfile at the end of the run.
+#
+# each stage keeps a histogram of how long a call took, with the rows the call covered, so per-row stages and per-chunk
+# stages like execute and commit can be compared as rows per second. stages where the destination table isn't known
+# yet, like read and filter, are kept without a table. counters hold the run's outcome, e.g. rows read or inserted.
+#
+# metrics are only kept when there's a file to write them to, so observing costs a single check otherwise. timings can
+# be observed from several threads.
+
+class ImportMetrics:
+
+    def __init__(self, importer_name="DEFAULT", json_file=None, textfile=None):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.importer_name = importer_name
+        self.json_file = json_file
+        self.textfile = textfile
+
+        self.enabled = json_file is not None or textfile is not None
+
+        # (stage, table): calls in each duration bucket, the last one unbounded, then total seconds and total rows
+        self.histograms = {}
+
+        # (name, table): value
+        self.counters = {}
+
+        self.start_time = time.time()
+        self.start_clock = time.monotonic()
+
+        self.lock = threading.Lock()
+
+    # a call of a stage took seconds, covering rows rows of a table
+    def observe(self, stage, seconds, table=None, rows=1):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            histogram = self.histograms.get((stage, table))
+            if histogram is None:
+                histogram = self.histograms[(stage, table)] = [0] * (len(DURATION_BUCKETS) + 3)
+
+            histogram[bisect_left(DURATION_BUCKETS, seconds)] += 1
+            histogram[-2] += seconds
+            histogram[-1] += rows
+
+    # the rows of an iterable, each timed as it's read. the iterable itself when metrics aren't kept
+    def timed(self, rows, stage=STAGE_READ, table=None):
+        if not self.enabled:
+            return rows
+
+        return self._timed(rows, stage, table)
+
+    def _timed(self, rows, stage, table):
+        iterator = iter(rows)
+
+        while True:
+            start_time = time.perf_counter()
+
+            try:
+                row = next(iterator)
+            except StopIteration:
+                return
+
+            self.observe(stage, time.perf_counter() - start_time, table)
+            yield row
+
+    # add to a counter
+    def count(self, name, value=1, table=None):
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.counters[(name, table)] = self.counters.get((name, table), 0) + value
+
+    # histograms sorted by stage order then table
+    def _sorted_histograms(self):
+        return sorted(self.histograms.items(), key=lambda item: (STAGES.index(item[0][0]) if item[0][0] in STAGES
+                                                                 else len(STAGES), item[0][0], item[0][1] or ""))
+
+    def report(self):
+        stages = []
+        for (stage, table), histogram in self._sorted_histograms():
+            calls = sum(histogram[:-2])
+            seconds = histogram[-2]
+            rows = histogram[-1]
+
+            cumulative = 0
+            buckets = {}
+            for bound, bucket_count in zip(DURATION_BUCKETS + ["+Inf"], histogram[:-2]):
+                cumulative += bucket_count
+                buckets[str(bound)] = cumulative
+
+            stages.append({
+                "stage": stage,
+                "table": table,
+                "calls": calls,
+                "rows": rows,
+                "seconds": round(seconds, 6),
+                "rows_per_sec": round(rows / seconds, 1) if seconds > 0 else None,
+                "buckets": buckets
+            })
+
+        counters = [{"name": name, "table": table, "value": value}
+                    for (name, table), value in sorted(self.counters.items(), key=lambda item: (item[0][0],
+                                                                                               item[0][1] or ""))]
+
+        return {
+            "importer": self.importer_name,
+            "started": datetime.fromtimestamp(self.start_time).isoformat(timespec="seconds"),
+            "elapsed_sec": round(time.monotonic() - self.start_clock, 3),
+            "stages": stages,
+            "counters": counters
+        }
+
+    def _labels(self, **labels):
+        return ",".join('%s="%s"' % (name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+                        for name, value in labels.items() if value is not None)
+
+    # node-exporter textfile format. everything describes the last run, so counts are gauges
+    def textfile_lines(self):
+        lines = []
+
+        name = "%s_stage_seconds" % METRICS_PREFIX
+        lines.append("# HELP %s Time spent in each stage of the last import, by destination table." % name)
+        lines.append("# TYPE %s histogram" % name)
+
+        for (stage, table), histogram in self._sorted_histograms():
+            cumulative = 0
+            for bound, bucket_count in zip(DURATION_BUCKETS + ["+Inf"], histogram[:-2]):
+                cumulative += bucket_count
+                lines.append("%s_bucket{%s} %d" % (name, self._labels(importer=self.importer_name, stage=stage,
+                                                                       table=table, le=bound), cumulative))
+
+            labels = self._labels(importer=self.importer_name, stage=stage, table=table)
+            lines.append("%s_sum{%s} %.6f" % (name, labels, histogram[-2]))
+            lines.append("%s_count{%s} %d" % (name, labels, cumulative))
+
+        name = "%s_stage_rows" % METRICS_PREFIX
+        lines.append("# HELP %s Rows through each stage of the last import, by destination table." % name)
+        lines.append("# TYPE %s gauge" % name)
+
+        for (stage, table), histogram in self._sorted_histograms():
+            lines.append("%s{%s} %d" % (name, self._labels(importer=self.importer_name, stage=stage, table=table),
+                                        histogram[-1]))
+
+        for counter in sorted(set(name for name, table in self.counters)):
+            name = "%s_%s" % (METRICS_PREFIX, counter)
+            lines.append("# HELP %s %s in the last import." % (name, counter.replace("_", " ").capitalize()))
+            lines.append("# TYPE %s gauge" % name)
+
+            for (counter_name, table), value in sorted(self.counters.items(), key=lambda item: item[0][1] or ""):
+                if counter_name == counter:
+                    lines.append("%s{%s} %s" % (name, self._labels(importer=self.importer_name, table=table), value))
+
+        name = "%s_last_run_timestamp_seconds" % METRICS_PREFIX
+        lines.append("# HELP %s When the last import started." % name)
+        lines.append("# TYPE %s gauge" % name)
+        lines.append("%s{%s} %d" % (name, self._labels(importer=self.importer_name), self.start_time))
+
+        name = "%s_duration_seconds" % METRICS_PREFIX
+        lines.append("# HELP %s How long the last import took." % name)
+        lines.append("# TYPE %s gauge" % name)
+        lines.append("%s{%s} %.3f" % (name, self._labels(importer=self.importer_name),
+                                      time.monotonic() - self.start_clock))
+
+        return lines
+
+    # write the report and the textfile, whichever were asked for
+    def write(self):
+        if self.json_file is not None:
+            self._write_atomically(self.json_file, json.dumps(self.report(), indent=2) + "\n")
+            self.logger.info("Wrote import metrics to %s" % self.json_file)
+
+        if self.textfile is not None:
+            self._write_atomically(self.textfile, "\n".join(self.textfile_lines()) + "\n")
+            self.logger.info("Wrote import metrics textfile to %s" % self.textfile)
+
+    # the textfile collector may read the file at any moment, so it's written aside and moved into place
+    def _write_atomically(self, file_name, text):
+        temp_file = "%s.%d.tmp" % (file_name, os.getpid())
+
+        with open(temp_file, "w", encoding="utf-8") as filehandle:
+            filehandle.write(text)
+
+        os.replace(temp_file, file_name)
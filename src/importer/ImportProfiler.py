@@ -0,0 +1,168 @@
+from datetime import datetime
+from pathlib import Path
+
+import cProfile
+import io
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+# functions listed in the summary, by time spent inside them and by time spent under them
+PROFILE_TOP_FUNCTIONS = 25
+
+# allocation sites listed in the summary
+PROFILE_TOP_ALLOCATIONS = 25
+
+# frames kept for each traced allocation. enough to tell which caller an allocation site is reached from
+TRACEMALLOC_FRAMES = 5
+
+# names given to the profiler's files, next to the log file
+PROFILE_STATS_SUFFIX = ".prof"
+PROFILE_SNAPSHOT_SUFFIX = ".tracemalloc"
+PROFILE_SUMMARY_SUFFIX = ".profile.txt"
+
+
+# profiles a run of an import script: a cProfile call graph and a tracemalloc snapshot of where memory was allocated,
+# written next to the script's log file with a short text summary of the hottest functions and allocation sites.
+#
+# the call graph, e.g. cosmo.prof, loads with pstats or snakeviz. the snapshot, e.g. cosmo.tracemalloc, loads with
+# tracemalloc.Snapshot.load. the summary is e.g. cosmo.profile.txt.
+#
+# threads started during the run, the write pipeline and parallel writers, are profiled too and merged into the one
+# call graph, where the python version allows it. nothing here is set up unless the profiler is run, so an import
+# without --profile is unaffected.
+
+class ImportProfiler:
+
+    def __init__(self, log_file):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        base_name = str(Path(log_file).with_suffix(""))
+
+        self.stats_file = base_name + PROFILE_STATS_SUFFIX
+        self.snapshot_file = base_name + PROFILE_SNAPSHOT_SUFFIX
+        self.summary_file = base_name + PROFILE_SUMMARY_SUFFIX
+
+        self.profile = None
+
+        # profiles of threads started during the run
+        self.thread_profiles = []
+        self.lock = threading.Lock()
+
+        self.start_time = None
+        self.elapsed = 0.0
+        self.peak_bytes = 0
+
+    # call main with parsed_args under the profiler, and write the profile once it returns or fails
+    def run(self, main, parsed_args):
+        self.profile = cProfile.Profile()
+
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+        threading.setprofile(self._profile_thread)
+
+        self.start_time = datetime.now()
+        start_clock = time.monotonic()
+        self.profile.enable()
+
+        try:
+            return main(parsed_args)
+        finally:
+            self.profile.disable()
+            self.elapsed = time.monotonic() - start_clock
+
+            threading.setprofile(None)
+
+            snapshot = tracemalloc.take_snapshot()
+            self.peak_bytes = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            self.write(snapshot)
+
+    # called once in each new thread before it runs. the thread gets a profile of its own, merged in at the end
+    def _profile_thread(self, frame, event, arg):
+        profile = cProfile.Profile()
+
+        # replaces this hook for the rest of the thread. python 3.12 and later allow one profiler at a time, so there
+        # only the main thread is profiled, and the hook is removed so it isn't called again on every event
+        try:
+            profile.enable()
+        except ValueError:
+            sys.setprofile(None)
+            return
+
+        with self.lock:
+            self.thread_profiles.append(profile)
+
+    def stats(self, stream=None):
+        stats = pstats.Stats(self.profile, stream=stream)
+
+        with self.lock:
+            for profile in self.thread_profiles:
+                profile.disable()
+
+                # a thread that never got to call anything has nothing to add
+                try:
+                    stats.add(profile)
+                except TypeError:
+                    pass
+
+        return stats
+
+    # top functions by time spent inside them and by time spent under them
+    def hottest_functions(self, stats):
+        stream = io.StringIO()
+        stats.stream = stream
+
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(PROFILE_TOP_FUNCTIONS)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(PROFILE_TOP_FUNCTIONS)
+
+        return stream.getvalue()
+
+    # top allocation sites still holding memory when the run ended
+    def top_allocations(self, snapshot):
+        # allocations by the profilers themselves aren't the import's
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, cProfile.__file__),
+            tracemalloc.Filter(False, pstats.__file__),
+        ])
+
+        statistics = snapshot.statistics("lineno")
+
+        lines = []
+        for index, statistic in enumerate(statistics[:PROFILE_TOP_ALLOCATIONS], 1):
+            frame = statistic.traceback[0]
+            lines.append("%3d. %s:%d: %.1f KiB in %d blocks" %
+                         (index, frame.filename, frame.lineno, statistic.size / 1024, statistic.count))
+
+        total_bytes = sum(statistic.size for statistic in statistics)
+        lines.append("Total: %.1f KiB held at exit, %.1f KiB at peak" % (total_bytes / 1024, self.peak_bytes / 1024))
+
+        return lines
+
+    # write the call graph, the snapshot and the summary
+    def write(self, snapshot):
+        stats = self.stats()
+        stats.dump_stats(self.stats_file)
+
+        snapshot.dump(self.snapshot_file)
+
+        with open(self.summary_file, "w", encoding="utf-8") as filehandle:
+            filehandle.write("Profile of run started %s, %.3f sec, %d threads\n\n" % (
+                self.start_time.isoformat(timespec="seconds"), self.elapsed, 1 + len(self.thread_profiles)))
+
+            filehandle.write("Hottest functions\n")
+            filehandle.write(self.hottest_functions(stats))
+
+            filehandle.write("\nTop allocation sites\n")
+            for line in self.top_allocations(snapshot):
+                filehandle.write("%s\n" % line)
+
+        log_msg = "Wrote profile to %s, %s and %s" % (self.stats_file, self.snapshot_file, self.summary_file)
+        print(log_msg)
+        self.logger.info(log_msg)
@@ -0,0 +1,236 @@
+from datetime import datetime, timedelta
+
+import logging
+import os
+import sys
+import threading
+import time
+
+# seconds between redraws of the progress line on a terminal
+TTY_INTERVAL = 0.5
+
+# seconds between progress lines when output isn't a terminal, e.g. under cron or docker
+LOG_INTERVAL = 30
+
+
+# progress of an import: rows read from the dump and rows written to the database, with their rates and an estimate of
+# the time left.
+#
+# callers report counts as often as they like, every row if they want. output is rate limited: on a terminal a single
+# line is redrawn in place every TTY_INTERVAL seconds, otherwise a full line is printed and logged every LOG_INTERVAL
+# seconds. rates are over the time since the previous update, and averaged over the whole run on the final line.
+#
+# the time left is estimated from how far into the dump file the reader is if a file is being tracked, and from the
+# rows written against the rows added once reading is done. counts can be reported from several threads.
+
+class ImportProgress:
+
+    def __init__(self, parse_label="Read", stream=None, interval=None):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.parse_label = parse_label
+
+        if stream is None:
+            stream = sys.stdout
+        self.stream = stream
+
+        try:
+            self.interactive = stream.isatty()
+        except (AttributeError, ValueError):
+            self.interactive = False
+
+        if interval is None:
+            interval = TTY_INTERVAL if self.interactive else LOG_INTERVAL
+        self.interval = interval
+
+        # dump file being read, for estimating the time left
+        self.source = None
+        self.source_bytes = 0
+
+        # rows read and rows that failed validation
+        self.parsed_count = 0
+        self.failed_count = 0
+
+        # rows written and added, and the rows rejected on the way in
+        self.written_count = 0
+        self.added_count = 0
+        self.duplicate_count = 0
+        self.error_count = 0
+
+        self.parsing = False
+        self.writing = False
+
+        # counts and time when reporting started, for rates over the whole run
+        self.start_time = None
+        self.start_parsed_count = 0
+        self.start_written_count = 0
+
+        # counts and time at the previous update, for rates since then
+        self.last_time = None
+        self.last_parsed_count = 0
+        self.last_written_count = 0
+        self.next_time = 0
+
+        # a terminal line has been drawn and not ended yet, and how long it was
+        self.line_open = False
+        self.line_length = 0
+
+        self.lock = threading.Lock()
+
+    # estimate the time left from the position of the reader in a dump file opened by the caller
+    def track_file(self, filehandle):
+        try:
+            self.source_bytes = os.fstat(filehandle.fileno()).st_size
+            self.source = getattr(filehandle, "buffer", filehandle)
+        except (AttributeError, OSError) as e:
+            self.logger.debug("Not tracking dump file position: %s" % e)
+            self.source = None
+
+    # rows read from the dump so far, and how many of them failed validation
+    def parsed(self, count, failed=0):
+        with self.lock:
+            self.parsed_count = count
+            self.failed_count = failed
+            self.parsing = True
+
+            self._update()
+
+    # rows written to the database so far, out of the rows added to the importer
+    def wrote(self, count, added, duplicates=0, errors=0):
+        with self.lock:
+            self.written_count = count
+            self.added_count = added
+            self.duplicate_count = duplicates
+            self.error_count = errors
+            self.writing = True
+
+            self._update()
+
+    def _update(self):
+        now = time.monotonic()
+
+        if self.start_time is None:
+            self.start_time = now
+            self.start_parsed_count = self.parsed_count
+            self.start_written_count = self.written_count
+
+            self.last_time = now
+            self.last_parsed_count = self.parsed_count
+            self.last_written_count = self.written_count
+
+        if now < self.next_time:
+            return
+
+        self._report(now, False)
+
+    # the dump has been read, or the import is done. end the progress line with rates over the whole run. rates for
+    # anything reported after this start over
+    def finish(self):
+        with self.lock:
+            if self.start_time is not None and (self.parsing or self.writing):
+                self._report(time.monotonic(), True)
+
+            self._end_line()
+            self.parsing = False
+            self.start_time = None
+            self.next_time = 0
+
+    # end the progress line so other output starts on a fresh line
+    def end_line(self):
+        with self.lock:
+            self._end_line()
+
+    def _end_line(self):
+        if self.line_open:
+            self.stream.write("\n")
+            self.stream.flush()
+            self.line_open = False
+            self.line_length = 0
+
+    def _report(self, now, final):
+        line = self._format(now, final)
+
+        if self.interactive:
+            # pad over whatever is left of a longer previous line
+            self.stream.write("\r%s" % line.ljust(self.line_length))
+            self.stream.flush()
+            self.line_open = True
+            self.line_length = len(line)
+        else:
+            self.stream.write("%s %s\n" % (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), line.strip()))
+            self.stream.flush()
+            self.logger.info(line.strip())
+
+        self.last_time = now
+        self.last_parsed_count = self.parsed_count
+        self.last_written_count = self.written_count
+        self.next_time = now + self.interval
+
+    def _format(self, now, final):
+
+        # rates over the whole run on the final line, since the previous update otherwise
+        if final or now <= self.last_time:
+            elapsed = now - self.start_time
+            parsed = self.parsed_count - self.start_parsed_count
+            written = self.written_count - self.start_written_count
+        else:
+            elapsed = now - self.last_time
+            parsed = self.parsed_count - self.last_parsed_count
+            written = self.written_count - self.last_written_count
+
+        segments = []
+
+        if self.parsing:
+            segment = "%s %d rows" % (self.parse_label, self.parsed_count)
+            if self.failed_count > 0:
+                segment += ", %d failed" % self.failed_count
+            segments.append(segment + " (%s)" % self._format_rate(parsed, elapsed))
+
+        if self.writing:
+            segment = "Written %d / %d" % (self.written_count, self.added_count)
+            if self.duplicate_count > 0 or self.error_count > 0:
+                segment += ", %d duplicates, %d errors" % (self.duplicate_count, self.error_count)
+            segments.append(segment + " (%s)" % self._format_rate(written, elapsed))
+
+        if not final:
+            remaining = self._estimate_remaining(now)
+            if remaining is not None:
+                segments.append("ETA %s" % timedelta(seconds=int(remaining)))
+
+        return "\t" + " | ".join(segments)
+
+    def _format_rate(self, count, elapsed):
+        if elapsed <= 0:
+            return "- rows/s"
+
+        return "%d rows/s" % (count / elapsed)
+
+    # seconds left, or None if there's nothing to go on yet
+    def _estimate_remaining(self, now):
+        elapsed = now - self.start_time
+        if elapsed <= 0:
+            return None
+
+        # reading: the share of the dump file read so far
+        if self.parsing and self.source is not None and self.source_bytes > 0:
+            try:
+                position = self.source.tell()
+            except (OSError, ValueError):
+                return None
+
+            if position <= 0:
+                return None
+
+            return elapsed * max(self.source_bytes - position, 0) / position
+
+        # writing what's left once reading is done
+        if not self.parsing and self.writing and self.written_count > 0:
+            rate = (self.written_count - self.last_written_count) / max(now - self.last_time, 1e-9)
+            if rate <= 0:
+                rate = (self.written_count - self.start_written_count) / elapsed
+
+            return max(self.added_count - self.written_count, 0) / rate
+
+        return None
@@ -0,0 +1,291 @@
+from src.importer.DBImporter import DBImporter
+from src.importer.DBImporter import EXECUTE_MODE_STATEMENT, EXECUTE_MODE_BATCH, EXECUTE_MODE_MULTIROW
+from src.importer.DBImporter import EXECUTE_MODE_PREPARED
+from src.importer.DBImporter import EXECUTE_MODES, DEFAULT_EXECUTE_MODE, DEFAULT_FLUSH_ROWS, DEFAULT_FLUSH_BYTES
+from src.importer.DBImporter import DEFAULT_WRITER_COUNT, WRITER_COUNT_MAX, DEFAULT_COMMIT_TARGET_SECONDS
+from src.importer.DBImporter import DUPLICATE_POLICIES, DEFAULT_DUPLICATE_POLICY, DUPLICATE_POLICY_UPSERT
+from src.importer.FailureSink import FAILURE_COMPRESSIONS
+from src.importer.StorageSink import SINKS, DEFAULT_SINK, SINK_MYSQL, SINK_SQLITE
+from src.importer.SQLiteSink import SQLiteSink
+from src.importer.ColumnarSink import ColumnarSink
+from src.importer.DBBulkLoader import DBBulkLoader
+from src.importer.ImportCheckpoint import ImportCheckpoint
+from src.importer.ImportMetrics import ImportMetrics
+from src.importer.ImportProfiler import ImportProfiler
+from src.data.DataEntry import DataEntry
+from src.importer.SQLDumpWriter import SQLDumpWriter, DUMP_FORMATS, DEFAULT_DUMP_FORMAT, DUMP_FORMAT_MULTIROW
+
+
+# command line options shared by the import scripts for tuning how DBImporter writes to the database
+
+class ImporterOptions(object):
+
+    # add the importer options to an import script's argument parser
+    def add_arguments(parser):
+        parser.add_argument('--bulk-load', action='store_true', dest='bulk_load',
+                            help='Load each destination table with LOAD DATA LOCAL INFILE instead of INSERTs. '
+                                 'Fastest option for first-time imports. Server must allow local_infile. Not with '
+                                 '--resume, --skip-existing or --pipeline.')
+        parser.add_argument('--insert-mode', dest='insert_mode', choices=EXECUTE_MODES, default=DEFAULT_EXECUTE_MODE,
+                            help='How inserts are sent to the database. statement: one INSERT per row. '
+                                 'batch: parameterized executemany per destination table. '
+                                 'multirow: multi-row INSERTs per destination table sized to max_allowed_packet. '
+                                 'prepared: multi-row server-side prepared statements per destination table, with '
+                                 'typed values sent in the binary protocol. Implies --typed. '
+                                 'Default: %s' % DEFAULT_EXECUTE_MODE)
+        parser.add_argument('--typed', action='store_true', dest='typed',
+                            help='Convert values to the types of their database columns (dates, times, decimals, '
+                                 'floats) as the dump is read, instead of sending text for the server to parse. '
+                                 'Values that do not convert are validation failures.')
+        parser.add_argument('--duplicates', dest='duplicates', choices=DUPLICATE_POLICIES,
+                            default=DEFAULT_DUPLICATE_POLICY,
+                            help='How rows already in the database are handled. error: each duplicate fails its insert '
+                                 'and is written to the duplicates report. ignore: duplicates are skipped and counted. '
+                                 'upsert: duplicates overwrite the existing rows. Default: %s' %
+                                 DEFAULT_DUPLICATE_POLICY)
+        parser.add_argument('--skip-existing', action='store_true', dest='skip_existing',
+                            help='Read the keys of rows already in the database for the time range of the dump, and '
+                                 'skip rows that are already there or repeated in the dump before they are sent. '
+                                 'Needs --insert-mode batch, multirow or prepared. Not with --duplicates upsert.')
+        parser.add_argument('--writers', type=int, dest='writers', default=DEFAULT_WRITER_COUNT,
+                            help='Number of parallel writers, each with its own connection and its own set of '
+                                 'destination tables. Needs --insert-mode batch, multirow or prepared. Max %d. '
+                                 'Default: %d' %
+                                 (WRITER_COUNT_MAX, DEFAULT_WRITER_COUNT))
+        parser.add_argument('--adaptive-commit', nargs='?', type=float, const=DEFAULT_COMMIT_TARGET_SECONDS,
+                            dest='adaptive_commit', metavar='SECONDS',
+                            help='Adjust the rows per commit for each destination table so each commit takes about '
+                                 'SECONDS, backing off on lock waits and failed inserts. Default target: %.1f' %
+                                 DEFAULT_COMMIT_TARGET_SECONDS)
+        parser.add_argument('--no-streaming', action='store_true', dest='no_streaming',
+                            help='Hold every insert in memory until the dump has been read, instead of writing to '
+                                 'the database as the dump is read.')
+        parser.add_argument('--pipeline', action='store_true', dest='pipeline',
+                            help='Streaming: write to the database in the background while the rest of the dump is '
+                                 'read, instead of pausing the read for every write.')
+        parser.add_argument('--dump-file', dest='dump_file', metavar='FILE',
+                            help='Dry run: write the inserts to a SQL script as the dump is read, instead of printing '
+                                 'them at the end. Compressed if FILE ends in .gz or .xz. Replay it with the mysql '
+                                 'client.')
+        parser.add_argument('--dump-format', dest='dump_format', choices=DUMP_FORMATS, default=DEFAULT_DUMP_FORMAT,
+                            help='Dry run: SQL script layout. statement: one INSERT per row. multirow: multi-row '
+                                 'INSERTs per destination table. Default: %s' % DEFAULT_DUMP_FORMAT)
+        parser.add_argument('--flush-rows', type=int, dest='flush_rows', default=DEFAULT_FLUSH_ROWS,
+                            help='Streaming: write to the database once this many inserts are pending. '
+                                 'Default: %d' % DEFAULT_FLUSH_ROWS)
+        parser.add_argument('--flush-mb', type=int, dest='flush_mb', default=DEFAULT_FLUSH_BYTES // (1024 * 1024),
+                            help='Streaming: write to the database once pending inserts pass this many megabytes. '
+                                 'Default: %d' % (DEFAULT_FLUSH_BYTES // (1024 * 1024)))
+        parser.add_argument('--failure-limit', type=int, dest='failure_limit', metavar='N',
+                            help='Write at most N rows to each of the invalid rows, duplicates and errors reports. '
+                                 'Failures past the limit are still counted.')
+        parser.add_argument('--failure-sample', nargs=2, type=int, dest='failure_sample', metavar=('FIRST', 'EVERY'),
+                            help='Write the first FIRST rows to each failure report, then one in every EVERY. '
+                                 'Failures left out are still counted.')
+        parser.add_argument('--failure-compress', dest='failure_compress', choices=FAILURE_COMPRESSIONS,
+                            help='Compress the invalid rows, duplicates and errors reports.')
+        parser.add_argument('--metrics-json', dest='metrics_json', metavar='FILE',
+                            help='Time each stage of the import (read, filter, entry construction, validation, '
+                                 'scrubbing, statement build, execute, commit) by destination table, and write the '
+                                 'timings and counts to FILE as JSON at the end of the run.')
+        parser.add_argument('--metrics-textfile', dest='metrics_textfile', metavar='FILE',
+                            help='As --metrics-json, written in the Prometheus text format for the node-exporter '
+                                 'textfile collector. FILE should end in .prom.')
+        parser.add_argument('--profile', action='store_true', dest='profile',
+                            help='Profile the run. Writes a cProfile call graph (.prof), a tracemalloc snapshot of '
+                                 'allocation sites (.tracemalloc) and a summary of the hottest functions '
+                                 '(.profile.txt) next to the log file. Slows the import down.')
+
+    # add the options only importers reading a dump file support
+    def add_dump_arguments(parser):
+        parser.add_argument('--sink', dest='sink', choices=SINKS, default=DEFAULT_SINK,
+                            help='Where to write the import. mysql: the configured database. sqlite: a local SQLite '
+                                 'database file. columnar: Parquet files if pyarrow is installed, otherwise NumPy '
+                                 '.npy files per column. Tables are laid out as in setup/sql. Default: %s' %
+                                 DEFAULT_SINK)
+        parser.add_argument('--sink-path', dest='sink_path', metavar='PATH',
+                            help='SQLite database file, or directory for columnar files. Default: named after the '
+                                 'importer, in the working directory.')
+        parser.add_argument('--incremental', action='store_true', dest='incremental',
+                            help='Read the newest timestamp in each destination table when the import starts, and '
+                                 'drop older rows in the dump without parsing them. For cumulative dumps that repeat '
+                                 'history already imported.')
+        parser.add_argument('--resume', action='store_true', dest='resume',
+                            help='Continue an interrupted import of the same dump file from its last checkpoint. '
+                                 'Checkpoints are saved after every write to the database.')
+
+    # run an import script's main with the parsed options, under the profiler if --profile was given. its files are
+    # named after the script's log file
+    def run(main, parsed_args, log_file):
+        if getattr(parsed_args, "profile", False):
+            return ImportProfiler(log_file).run(main, parsed_args)
+
+        return main(parsed_args)
+
+    # whether the import writes to the configured database, rather than a local storage sink
+    def needs_database(parsed_args):
+        return getattr(parsed_args, "sink", DEFAULT_SINK) == SINK_MYSQL
+
+    # build the importer selected by the parsed options
+    def build_importer(parsed_args, db_config_file):
+        if getattr(parsed_args, "bulk_load", False) and ImporterOptions.needs_database(parsed_args):
+            return DBBulkLoader(db_config_file)
+
+        return DBImporter(db_config_file)
+
+    # configure a DBImporter from the parsed options. call before adding entries
+    def apply(parsed_args, db_importer):
+        # tables are loaded once the whole dump is read. there are no flushes to skip rows in or pipeline
+        if isinstance(db_importer, DBBulkLoader):
+            for option in ("skip_existing", "pipeline"):
+                if getattr(parsed_args, option, False):
+                    raise Exception("--%s can't be used with --bulk-load" % option.replace("_", "-"))
+
+        metrics_json = getattr(parsed_args, "metrics_json", None)
+        metrics_textfile = getattr(parsed_args, "metrics_textfile", None)
+
+        if metrics_json is not None or metrics_textfile is not None:
+            metrics = ImportMetrics(db_importer.importer_name, metrics_json, metrics_textfile)
+            db_importer.set_metrics(metrics)
+
+            # entries are built by the import script. their validation and scrubbing are timed for every entry
+            DataEntry.metrics = metrics
+
+        if getattr(parsed_args, "failure_limit", None) is not None:
+            db_importer.set_failure_limit(getattr(parsed_args, "failure_limit"))
+
+        if getattr(parsed_args, "failure_sample", None) is not None:
+            db_importer.set_failure_sampling(*getattr(parsed_args, "failure_sample"))
+
+        if getattr(parsed_args, "failure_compress", None) is not None:
+            db_importer.set_failure_compression(getattr(parsed_args, "failure_compress"))
+
+        if getattr(parsed_args, "insert_mode", None) is not None:
+            db_importer.set_execute_mode(getattr(parsed_args, "insert_mode"))
+
+        if getattr(parsed_args, "typed", False) or getattr(parsed_args, "insert_mode", None) == EXECUTE_MODE_PREPARED:
+            db_importer.set_typed(True)
+
+        if getattr(parsed_args, "duplicates", None) is not None:
+            db_importer.set_duplicate_policy(getattr(parsed_args, "duplicates"))
+
+        if getattr(parsed_args, "incremental", False):
+            db_importer.set_incremental(True)
+
+        if getattr(parsed_args, "skip_existing", False):
+            # rows already in the database would never reach the upsert that updates them
+            if db_importer.duplicate_policy == DUPLICATE_POLICY_UPSERT:
+                raise Exception("--skip-existing can't be used with --duplicates %s" % DUPLICATE_POLICY_UPSERT)
+
+            db_importer.set_skip_existing(True)
+
+        db_importer.set_writer_count(getattr(parsed_args, "writers", DEFAULT_WRITER_COUNT))
+
+        if getattr(parsed_args, "adaptive_commit", None) is not None:
+            db_importer.set_adaptive_commit(getattr(parsed_args, "adaptive_commit"))
+
+        dry_run = getattr(parsed_args, "dryrun", None) is not None
+
+        if not dry_run and not ImporterOptions.needs_database(parsed_args):
+            ImporterOptions._apply_storage_sink(parsed_args, db_importer)
+
+        dump_file = getattr(parsed_args, "dump_file", None)
+
+        if dump_file is not None and not dry_run:
+            print("Ignoring --dump-file, it only applies to --dry-run")
+            dump_file = None
+
+        # dry runs to a SQL script stream to the script
+        if dump_file is not None and not isinstance(db_importer, DBBulkLoader):
+            dump_format = getattr(parsed_args, "dump_format", DEFAULT_DUMP_FORMAT)
+
+            # multirow statements are built from rows held per destination table
+            if dump_format == DUMP_FORMAT_MULTIROW and db_importer.execute_mode == EXECUTE_MODE_STATEMENT:
+                db_importer.set_execute_mode(EXECUTE_MODE_MULTIROW)
+
+            db_importer.set_sql_dump(SQLDumpWriter(dump_file, dump_format))
+            db_importer.set_streaming(True)
+            db_importer.set_flush_rows(getattr(parsed_args, "flush_rows", DEFAULT_FLUSH_ROWS))
+            db_importer.set_flush_bytes(getattr(parsed_args, "flush_mb", DEFAULT_FLUSH_BYTES // (1024 * 1024)) *
+                                        1024 * 1024)
+            return
+
+        # other dry runs print every insert at the end, there's no database to stream to
+        if not getattr(parsed_args, "no_streaming", False) and not dry_run:
+            db_importer.set_streaming(True)
+            db_importer.set_flush_rows(getattr(parsed_args, "flush_rows", DEFAULT_FLUSH_ROWS))
+            db_importer.set_flush_bytes(getattr(parsed_args, "flush_mb", DEFAULT_FLUSH_BYTES // (1024 * 1024)) *
+                                        1024 * 1024)
+            db_importer.set_pipelined(getattr(parsed_args, "pipeline", False))
+
+    # write to a SQLite database or columnar files instead of the database
+    def _apply_storage_sink(parsed_args, db_importer):
+        sink = getattr(parsed_args, "sink")
+        sink_path = getattr(parsed_args, "sink_path", None)
+
+        if db_importer.table_template is None:
+            raise Exception("Importer %s has no table template to write --sink %s with" %
+                            (db_importer.importer_name, sink))
+
+        if sink == SINK_SQLITE:
+            if sink_path is None:
+                sink_path = "./%s.sqlite" % db_importer.importer_name
+
+            db_importer.set_storage_sink(SQLiteSink(sink_path, db_importer.table_template))
+        else:
+            if sink_path is None:
+                sink_path = "./%s_columnar" % db_importer.importer_name
+
+            db_importer.set_storage_sink(ColumnarSink(sink_path, db_importer.table_template))
+
+        # sinks are written a table at a time
+        if db_importer.execute_mode == EXECUTE_MODE_STATEMENT:
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+        # sinks are written by the importer itself
+        if db_importer.writer_count > 1:
+            print("Ignoring --writers, it needs --sink mysql")
+            db_importer.set_writer_count(1)
+
+        # nothing to read back from the database
+        if db_importer.incremental or db_importer.skip_existing:
+            print("Ignoring --incremental and --skip-existing, they need --sink mysql")
+            db_importer.set_incremental(False)
+            db_importer.set_skip_existing(False)
+
+        print("Writing import to %s" % sink_path)
+
+    # save import checkpoints, and pick up an interrupted import with --resume. call after apply, before reading the
+    # dump. returns the number of dump rows to skip
+    def start_checkpoint(parsed_args, db_importer, data_dump_file):
+
+        # bulk loads save no checkpoints, tables are loaded once the whole dump is read
+        if isinstance(db_importer, DBBulkLoader):
+            if getattr(parsed_args, "resume", False):
+                raise Exception("--resume can't be used with --bulk-load")
+            return 0
+
+        # dry runs write nothing to resume
+        if getattr(parsed_args, "dryrun", None) is not None:
+            return 0
+
+        # columnar files are written from scratch every run
+        if getattr(parsed_args, "sink", DEFAULT_SINK) not in (SINK_MYSQL, SINK_SQLITE):
+            return 0
+
+        checkpoint = ImportCheckpoint("./%s_checkpoint.json" % db_importer.importer_name, data_dump_file)
+        db_importer.set_checkpoint(checkpoint)
+
+        if not getattr(parsed_args, "resume", False):
+            return 0
+
+        state = checkpoint.load()
+        if state is None:
+            print("No checkpoint to resume from, importing the whole dump")
+            return 0
+
+        db_importer.restore(state)
+
+        print("Resuming import after dump row %d, saved %s" % (state["position"], state["saved_at"]))
+
+        return state["position"]
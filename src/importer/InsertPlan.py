@@ -0,0 +1,83 @@
+# how rows headed for one destination table are inserted, compiled once per table.
+#
+# the columns, statement text and the lookup of the schema fields in an entry are the same for every row going to a
+# table, so they're worked out when the first row for the table is added rather than for every row.
+
+class InsertPlan:
+
+    # columns are the db columns for the schema fields, in schema order. converters, if given, turn the text value of
+    # each field into the type of its column, None leaving a field as it is. see ColumnTypes
+    def __init__(self, table, fields, columns, ignore_duplicates, converters=None):
+        self.table = table
+        self.fields = fields
+        self.columns = columns
+
+        # INSERT INTO table_name (column1, column2, column3, ...) VALUES
+        if ignore_duplicates:
+            self.prefix = "INSERT IGNORE INTO " + table + " (" + ",".join(columns) + ") VALUES "
+        else:
+            self.prefix = "INSERT INTO " + table + " (" + ",".join(columns) + ") VALUES "
+
+        # parameterized statement for executemany
+        self.statement = self.prefix + "(" + ",".join(["%s"] * len(columns)) + ")"
+
+        # looks up the schema fields in an entry's data. depends on how the entry holds its data, so it's built from the
+        # first entry added
+        self.getter = None
+
+        # typed values: the converting fields and their converters, and the fields left as text
+        self.converters = None
+        self.text_indexes = None
+
+        if converters is not None and any(converter is not None for converter in converters):
+            self.converters = [(i, converter) for i, converter in enumerate(converters) if converter is not None]
+            self.text_indexes = [i for i, converter in enumerate(converters) if converter is None]
+
+        # prepared statements by row count, the same string object each time so the driver reuses its prepared
+        # statement rather than preparing it again
+        self.prepared_statements = {}
+
+    # the values of the schema fields in an entry, in schema order. undefined values are None
+    def values(self, entry):
+        getter = self.getter
+        if getter is None:
+            getter = self.getter = entry.values_getter(self.fields)
+
+        values = getter(entry._get_entry_data())
+
+        if self.converters is None:
+            return values
+
+        values = list(values)
+        for i, converter in self.converters:
+            values[i] = converter(values[i])
+
+        return tuple(values)
+
+    # rough size of a row's values in memory, for flush thresholds
+    def size(self, values):
+        if self.text_indexes is None:
+            return sum(map(len, filter(None, values))) + 8 * len(values)
+
+        return sum(len(values[i]) for i in self.text_indexes if values[i] is not None) + 8 * len(values)
+
+    # parameterized multi-row statement for row_count rows, for a prepared statement
+    def prepared_statement(self, row_count):
+        statement = self.prepared_statements.get(row_count)
+
+        if statement is None:
+            row = "(" + ",".join(["%s"] * len(self.columns)) + ")"
+            statement = self.prepared_statements[row_count] = self.prefix + ",".join([row] * row_count)
+
+        return statement
+
+    # (value1, value2, value3, ...) with py None values as mysql NULL
+    def literal_values(self, values):
+        return "(" + ",".join("NULL" if value is None else "'%s'" % value for value in values) + ")"
+
+    # literal insert statement for a row
+    #
+    # INSERT INTO Customers (CustomerName, ContactName, Address, City, PostalCode, Country)
+    # VALUES ('Cardinal', 'Tom B. Erichsen', 'Skagen 21', 'Stavanger', '4006', 'Norway');
+    def literal(self, values):
+        return self.prefix + self.literal_values(values) + ";"
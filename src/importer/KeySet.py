@@ -0,0 +1,52 @@
+from array import array
+from bisect import bisect_left
+
+import heapq
+
+# keys held in the unsorted set before they're merged into the sorted array
+RECENT_KEYS_MAX = 1024 * 1024
+
+
+# set of row keys held as 64-bit hashes, small enough for tens of millions of keys.
+#
+# most hashes live in a sorted array at 8 bytes each and are found by bisection. keys added one at a time go to a small
+# set first and are merged into the array in bulk. with 64-bit hashes the chance of any two of 50 million keys colliding,
+# and a new row being mistaken for one already seen, is below one in ten thousand.
+
+class KeySet:
+
+    def __init__(self):
+        self.sorted_keys = array('q')
+        self.recent_keys = set()
+
+    def __len__(self):
+        return len(self.sorted_keys) + len(self.recent_keys)
+
+    def __contains__(self, key):
+        return self._contains_hash(hash(key))
+
+    def _contains_hash(self, key_hash):
+        if key_hash in self.recent_keys:
+            return True
+
+        i = bisect_left(self.sorted_keys, key_hash)
+        return i < len(self.sorted_keys) and self.sorted_keys[i] == key_hash
+
+    def add(self, key):
+        key_hash = hash(key)
+
+        if not self._contains_hash(key_hash):
+            self.recent_keys.add(key_hash)
+
+            if len(self.recent_keys) >= RECENT_KEYS_MAX:
+                self._merge(sorted(self.recent_keys))
+                self.recent_keys = set()
+
+    # add many keys at once, e.g. keys read back from the database
+    def update(self, keys):
+        key_hashes = set(hash(key) for key in keys)
+        self._merge(sorted(key_hash for key_hash in key_hashes if not self._contains_hash(key_hash)))
+
+    def _merge(self, key_hashes):
+        if len(key_hashes) > 0:
+            self.sorted_keys = array('q', heapq.merge(self.sorted_keys, key_hashes))
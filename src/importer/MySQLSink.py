@@ -0,0 +1,49 @@
+from src.importer.DBWriterPool import DBWriterPool
+from src.importer.StorageSink import StorageSink
+
+
+# writes an import to the configured mysql database. the default sink.
+#
+# the importer holds the connection, reconnects after transient errors and sends rows in its insert mode. the sink
+# decides how each flush reaches the database: rows already there are dropped first when skipping existing rows, and
+# tables are spread across the writer pool when there is one. otherwise the importer sends the rows itself. keys of the
+# rows kept are only remembered once the flush is committed.
+
+class MySQLSink(StorageSink):
+
+    def write(self, db_importer, pending):
+
+        # rows already in the database never leave the client
+        if db_importer.skip_existing and not db_importer.failed:
+            if db_importer._connect():
+                db_importer._skip_known_rows()
+
+                pending = db_importer.pending_count()
+                if pending <= 0:
+                    return
+            else:
+                db_importer.failed = True
+
+        if not db_importer.failed and db_importer._use_writer_pool():
+            if db_importer.writer_pool is None:
+                db_importer.progress.end_line()
+                print("Starting import with %d writers..." % db_importer.writer_count)
+                db_importer.writer_pool = DBWriterPool(db_importer, db_importer.writer_count)
+
+            db_importer.writer_pool.write(db_importer.insert_plans, db_importer.batch_rows)
+
+        # once the import has failed there is nowhere to write to. keep memory bounded and count what was lost
+        elif db_importer.failed or not db_importer._connect():
+            db_importer.failed = True
+            db_importer.dropped_count += pending
+            return
+
+        else:
+            db_importer._execute_pending(pending)
+
+        if not db_importer.failed:
+            db_importer._record_pending_keys()
+
+    # connections belong to the importer and are released with it
+    def close(self):
+        pass
@@ -0,0 +1,114 @@
+from datetime import datetime
+
+import gzip
+import logging
+import lzma
+
+# statement: one INSERT per row
+# multirow: rows for the same table merged into multi-row INSERTs of up to DUMP_STATEMENT_BYTES
+DUMP_FORMAT_STATEMENT = "statement"
+DUMP_FORMAT_MULTIROW = "multirow"
+
+DUMP_FORMATS = [
+    DUMP_FORMAT_STATEMENT,
+    DUMP_FORMAT_MULTIROW
+]
+
+DEFAULT_DUMP_FORMAT = DUMP_FORMAT_MULTIROW
+
+# multirow statements stay well under the mysql 5.7 default max_allowed_packet of 4MB
+DUMP_STATEMENT_BYTES = 1024 * 1024
+
+# write buffer for uncompressed dumps
+DUMP_BUFFER_BYTES = 1024 * 1024
+
+
+# SQL script of the inserts a dry run would have made, written as rows are flushed rather than held until the end.
+#
+# the script can be replayed with the mysql client: mysql nssk < load.sql, or zcat load.sql.gz | mysql nssk.
+# files ending .gz or .xz are compressed.
+
+class SQLDumpWriter:
+
+    def __init__(self, dump_file, dump_format=DEFAULT_DUMP_FORMAT):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.dump_file = str(dump_file)
+        self.dump_format = dump_format
+
+        if self.dump_file.endswith(".gz"):
+            self.filehandle = gzip.open(self.dump_file, 'wt', encoding='utf-8', newline='')
+        elif self.dump_file.endswith(".xz"):
+            self.filehandle = lzma.open(self.dump_file, 'wt', encoding='utf-8', newline='')
+        else:
+            self.filehandle = open(self.dump_file, 'w', encoding='utf-8', newline='', buffering=DUMP_BUFFER_BYTES)
+
+        self.row_count = 0
+        self.statement_count = 0
+
+        self.filehandle.write("-- nssk-data dry run, %s\n" % datetime.now().isoformat(timespec='seconds'))
+        self.filehandle.write("SET NAMES utf8mb4;\n")
+
+        self.logger.info("Writing %s SQL dump to %s" % (dump_format, self.dump_file))
+
+    # literal insert statements, one per row. suffix ends every statement, e.g. an ON DUPLICATE KEY UPDATE clause
+    def write_statements(self, inserts, suffix=""):
+        for insert in inserts:
+            if len(suffix) > 0:
+                insert = insert.rstrip(";") + suffix + ";"
+
+            self.filehandle.write(insert)
+            self.filehandle.write("\n")
+
+        self.row_count += len(inserts)
+        self.statement_count += len(inserts)
+
+    # rows headed for one table, as laid out by its insert plan. suffix ends every statement, e.g. an
+    # ON DUPLICATE KEY UPDATE clause
+    def write_rows(self, plan, rows, suffix=""):
+        if len(rows) <= 0:
+            return
+
+        if self.dump_format == DUMP_FORMAT_STATEMENT:
+            for row in rows:
+                self.filehandle.write("%s%s%s;\n" % (plan.prefix, plan.literal_values(row), suffix))
+
+            self.row_count += len(rows)
+            self.statement_count += len(rows)
+            return
+
+        budget = DUMP_STATEMENT_BYTES - len(plan.prefix) - len(suffix)
+
+        chunk = []
+        chunk_bytes = 0
+
+        for row in rows:
+            values = plan.literal_values(row)
+
+            if len(chunk) > 0 and chunk_bytes + len(values) + 1 > budget:
+                self._write_multirow(plan, chunk, suffix)
+
+                chunk = []
+                chunk_bytes = 0
+
+            chunk.append(values)
+            chunk_bytes += len(values) + 1
+
+        self._write_multirow(plan, chunk, suffix)
+
+        self.row_count += len(rows)
+
+    def _write_multirow(self, plan, chunk, suffix):
+        self.filehandle.write(plan.prefix)
+        self.filehandle.write(",\n".join(chunk))
+        self.filehandle.write("%s;\n" % suffix)
+
+        self.statement_count += 1
+
+    def close(self):
+        self.filehandle.close()
+
+        self.logger.info("Wrote %d rows in %d statements to %s" % (self.row_count, self.statement_count,
+                                                                   self.dump_file))
@@ -0,0 +1,215 @@
+from datetime import datetime, date, time
+from decimal import Decimal
+
+import sqlite3
+
+from src.data.ColumnTypes import TYPE_VARCHAR, TYPE_INT, TYPE_FLOAT, TYPE_DECIMAL, TYPE_DATE, TYPE_TIME, TYPE_DATETIME
+from src.exception.StorageSinkException import StorageSinkException
+from src.importer.DBImporter import DUPLICATE_POLICY_ERROR, DUPLICATE_POLICY_UPSERT
+from src.importer.StorageSink import StorageSink
+
+# sqlite column type for each template column type. dates and times are stored as iso text, which sorts and compares
+# the same as the dates and times
+SQLITE_TYPES = {
+    TYPE_VARCHAR: "TEXT",
+    TYPE_INT: "INTEGER",
+    TYPE_FLOAT: "REAL",
+    TYPE_DECIMAL: "NUMERIC",
+    TYPE_DATE: "TEXT",
+    TYPE_TIME: "TEXT",
+    TYPE_DATETIME: "TEXT"
+}
+
+# bound parameters per statement when reading back keys. sqlite's limit before 3.32
+KEY_LOOKUP_PARAMETERS = 999
+
+
+# writes an import to a local SQLite database file.
+#
+# the database is opened in WAL mode, and each flush is written to each table in a single transaction, so a reader can
+# query the file while the import runs and a flush costs one fsync per table rather than one per row. tables are created
+# from the table template if they don't exist yet, with the template's primary key, so duplicates are handled the same
+# way as in mysql: rejected and reported, ignored, or overwritten.
+
+class SQLiteSink(StorageSink):
+
+    def __init__(self, sink_path, template_file):
+        super().__init__(sink_path, template_file)
+
+        # transactions are begun and committed here rather than by the driver. the writer may be a pipeline thread
+        self.connection = sqlite3.connect(self.sink_path, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL;")
+        self.connection.execute("PRAGMA synchronous=NORMAL;")
+
+        # tables created so far
+        self.tables = set()
+
+        self.logger.info("Writing to SQLite database %s" % self.sink_path)
+
+    def _create_table(self, table):
+        columns = ['"%s" %s' % (column, SQLITE_TYPES[self.template.column_types[column]])
+                   for column in self.template.columns]
+
+        if len(self.template.key_columns) > 0:
+            columns.append("PRIMARY KEY (%s)" % ",".join('"%s"' % column for column in self.template.key_columns))
+
+        self.connection.execute('CREATE TABLE IF NOT EXISTS "%s" (%s);' % (table, ",".join(columns)))
+        self.tables.add(table)
+
+    # INSERT [OR IGNORE] INTO "table" (column1, column2, ...) VALUES (?, ?, ...)
+    def _statement(self, plan, conflict=""):
+        return ('INSERT %sINTO "%s" (%s) VALUES (%s)' %
+                (conflict, plan.table, ",".join('"%s"' % column for column in plan.columns),
+                 ",".join(["?"] * len(plan.columns))))
+
+    # ON CONFLICT clause overwriting every column but the key, for rows where any of them differs. rows left as they
+    # were aren't counted as changes
+    def _upsert_statement(self, plan):
+        columns = [column for column in plan.columns if column not in self.template.key_columns]
+
+        updates = ",".join('"%s"=excluded."%s"' % (column, column) for column in columns)
+        differs = " OR ".join('"%s" IS NOT excluded."%s"' % (column, column) for column in columns)
+
+        return "%s ON CONFLICT (%s) DO UPDATE SET %s WHERE %s" % (
+            self._statement(plan), ",".join('"%s"' % column for column in self.template.key_columns), updates, differs)
+
+    # the keys of rows, in key column order
+    def _keys(self, plan, values):
+        key_indexes = [plan.columns.index(column) for column in self.template.key_columns]
+
+        return [tuple(row[i] for i in key_indexes) for row in values]
+
+    # the keys already in the table, of those given
+    def _existing_keys(self, plan, keys):
+        key_columns = ",".join('"%s"' % column for column in self.template.key_columns)
+        placeholders = "(%s)" % ",".join(["?"] * len(self.template.key_columns))
+
+        rows_max = max(KEY_LOOKUP_PARAMETERS // len(self.template.key_columns), 1)
+        existing = set()
+
+        for i in range(0, len(keys), rows_max):
+            chunk = keys[i:i + rows_max]
+
+            # SELECT "a","b" FROM "table" WHERE ("a","b") IN (VALUES (?,?),(?,?),...)
+            statement = 'SELECT %s FROM "%s" WHERE (%s) IN (VALUES %s)' % (
+                key_columns, plan.table, key_columns, ",".join([placeholders] * len(chunk)))
+
+            existing.update(self.connection.execute(statement, [value for key in chunk for value in key]))
+
+        return existing
+
+    # python values sqlite stores natively
+    def _adapt(self, value):
+        if isinstance(value, datetime):
+            return value.isoformat(sep=' ')
+        elif isinstance(value, (date, time)):
+            return value.isoformat()
+        elif isinstance(value, Decimal):
+            return str(value)
+
+        return value
+
+    def write_rows(self, db_importer, plan, rows):
+
+        if plan.table not in self.tables:
+            self._create_table(plan.table)
+
+        values = []
+        for row in rows:
+            converted = self._convert(db_importer, plan, row)
+            if converted is not None:
+                values.append(tuple(map(self._adapt, converted)))
+
+        if len(values) <= 0:
+            return
+
+        try:
+            self.connection.execute("BEGIN;")
+
+            if db_importer.duplicate_policy == DUPLICATE_POLICY_ERROR:
+                self._insert(db_importer, plan, values)
+            elif db_importer.duplicate_policy == DUPLICATE_POLICY_UPSERT and len(self.template.key_columns) > 0:
+                self._upsert(db_importer, plan, values)
+            else:
+                changes = self.connection.total_changes
+                self.connection.executemany(self._statement(plan, "OR IGNORE "), values)
+
+                inserted = self.connection.total_changes - changes
+
+                db_importer.insert_count += inserted
+                db_importer.duplicate_count += len(values) - inserted
+
+            self.connection.execute("COMMIT;")
+
+        except sqlite3.Error as e:
+            if self.connection.in_transaction:
+                self.connection.execute("ROLLBACK;")
+
+            raise StorageSinkException("Error writing to %s in %s: %s" % (plan.table, self.sink_path, e))
+
+    # plain inserts. a duplicate fails the whole executemany, so replay the rows one at a time to find it
+    def _insert(self, db_importer, plan, values):
+        statement = self._statement(plan)
+
+        self.connection.execute("SAVEPOINT rows;")
+
+        try:
+            self.connection.executemany(statement, values)
+            self.connection.execute("RELEASE rows;")
+
+            db_importer.insert_count += len(values)
+            return
+
+        except sqlite3.IntegrityError as e:
+            self.logger.debug("Insert into %s failed, replaying %d rows individually: %s" % (plan.table, len(values), e))
+            self.connection.execute("ROLLBACK TO rows;")
+            self.connection.execute("RELEASE rows;")
+
+        for row in values:
+            try:
+                self.connection.execute(statement, row)
+                db_importer.insert_count += 1
+
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE constraint failed" in str(e):
+                    db_importer.duplicate_count += 1
+                    db_importer.duplicates.append(plan.literal(row))
+                else:
+                    db_importer.error_count += 1
+                    db_importer.errors.append((plan.literal(row), str(e)))
+
+    # inserts, and updates of rows already in the table. each row is sent once: rows whose key is already in the table,
+    # or earlier in the rows, are duplicates and only sent as updates. as in mysql, only updates that changed a row are
+    # counted
+    def _upsert(self, db_importer, plan, values):
+        keys = self._keys(plan, values)
+        seen = self._existing_keys(plan, keys)
+
+        new_rows = []
+        duplicate_rows = []
+
+        for key, row in zip(keys, values):
+            if key in seen:
+                duplicate_rows.append(row)
+            else:
+                seen.add(key)
+                new_rows.append(row)
+
+        changes = self.connection.total_changes
+        self.connection.executemany(self._statement(plan, "OR IGNORE "), new_rows)
+
+        inserted = self.connection.total_changes - changes
+
+        changes = self.connection.total_changes
+        self.connection.executemany(self._upsert_statement(plan), duplicate_rows)
+
+        db_importer.insert_count += inserted
+        db_importer.duplicate_count += len(values) - inserted
+        db_importer.updated_count += self.connection.total_changes - changes
+
+    def close(self):
+        if self.connection is None:
+            return
+
+        self.connection.close()
+        self.connection = None
@@ -0,0 +1,97 @@
+import logging
+import time
+
+from src.data.ColumnTypes import ColumnTypes
+from src.data.TableTemplate import TableTemplate
+from src.exception.DataValidationException import DataValidationException
+from src.exception.StorageSinkException import StorageSinkException
+from src.importer.FailureSink import FailureSink
+from src.importer.ImportMetrics import STAGE_EXECUTE
+
+# mysql: DBImporter's own connection, writers and reconnects. the default. see MySQLSink
+# sqlite: a local SQLite database file. see SQLiteSink
+# columnar: a directory of columnar files, Parquet or NumPy. see ColumnarSink
+SINK_MYSQL = "mysql"
+SINK_SQLITE = "sqlite"
+SINK_COLUMNAR = "columnar"
+
+SINKS = [
+    SINK_MYSQL,
+    SINK_SQLITE,
+    SINK_COLUMNAR
+]
+
+DEFAULT_SINK = SINK_MYSQL
+
+
+# somewhere to write an import to.
+#
+# a DBImporter hands its sink each flush's pending rows. the configured mysql database is the default sink. other sinks
+# are written a table at a time from a sink path, with tables laid out by the same setup/sql template that creates the
+# mysql tables. their values are converted to the types of their template columns before they're written, whether or
+# not the import is typed.
+#
+# subclasses write the rows and count the outcome into the importer, the same counts a database write keeps.
+
+class StorageSink:
+
+    def __init__(self, sink_path=None, template_file=None):
+
+        self.logger = logging.getLogger(__name__)
+        self.logger.setLevel(logging.DEBUG)
+
+        self.sink_path = None if sink_path is None else str(sink_path)
+        self.template = None if template_file is None else TableTemplate(template_file)
+
+        # converters for each insert plan's columns, keyed by table
+        self.converters = {}
+
+    # write the importer's pending rows, a table at a time. once a write fails there is nowhere to write to
+    def write(self, db_importer, pending):
+        if db_importer.failed:
+            db_importer.dropped_count += pending
+            return
+
+        written = 0
+
+        for table, rows in db_importer.batch_rows.items():
+            start_time = time.monotonic()
+
+            try:
+                self.write_rows(db_importer, db_importer._insert_plan(table), rows)
+            except StorageSinkException as e:
+                self.logger.error("%s" % e)
+                db_importer.failed = True
+                db_importer.dropped_count += pending - written
+                return
+
+            db_importer.metrics.observe(STAGE_EXECUTE, time.monotonic() - start_time, table, len(rows))
+
+            written += len(rows)
+            db_importer._print_progress()
+
+    # write rows headed for one table, as laid out by its insert plan, and count them into the importer
+    def write_rows(self, db_importer, plan, rows):
+        raise RuntimeError("StorageSink.write_rows not implemented in subclass")
+
+    # finish writing. safe to call more than once
+    def close(self):
+        raise RuntimeError("StorageSink.close not implemented in subclass")
+
+    # the row's values converted to the types of their template columns, or None if one doesn't convert. a row that
+    # doesn't convert is counted as an error
+    def _convert(self, db_importer, plan, row):
+        converters = self.converters.get(plan.table)
+        if converters is None:
+            converters = self.converters[plan.table] = [
+                ColumnTypes.converter(self.template.column_type(column)) for column in plan.columns]
+
+        try:
+            return tuple(value if converter is None else converter(value)
+                         for converter, value in zip(converters, row))
+
+        except DataValidationException as e:
+            db_importer.error_count += 1
+            db_importer.errors.append((plan.literal(row), FailureSink.reason(e)))
+
+            return None
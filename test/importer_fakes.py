@@ -0,0 +1,90 @@
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import DBImporter
+from mysql.connector import IntegrityError, OperationalError
+
+
+# rows, fake cursors and connections, and importers built on them, shared by the importer tests.
+# the fakes stand in for mysql.connector, so the tests need no database
+
+CNV_DUMP_SCHEMA = [
+    "yyyy/MM/dd HH:mm:ss",
+    "Air Temperature - 5 min Intervals (°C)",
+    "Barometer 5 min Intervals (mbar)",
+    "Hourly Rainfall (mm)",
+    "Rainfall (mm)"
+]
+
+CNV_SCHEMA_MAPPING = {
+    "yyyy/MM/dd HH:mm:ss": "MeasurementTimestamp",
+    "Air Temperature - 5 min Intervals (°C)": "AirTemperature",
+    "Barometer 5 min Intervals (mbar)": "BarometricPressure",
+    "Hourly Rainfall (mm)": "HourlyRainfall",
+    "Rainfall (mm)": "Rainfall"
+}
+
+
+CNV_TABLE_TEMPLATE = Path(__file__).parents[1] / "setup/sql/cnv_rainfall/nssk-cnv-rainfall.sql.template"
+
+
+def cnv_row(timestamp, hourly_rainfall):
+    return {
+        "yyyy/MM/dd HH:mm:ss": timestamp,
+        "Air Temperature - 5 min Intervals (°C)": "4.5",
+        "Barometer 5 min Intervals (mbar)": "1012.25",
+        "Hourly Rainfall (mm)": hourly_rainfall,
+        "Rainfall (mm)": "0.2"
+    }
+
+
+# stands in for a mysql cursor. fails any statement that inserts one of the duplicate timestamps
+class DuplicateRejectingCursor:
+    def __init__(self, duplicates):
+        self.duplicates = duplicates
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        for duplicate in self.duplicates:
+            if duplicate in statement:
+                raise IntegrityError(msg="Duplicate entry '%s' for key 'CNV.PRIMARY'" % duplicate,
+                                     errno=1062, sqlstate="23000")
+
+        self.statements.append(statement)
+
+
+# stands in for a mysql cursor whose connection drops once, on the given executemany call
+class DroppingCursor:
+    def __init__(self, drop_on_call):
+        self.drop_on_call = drop_on_call
+        self.calls = 0
+        self.chunks = []
+
+    def executemany(self, statement, rows):
+        self.calls += 1
+        if self.calls == self.drop_on_call:
+            raise OperationalError(msg="Lost connection to MySQL server during query", errno=2013)
+
+        self.chunks.append(rows)
+
+    def close(self):
+        pass
+
+
+class NoopConnection:
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def build_importer(db_config_file=None):
+    db_importer = DBImporter(db_config_file)
+    db_importer.set_schema(CNV_DUMP_SCHEMA)
+    db_importer.set_schema_mapping(CNV_SCHEMA_MAPPING)
+    return db_importer
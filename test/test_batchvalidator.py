@@ -0,0 +1,161 @@
+import unittest
+import csv
+from unittest import mock
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.data.BatchValidator import BatchValidator, RULE_REQUIRED
+from src.data.CompactDataEntry import CompactDataEntry
+from src.cosmo.CosmoDataEntry import CosmoDataEntry
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from src.exception.DataValidationException import DataValidationException
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_batchvalidator.py
+# ../venv/bin/python3 -m unittest
+
+# values that pass, fail to parse, fall out of range, or sit on a bound
+EDGE_VALUES = ["", None, "0", "-0", "0.0", "-0.001", "12.5", " 7 ", "1e3", "80", "80.0001", "-80", "-80.5", "-1e9",
+               "nan", "NaN", "inf", "-inf", "abc", "1,5", "12.5|", "0x10", "1_000", "٣"]
+
+# rows built for each entry class. enough for every edge value in every field, with every choice
+EDGE_ROWS = 600
+
+# entry class, dump rows fixture in res and the metadata lines above its schema, fields given the edge values, field
+# the choices are given to
+SOURCES = [
+    (CosmoDataEntry, "cosmo_entries_test.csv", 0,
+     ["ActivityStartDate", "ActivityStartTime", "ResultValue"], "CharacteristicName",
+     ["Conductivity", "Specific conductance", "Temperature, water", ""]),
+    (CNVRainfallDataEntry, "cnv_rainfall_entries_test.csv", 2,
+     ["Air Temperature - 5 min Intervals (°C)", "Barometer 5 min Intervals (mbar)", "Rainfall (mm)",
+      "yyyy/MM/dd HH:mm:ss"], None, None)
+]
+
+
+# the dump rows of a fixture, as read by csv.DictReader
+def fixture_rows(fixture, metadata_lines):
+    with open(Path(__file__).parent / "res" / fixture, newline='', encoding='utf-8') as csvfile:
+        for i in range(metadata_lines):
+            next(csvfile)
+
+        return list(csv.DictReader(csvfile, delimiter=',', strict=True))
+
+
+# the fixture's rows, with the edge values worked into them, as value lists in schema order
+def edge_rows(entry_class, fixture, metadata_lines, fields, choice_field, choices):
+    rows = []
+    fixture = fixture_rows(fixture, metadata_lines)
+
+    for i in range(EDGE_ROWS):
+        row = dict(fixture[i % len(fixture)])
+
+        field = fields[i % len(fields)]
+        row[field] = EDGE_VALUES[(i // len(fields)) % len(EDGE_VALUES)]
+
+        if choice_field is not None:
+            row[choice_field] = choices[(i // 7) % len(choices)]
+
+        rows.append(entry_class.SCHEMA.values(row))
+
+    return rows
+
+
+# the message of the exception _validate_data raises for a row, None if it passes
+def row_reason(entry_class, values):
+    entry = entry_class.__new__(entry_class)
+    entry.entry_values = list(values)
+
+    try:
+        entry._validate_data(entry)
+    except Exception as e:
+        return str(e)
+
+    return None
+
+
+@unittest.skipUnless(BatchValidator.available(), "numpy is not installed")
+class BatchValidatorTests(unittest.TestCase):
+    def test_reject_reasons(self):
+        for entry_class, fixture, metadata_lines, fields, choice_field, choices in SOURCES:
+            rows = edge_rows(entry_class, fixture, metadata_lines, fields, choice_field, choices)
+
+            reasons = entry_class.VALIDATOR.reject_reasons(rows)
+
+            self.assertEqual([row_reason(entry_class, row) for row in rows], list(reasons))
+            self.assertTrue(any(reason is None for reason in reasons))
+            self.assertTrue(any(reason is not None for reason in reasons))
+
+    def test_unparsed_reasons(self):
+        # values that don't parse get the same DataValidationException message from both paths
+        for entry_class, fixture, metadata_lines, fields, choice_field, choices in SOURCES:
+            parsed_fields = [field for kind, field, *rule in entry_class.VALIDATOR.rules if kind != RULE_REQUIRED]
+
+            rows = []
+            for row in fixture_rows(fixture, metadata_lines):
+                for field in parsed_fields:
+                    for value in ("abc", "1,5", None):
+                        bad_row = dict(row)
+                        bad_row[field] = value
+                        if choice_field is not None:
+                            bad_row[choice_field] = choices[0]
+
+                        rows.append(entry_class.SCHEMA.values(bad_row))
+
+            reasons = entry_class.VALIDATOR.reject_reasons(rows)
+
+            for row, reason in zip(rows, reasons):
+                entry = entry_class.__new__(entry_class)
+                entry.entry_values = list(row)
+
+                with self.assertRaises(DataValidationException) as context:
+                    entry._validate_data(entry)
+
+                self.assertEqual(str(context.exception), reason)
+
+    def test_rule_order(self):
+        # only the first rule a row fails gives its reason
+        rows = [["", "abc", "x", "", "y"], ["2019/01/01 00:00:00", "90", "x", "", "0"], ["t", "5", "1", "", "0"]]
+
+        reasons = CNVRainfallDataEntry.VALIDATOR.reject_reasons(rows)
+
+        self.assertEqual(["Missing yyyy/MM/dd HH:mm:ss []",
+                          "found out-of-range Air Temperature - 5 min Intervals (°C) [90]",
+                          None], list(reasons))
+
+    def test_empty_chunk(self):
+        self.assertEqual(0, len(CosmoDataEntry.VALIDATOR.reject_reasons([])))
+
+    def test_build_entries(self):
+        # the same entries and exception messages with and without numpy
+        for entry_class, fixture, metadata_lines, fields, choice_field, choices in SOURCES:
+            rows = edge_rows(entry_class, fixture, metadata_lines, fields, choice_field, choices)
+
+            batch = CompactDataEntry.build_entries(entry_class, [list(row) for row in rows])
+
+            with mock.patch("src.data.BatchValidator.numpy", None):
+                self.assertFalse(BatchValidator.available())
+                row_by_row = CompactDataEntry.build_entries(entry_class, [list(row) for row in rows])
+
+            self.assertEqual(len(rows), len(batch))
+
+            for batch_entry, entry in zip(batch, row_by_row):
+                if isinstance(entry, Exception):
+                    self.assertIsInstance(batch_entry, Exception)
+                    self.assertEqual(str(entry), str(batch_entry))
+                else:
+                    self.assertIsInstance(batch_entry, entry_class)
+                    self.assertEqual(entry._get_entry_data(), batch_entry._get_entry_data())
+
+        # rows with the wrong number of values fail before validation
+        entries = CompactDataEntry.build_entries(CNVRainfallDataEntry, [["a", "b"]])
+        self.assertEqual("Expected 5 values, found 2", str(entries[0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -9,6 +9,8 @@ sys.path.append(str(path_root))
 
 # depends on adding src to sys.path
 from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from src.importer.InsertPlan import InsertPlan
+from src.exception.DataValidationException import DataValidationException
 
 
 # run with:
@@ -52,6 +54,46 @@ class CNVRainfallTests(unittest.TestCase):
 
         self.assertEqual("2022-02-27 00:00:00", data_entry.get("yyyy/MM/dd HH:mm:ss"))
 
+    def test_compact_entry(self):
+        csv_row = {
+            "yyyy/MM/dd HH:mm:ss": "'2022-02-27 00:00:00'",
+            "Air Temperature - 5 min Intervals (°C)": "4.5",
+            "Barometer 5 min Intervals (mbar)": "1012.25",
+            "Hourly Rainfall (mm)": "",
+            "Rainfall (mm)": "0.2"
+        }
+
+        data_entry = CNVRainfallDataEntry(csv_row)
+
+        # values are held in schema order, scrubbed, without an instance dict
+        self.assertFalse(hasattr(data_entry, "__dict__"))
+        self.assertEqual(["2022-02-27 00:00:00", "4.5", "1012.25", None, "0.2"], data_entry._get_entry_data())
+
+        self.assertEqual("0.2", data_entry.get("Rainfall (mm)"))
+        self.assertFalse(data_entry.is_defined("Hourly Rainfall (mm)"))
+
+        data_entry.set("Hourly Rainfall (mm)", "0.4")
+        self.assertTrue(data_entry.is_defined("Hourly Rainfall (mm)"))
+
+        # only schema fields can be set
+        with self.assertRaises(KeyError):
+            data_entry.set("Wind Speed (km/h)", "12")
+
+        # built the same from a csv.reader row in schema order
+        list_entry = CNVRainfallDataEntry(list(csv_row.values()))
+        self.assertEqual(CNVRainfallDataEntry(csv_row)._get_entry_data(), list_entry._get_entry_data())
+
+        with self.assertRaises(DataValidationException):
+            CNVRainfallDataEntry(["2022-02-27 00:00:00", "4.5"])
+
+        # insert values in the importer's field order, which needn't be the schema's
+        fields = ["Rainfall (mm)", "yyyy/MM/dd HH:mm:ss"]
+        plan = InsertPlan("CNV", fields, ["Rainfall", "MeasurementTimestamp"], False)
+        self.assertEqual(("0.2", "2022-02-27 00:00:00"), plan.values(list_entry))
+
+        plan = InsertPlan("CNV", CNVRainfallDataEntry.SCHEMA.fields, CNVRainfallDataEntry.SCHEMA.fields, False)
+        self.assertEqual(("2022-02-27 00:00:00", "4.5", "1012.25", None, "0.2"), plan.values(list_entry))
+
 
 if __name__ == '__main__':
     unittest.main()
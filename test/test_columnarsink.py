@@ -0,0 +1,57 @@
+import unittest
+import tempfile
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer import ColumnarSink
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import CNV_TABLE_TEMPLATE, cnv_row, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_columnarsink.py
+# ../venv/bin/python3 -m unittest
+
+class ColumnarSinkTests(unittest.TestCase):
+    @unittest.skipIf(ColumnarSink.pyarrow is None and ColumnarSink.numpy is None, "needs pyarrow or numpy")
+    def test_columnar_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sink = ColumnarSink.ColumnarSink("%s/cnv" % temp_dir, CNV_TABLE_TEMPLATE)
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_storage_sink(sink)
+
+            for i in range(250):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+                if i % 100 == 99:
+                    db_importer.flush()
+            db_importer.flush()
+
+            db_importer._close()
+
+            self.assertEqual(250, db_importer.insert_count)
+
+            if sink.file_format == ColumnarSink.FORMAT_PARQUET:
+                table = ColumnarSink.pyarrow.parquet.read_table("%s/cnv/CNV.parquet" % temp_dir)
+
+                self.assertEqual(250, table.num_rows)
+                self.assertEqual(datetime(2022, 2, 27, 4, 9), table.column("MeasurementTimestamp")[249].as_py())
+                self.assertEqual(Decimal("4.5000000"), table.column("AirTemperature")[0].as_py())
+            else:
+                timestamps = ColumnarSink.numpy.load("%s/cnv/CNV/MeasurementTimestamp.npy" % temp_dir)
+
+                self.assertEqual(250, len(timestamps))
+                self.assertEqual(datetime(2022, 2, 27, 4, 9), timestamps[249].item())
+                self.assertFalse(Path("%s/cnv/CNV/MeasurementTimestamp.part00000.npy" % temp_dir).exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
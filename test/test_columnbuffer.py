@@ -0,0 +1,75 @@
+import unittest
+from decimal import Decimal
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.ColumnBuffer import ColumnBuffer, DICTIONARY_MAX
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_columnbuffer.py
+# ../venv/bin/python3 -m unittest
+
+class ColumnBufferTests(unittest.TestCase):
+    def test_column_buffer(self):
+        rows = [("CNV", "2022-02-27 %02d:%02d:00" % (i // 60, i % 60), str(i % 300), None if i % 7 == 0 else "mm")
+                for i in range(DICTIONARY_MAX + 100)]
+
+        buffer = ColumnBuffer(4)
+        for row in rows:
+            buffer.append(row)
+
+        self.assertEqual(len(rows), len(buffer))
+        self.assertEqual(rows, list(buffer))
+        self.assertEqual(rows[5000:5010], buffer[5000:5010])
+        self.assertEqual(rows[-1], buffer[-1])
+        self.assertEqual(rows[10:], list(buffer.iterate(10)))
+
+        # one distinct value, more than fit a byte, and too many to encode
+        self.assertEqual(1, buffer.distinct_count(0))
+        self.assertEqual(300, buffer.distinct_count(2))
+        self.assertEqual(None, buffer.distinct_count(1))
+
+        self.assertEqual(0, buffer.null_count(2))
+        self.assertEqual(len(range(0, len(rows), 7)), buffer.null_count(3))
+
+        selected = buffer.select([7, 8, 4000])
+        self.assertEqual([rows[7], rows[8], rows[4000]], list(selected))
+        self.assertEqual(1, selected.null_count(3))
+
+    def test_column_buffer_mixed_types(self):
+        # equal values of different types, or written differently, come back as they went in
+        values = [Decimal("0.20"), Decimal("0.2"), 1, 1.0, True, "1", None, Decimal("0.200"), False, 0, "0.2"]
+        rows = [("CNV", value) for value in values] * 3
+
+        buffer = ColumnBuffer(2)
+        for row in rows:
+            buffer.append(row)
+
+        decoded = list(buffer)
+
+        self.assertEqual(rows, decoded)
+        self.assertEqual([(type(value), str(value)) for row in rows for value in row],
+                         [(type(value), str(value)) for row in decoded for value in row])
+
+        # the string column is still encoded
+        self.assertEqual(1, buffer.distinct_count(0))
+        self.assertEqual(None, buffer.distinct_count(1))
+        self.assertEqual(3, buffer.null_count(1))
+
+        # a column turns plain partway through, after strings were encoded
+        buffer = ColumnBuffer(1)
+        rows = [("0.2",), (None,), ("0.2",), (Decimal("0.20"),), (0.2,), ("0.2",)]
+        for row in rows:
+            buffer.append(row)
+
+        self.assertEqual([(type(row[0]), str(row[0])) for row in rows], [(type(row[0]), str(row[0])) for row in buffer])
+        self.assertEqual(1, buffer.null_count(0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+from datetime import datetime, time
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.data.ColumnTypes import ColumnTypes, TYPE_DATETIME, TYPE_DECIMAL, TYPE_DATE, TYPE_TIME, TYPE_FLOAT
+from src.exception.DataValidationException import DataValidationException
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_columntypes.py
+# ../venv/bin/python3 -m unittest
+
+class ColumnTypesTests(unittest.TestCase):
+    def test_column_types(self):
+        converters = ColumnTypes.converters(["a", "b", "c", "d", "e", "f"],
+                                            {"a": TYPE_DATETIME, "b": TYPE_DATE, "c": TYPE_TIME, "d": TYPE_DECIMAL,
+                                             "e": TYPE_FLOAT})
+
+        # f has no declared type and is left as text
+        self.assertIsNone(converters[5])
+
+        self.assertEqual(datetime(2022, 2, 27, 14, 5), converters[0]("2022/02/27 14:05:00"))
+        self.assertEqual(datetime(2022, 2, 27, 14, 5), converters[0]("2022-02-27T14:05"))
+        self.assertEqual(datetime(2022, 2, 27).date(), converters[1]("2022-2-27"))
+        self.assertEqual(time(9, 30), converters[2]("9:30"))
+        self.assertEqual("12.34567800", str(converters[3]("12.34567800")))
+        self.assertEqual(0.25, converters[4]("0.25"))
+        self.assertIsNone(converters[3](""))
+
+        with self.assertRaises(DataValidationException):
+            converters[3]("NaN")
+
+        with self.assertRaises(DataValidationException):
+            converters[1]("27/02/2022")
+
+
+if __name__ == '__main__':
+    unittest.main()
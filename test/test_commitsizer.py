@@ -0,0 +1,46 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.CommitSizer import CommitSizer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_commitsizer.py
+# ../venv/bin/python3 -m unittest
+
+class CommitSizerTests(unittest.TestCase):
+    def test_commit_sizer(self):
+        commit_sizer = CommitSizer(100, 10, 50000, 0.5)
+
+        # 2000 rows/sec wants 1000 rows per commit, but sizes at most double per commit
+        commit_sizer.record("CNV", 100, 0.05)
+        self.assertEqual(200, commit_sizer.size("CNV"))
+
+        commit_sizer.record("CNV", 200, 0.1)
+        self.assertEqual(400, commit_sizer.size("CNV"))
+
+        commit_sizer.record("CNV", 400, 0.2)
+        self.assertEqual(800, commit_sizer.size("CNV"))
+
+        commit_sizer.record("CNV", 800, 0.4)
+        self.assertEqual(1000, commit_sizer.size("CNV"))
+
+        # slow commits shrink straight away
+        commit_sizer.record("CNV", 1000, 5.0)
+        self.assertLess(commit_sizer.size("CNV"), 1000)
+
+        commit_sizer.back_off()
+        self.assertEqual(1, commit_sizer.stats["CNV"]["back_offs"])
+        self.assertEqual(100, commit_sizer.size("WAGG01"))
+
+        self.assertIn("CNV: ", commit_sizer.report()[0])
+        self.assertIn("(100-1000 over 5 commits", commit_sizer.report()[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import shutil
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBBulkLoader import DBBulkLoader
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import CNV_DUMP_SCHEMA, CNV_SCHEMA_MAPPING, cnv_row
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_dbbulkloader.py
+# ../venv/bin/python3 -m unittest
+
+class DBBulkLoaderTests(unittest.TestCase):
+    def test_load_file(self):
+        db_bulk_loader = DBBulkLoader(None)
+        db_bulk_loader.set_schema(CNV_DUMP_SCHEMA)
+        db_bulk_loader.set_schema_mapping(CNV_SCHEMA_MAPPING)
+
+        db_bulk_loader.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:00:00", "")))
+
+        # tab and backslash survive the scrub and have to be escaped for LOAD DATA
+        entry = CNVRainfallDataEntry(cnv_row("2022-02-27 00:05:00", "0.4"))
+        entry.set("Barometer 5 min Intervals (mbar)", "1012\t25\\")
+        db_bulk_loader.add(entry)
+
+        self.assertEqual(2, db_bulk_loader.pending_count())
+
+        # dry run closes the load files and keeps them
+        db_bulk_loader.dump()
+
+        try:
+            with open(db_bulk_loader.load_dir / "CNV.tsv", encoding='utf-8', newline='') as filehandle:
+                self.assertEqual("2022-02-27 00:00:00\t4.5\t1012.25\t\\N\t0.2\n"
+                                 "2022-02-27 00:05:00\t4.5\t1012\\t25\\\\\t0.4\t0.2\n", filehandle.read())
+
+            self.assertTrue(db_bulk_loader._load_statement("CNV").endswith(
+                "(MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,Rainfall);"))
+        finally:
+            shutil.rmtree(db_bulk_loader.load_dir)
+
+
+if __name__ == '__main__':
+    unittest.main()
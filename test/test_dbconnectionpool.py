@@ -0,0 +1,33 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBConnectionPool import DBConnectionPool
+from mysql.connector import Error
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_dbconnectionpool.py
+# ../venv/bin/python3 -m unittest
+
+class DBConnectionPoolTests(unittest.TestCase):
+    def test_connection_pool_shared(self):
+        # one pool per config file and connection options, however many times it's asked for
+        pool = DBConnectionPool.get("res/db_unreachable_config.json")
+
+        self.assertIs(pool, DBConnectionPool.get("res/db_unreachable_config.json"))
+        self.assertIsNot(pool, DBConnectionPool.get("res/db_unreachable_config.json", {"allow_local_infile": True}))
+
+        # nothing listening on the configured port
+        with self.assertRaises(Error):
+            pool.acquire()
+
+        self.assertEqual(0, pool.opened_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,403 @@
+import unittest
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH, EXECUTE_MODE_MULTIROW, EXECUTE_MODE_PREPARED
+from src.importer.DBImporter import DUPLICATE_POLICY_IGNORE, DUPLICATE_POLICY_UPSERT
+from mysql.connector import IntegrityError
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import CNV_TABLE_TEMPLATE, cnv_row, DuplicateRejectingCursor, DroppingCursor, NoopConnection
+from importer_fakes import build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_dbimporter.py
+# ../venv/bin/python3 -m unittest
+
+# stands in for a mysql cursor running parameterized inserts keyed on the timestamp. an executemany holding a duplicate
+# fails as a whole, as the server fails the multi-row INSERT it's rewritten into
+class DuplicateRejectingBatchCursor:
+    def __init__(self, duplicates):
+        self.duplicates = duplicates
+        self.batches = []
+        self.rows = []
+
+    def executemany(self, statement, rows):
+        for row in rows:
+            self._check(row)
+
+        self.batches.append(rows)
+
+    def execute(self, statement, params=None):
+        self._check(params)
+        self.rows.append(params)
+
+    def _check(self, row):
+        if row[0] in self.duplicates:
+            raise IntegrityError(msg="Duplicate entry '%s' for key 'CNV.PRIMARY'" % row[0],
+                                 errno=1062, sqlstate="23000")
+
+
+# stands in for a mysql cursor running INSERT IGNORE with executemany, keyed on the timestamp. reports affected rows
+# and warnings the way the server does, including ON DUPLICATE KEY UPDATE
+class IgnoringCursor:
+    def __init__(self, existing):
+        self.existing = dict((row[0], row) for row in existing)
+        self.statements = []
+        self.rowcount = 0
+        self.warning_count = 0
+
+    def executemany(self, statement, rows):
+        self.statements.append(statement)
+        self.rowcount = 0
+        self.warning_count = 0
+
+        for row in rows:
+            if row[0] not in self.existing:
+                self.existing[row[0]] = row
+                self.rowcount += 1
+            elif " ON DUPLICATE KEY UPDATE " in statement:
+                if self.existing[row[0]] != row:
+                    self.existing[row[0]] = row
+                    self.rowcount += 2
+            else:
+                self.warning_count += 1
+
+
+# stands in for a mysql cursor reading keys back from a table
+class KeyReadingCursor:
+    def __init__(self, keys):
+        self.keys = keys
+        self.queries = []
+        self.rows = []
+
+    def execute(self, statement, params=None):
+        self.queries.append((statement, params))
+        self.rows = [key for key in self.keys
+                     if params[0] <= key[0].strftime("%Y-%m-%d %H:%M:%S") <= params[1]]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+# stands in for a mysql cursor reading the newest timestamp of each table
+class WatermarkCursor:
+    def __init__(self, newest):
+        self.newest = newest
+        self.table = None
+
+    def execute(self, statement, params=None):
+        self.table = statement.split(" FROM ")[1].rstrip(";")
+
+    def fetchone(self):
+        return (self.newest.get(self.table),)
+
+
+# stands in for a mysql prepared statement cursor. keeps each statement and its parameters
+class PreparedCursor:
+    def __init__(self):
+        self.executions = []
+
+    def execute(self, statement, params=None):
+        self.executions.append((statement, params))
+
+
+class DBImporterTests(unittest.TestCase):
+    def test_statement(self):
+        db_importer = build_importer()
+
+        db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:00:00", "")))
+
+        self.assertEqual(1, db_importer.pending_count())
+        self.assertEqual("INSERT INTO CNV (MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,"
+                         "Rainfall) VALUES ('2022-02-27 00:00:00','4.5','1012.25',NULL,'0.2');",
+                         db_importer.inserts[0])
+
+    def test_batch(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+        db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:00:00", "")))
+        db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:05:00", "0.4")))
+
+        self.assertEqual(2, db_importer.pending_count())
+        self.assertEqual(0, len(db_importer.inserts))
+
+        self.assertEqual("INSERT INTO CNV (MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,"
+                         "Rainfall) VALUES (%s,%s,%s,%s,%s)", db_importer.insert_plans["CNV"].statement)
+
+        self.assertEqual([("2022-02-27 00:00:00", "4.5", "1012.25", None, "0.2"),
+                          ("2022-02-27 00:05:00", "4.5", "1012.25", "0.4", "0.2")],
+                         list(db_importer.batch_rows["CNV"]))
+
+    def test_streaming_bounded(self):
+        # nothing listening on the configured port. flushes fail, but pending inserts must not pile up
+        db_importer = build_importer("res/db_unreachable_config.json")
+        db_importer.set_streaming(True)
+        db_importer.set_flush_rows(100)
+
+        for i in range(250):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % (i % 60), "")))
+            self.assertLess(db_importer.pending_count(), 100)
+
+        self.assertEqual(250, db_importer.added_count)
+        self.assertEqual(200, db_importer.dropped_count)
+        self.assertTrue(db_importer.failed)
+
+        db_importer.execute()
+
+        self.assertEqual(250, db_importer.dropped_count)
+        self.assertEqual(0, db_importer.insert_count)
+
+    def test_multirow_bisect(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_MULTIROW)
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        cursor = DuplicateRejectingCursor(["2022-02-27 00:03:00", "2022-02-27 00:07:00"])
+        db_importer._execute_multirow(NoopConnection(), cursor)
+
+        self.assertEqual(8, db_importer.insert_count)
+        self.assertEqual(2, db_importer.duplicate_count)
+        self.assertEqual("INSERT INTO CNV (MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,"
+                         "Rainfall) VALUES ('2022-02-27 00:03:00','4.5','1012.25',NULL,'0.2');",
+                         db_importer.duplicates[0])
+
+        # every row went out in a multi-row statement, or alone after bisecting
+        self.assertEqual(8, sum(statement.count("),(") + 1 for statement in cursor.statements))
+
+    def test_batch_replay(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        cursor = DuplicateRejectingBatchCursor(["2022-02-27 00:03:00", "2022-02-27 00:07:00"])
+        db_importer._execute_batches(NoopConnection(), cursor)
+
+        self.assertEqual(8, db_importer.insert_count)
+        self.assertEqual(2, db_importer.duplicate_count)
+        self.assertEqual(0, db_importer.error_count)
+        self.assertEqual("INSERT INTO CNV (MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,"
+                         "Rainfall) VALUES ('2022-02-27 00:03:00','4.5','1012.25',NULL,'0.2');",
+                         db_importer.duplicates[0])
+
+        # the failed chunk was replayed row by row
+        self.assertEqual([], cursor.batches)
+        self.assertEqual(8, len(cursor.rows))
+
+    def test_multirow_packet_size(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_MULTIROW)
+
+        for i in range(100):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 01:%02d:00" % (i % 60), "")))
+
+        # room for a handful of rows per statement
+        db_importer.max_allowed_packet = 1500
+
+        cursor = DuplicateRejectingCursor([])
+        db_importer._execute_multirow(NoopConnection(), cursor)
+
+        self.assertEqual(100, db_importer.insert_count)
+        self.assertGreater(len(cursor.statements), 1)
+
+        for statement in cursor.statements:
+            self.assertLessEqual(len(statement.encode("utf-8")), db_importer._multirow_statement_budget())
+
+    def test_duplicate_policy_ignore(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_duplicate_policy(DUPLICATE_POLICY_IGNORE)
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        cursor = IgnoringCursor([("2022-02-27 00:03:00", "4.5", "1012.25", None, "0.2"),
+                                 ("2022-02-27 00:07:00", "4.5", "1012.25", "1.5", "0.2")])
+        db_importer._execute_batches(NoopConnection(), cursor)
+
+        self.assertEqual(8, db_importer.insert_count)
+        self.assertEqual(2, db_importer.duplicate_count)
+        self.assertEqual(0, db_importer.error_count)
+        self.assertEqual(0, db_importer.updated_count)
+
+        # counted, not reported row by row
+        self.assertEqual([], db_importer.duplicates)
+        self.assertEqual(1, len(cursor.statements))
+        self.assertTrue(cursor.statements[0].startswith("INSERT IGNORE INTO CNV "))
+
+    def test_duplicate_policy_upsert(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_duplicate_policy(DUPLICATE_POLICY_UPSERT)
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        # one existing row is unchanged by the dump, the other gets a new hourly rainfall
+        cursor = IgnoringCursor([("2022-02-27 00:03:00", "4.5", "1012.25", None, "0.2"),
+                                 ("2022-02-27 00:07:00", "4.5", "1012.25", "1.5", "0.2")])
+        db_importer._execute_batches(NoopConnection(), cursor)
+
+        self.assertEqual(8, db_importer.insert_count)
+        self.assertEqual(2, db_importer.duplicate_count)
+        self.assertEqual(1, db_importer.updated_count)
+        self.assertEqual(("2022-02-27 00:07:00", "4.5", "1012.25", None, "0.2"), cursor.existing["2022-02-27 00:07:00"])
+
+        self.assertEqual(2, len(cursor.statements))
+        self.assertTrue(cursor.statements[1].endswith(" AS new ON DUPLICATE KEY UPDATE "
+                                                      "MeasurementTimestamp=new.MeasurementTimestamp,"
+                                                      "AirTemperature=new.AirTemperature,"
+                                                      "BarometricPressure=new.BarometricPressure,"
+                                                      "HourlyRainfall=new.HourlyRainfall,Rainfall=new.Rainfall"))
+
+    def test_skip_existing(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_key_fields(["yyyy/MM/dd HH:mm:ss"])
+        db_importer.set_skip_existing(True)
+
+        # dump timestamps in a different format to the database's, with one row repeated
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:%02d:00" % i, "")))
+        db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:05:00", "")))
+
+        db_importer.cursor = KeyReadingCursor([(datetime(2022, 2, 26, 23, 55),),
+                                               (datetime(2022, 2, 27, 0, 2),),
+                                               (datetime(2022, 2, 27, 0, 4),)])
+        db_importer._skip_known_rows()
+
+        self.assertEqual(3, db_importer.skipped_count)
+        self.assertEqual(["2022/02/27 00:00:00", "2022/02/27 00:01:00", "2022/02/27 00:03:00"],
+                         [row[0] for row in db_importer.batch_rows["CNV"][:3]])
+        self.assertEqual(8, db_importer.pending_count())
+        self.assertEqual(("2022-02-27 00:00:00", "2022-02-27 00:09:00"), db_importer.cursor.queries[0][1])
+
+        # the kept rows' keys are only known once they're committed
+        self.assertEqual(2, len(db_importer.known_keys["CNV"]))
+        db_importer._record_pending_keys()
+        self.assertEqual(10, len(db_importer.known_keys["CNV"]))
+
+        # a later flush only reads back the part of its range that hasn't been read, and skips rows already sent
+        db_importer._clear_pending()
+        for i in range(8, 12):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:%02d:00" % i, "")))
+        db_importer._skip_known_rows()
+
+        self.assertEqual(5, db_importer.skipped_count)
+        self.assertEqual(("2022-02-27 00:09:00", "2022-02-27 00:11:00"), db_importer.cursor.queries[1][1])
+
+    def test_incremental(self):
+        db_importer = build_importer()
+        db_importer.set_timestamp_fields(["yyyy/MM/dd HH:mm:ss"])
+        db_importer.set_incremental(True)
+
+        db_importer.connection = NoopConnection()
+        db_importer.cursor = WatermarkCursor({"CNV": datetime(2022, 2, 27, 0, 5)})
+        db_importer.read_watermarks(["CNV", "CNV_EMPTY"])
+
+        self.assertEqual({"CNV": "2022-02-27 00:05:00", "CNV_EMPTY": None}, db_importer.watermarks)
+
+        # rows at the watermark are kept, the table may only have some of them
+        self.assertFalse(db_importer.is_new("CNV", cnv_row("2022/02/27 00:04:00", "")))
+        self.assertTrue(db_importer.is_new("CNV", cnv_row("2022/02/27 00:05:00", "")))
+        self.assertTrue(db_importer.is_new("CNV", cnv_row("2022/02/27 01:00:00", "")))
+        self.assertTrue(db_importer.is_new("CNV_EMPTY", cnv_row("2022/02/27 00:04:00", "")))
+
+        self.assertEqual(1, db_importer.watermark_skipped["CNV"])
+
+    def test_reconnect(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_commit_size(10)
+
+        for i in range(30):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        cursor = DroppingCursor(2)
+
+        def reconnect():
+            db_importer.connection = NoopConnection()
+            db_importer.cursor = cursor
+            return True
+
+        db_importer._reconnect = reconnect
+        reconnect()
+
+        db_importer.flush()
+
+        # the second chunk was rolled back and sent again on the new connection, the first wasn't
+        self.assertFalse(db_importer.failed)
+        self.assertEqual(30, db_importer.insert_count)
+        self.assertEqual(0, db_importer.error_count)
+        self.assertEqual(3, len(cursor.chunks))
+        self.assertEqual("2022-02-27 00:10:00", cursor.chunks[1][0][0])
+
+    def test_adaptive_commit(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_adaptive_commit(0.5)
+
+        for i in range(1000):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60 % 24, i % 60), "")))
+
+        cursor = DroppingCursor(0)
+        db_importer.connection = NoopConnection()
+        db_importer.cursor = cursor
+
+        db_importer.flush()
+
+        # commits against a fast cursor double in size each time
+        self.assertEqual([100, 200, 400, 300], [len(chunk) for chunk in cursor.chunks])
+        self.assertEqual(1000, db_importer.insert_count)
+        self.assertEqual(4, db_importer.commit_sizer.stats["CNV"]["commits"])
+
+    def test_typed(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_table_template(CNV_TABLE_TEMPLATE)
+        db_importer.set_typed(True)
+
+        db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:00:00", "")))
+
+        self.assertEqual([(datetime(2022, 2, 27), Decimal("4.5"), Decimal("1012.25"), None, Decimal("0.2"))],
+                         list(db_importer.batch_rows["CNV"]))
+
+        # literal statements for reports and dry runs are unchanged
+        self.assertEqual("INSERT INTO CNV (MeasurementTimestamp,AirTemperature,BarometricPressure,HourlyRainfall,"
+                         "Rainfall) VALUES ('2022-02-27 00:00:00','4.5','1012.25',NULL,'0.2');",
+                         db_importer.insert_plans["CNV"].literal(db_importer.batch_rows["CNV"][0]))
+
+    def test_prepared(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_PREPARED)
+        db_importer.set_table_template(CNV_TABLE_TEMPLATE)
+        db_importer.set_typed(True)
+
+        for i in range(250):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+
+        cursor = PreparedCursor()
+        db_importer._execute_prepared(NoopConnection(), cursor)
+
+        self.assertEqual(250, db_importer.insert_count)
+        self.assertEqual([100, 100, 50], [len(params) // 5 for statement, params in cursor.executions])
+
+        # full chunks share the one statement string, so it's only prepared once
+        self.assertIs(cursor.executions[0][0], cursor.executions[1][0])
+        self.assertEqual(100, cursor.executions[0][0].count("(%s,%s,%s,%s,%s)"))
+        self.assertEqual(datetime(2022, 2, 27), cursor.executions[0][1][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+import tempfile
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.DBWritePipeline import DBWritePipeline
+from src.importer.SQLiteSink import SQLiteSink
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import CNV_TABLE_TEMPLATE, cnv_row, DroppingCursor, NoopConnection, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_dbwritepipeline.py
+# ../venv/bin/python3 -m unittest
+
+# stands in for a mysql cursor that fails with something other than a database error on the given executemany call
+class BrokenCursor(DroppingCursor):
+    def executemany(self, statement, rows):
+        if self.calls + 1 == self.drop_on_call:
+            raise RuntimeError("broken cursor")
+
+        DroppingCursor.executemany(self, statement, rows)
+
+
+# a pipelined importer whose background writer sends to the given cursor
+def build_pipelined_importer(cursor):
+    db_importer = build_importer()
+    db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+    db_importer.set_streaming(True)
+    db_importer.set_flush_rows(100)
+    db_importer.set_pipelined(True)
+
+    db_importer.write_pipeline = DBWritePipeline(db_importer, 1)
+    db_importer.write_pipeline.writer.connection = NoopConnection()
+    db_importer.write_pipeline.writer.cursor = cursor
+    db_importer.write_pipeline.writer._close = lambda: None
+
+    return db_importer
+
+
+class DBWritePipelineTests(unittest.TestCase):
+    def test_pipeline(self):
+        cursor = DroppingCursor(0)
+        db_importer = build_pipelined_importer(cursor)
+
+        for i in range(250):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+
+            # flushes are handed off rather than written in place
+            self.assertLess(db_importer.pending_count(), 100)
+
+        db_importer.execute()
+
+        self.assertIsNone(db_importer.write_pipeline)
+        self.assertFalse(db_importer.failed)
+        self.assertEqual(250, db_importer.insert_count)
+
+        # written in the order they were added
+        rows = [row for chunk in cursor.chunks for row in chunk]
+        self.assertEqual(250, len(rows))
+        self.assertEqual("2022-02-27 00:00:00", rows[0][0])
+        self.assertEqual("2022-02-27 04:09:00", rows[-1][0])
+
+    def test_pipeline_storage_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sink = SQLiteSink("%s/cnv.sqlite" % temp_dir, CNV_TABLE_TEMPLATE)
+
+            closes = []
+            sink_close = sink.close
+            sink.close = lambda: closes.append(sink_close())
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_storage_sink(sink)
+            db_importer.set_streaming(True)
+            db_importer.set_flush_rows(100)
+            db_importer.set_pipelined(True)
+
+            for i in range(250):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+
+            db_importer.execute()
+
+            # the pipeline's writer shares the sink, and leaves closing it to the importer
+            self.assertFalse(db_importer.failed)
+            self.assertEqual(250, db_importer.insert_count)
+            self.assertEqual(1, len(closes))
+
+    def test_pipeline_failure(self):
+        # the writer thread breaks on its second executemany. that flush and everything after it is dropped, and the
+        # failure is raised once the pipeline is closed
+        db_importer = build_pipelined_importer(BrokenCursor(2))
+
+        for i in range(250):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+
+        with self.assertRaises(RuntimeError):
+            db_importer.execute()
+
+        self.assertTrue(db_importer.failed)
+        self.assertEqual(100, db_importer.insert_count)
+        self.assertEqual(150, db_importer.dropped_count)
+
+
+if __name__ == '__main__':
+    unittest.main()
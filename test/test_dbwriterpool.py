@@ -0,0 +1,54 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.DBWriterPool import DBWriterPool
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import cnv_row, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_dbwriterpool.py
+# ../venv/bin/python3 -m unittest
+
+class DBWriterPoolTests(unittest.TestCase):
+    def test_writer_pool_partition(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+        pool = DBWriterPool(db_importer, 2)
+
+        try:
+            assignments = pool._partition({"WAGG01": [()] * 50, "WAGG02": [()] * 30, "MOSQ01": [()] * 25,
+                                           "MACK02": [], "HAST01": [()] * 10})
+        finally:
+            pool.close()
+
+        # every non-empty table goes to exactly one writer, balanced by row count
+        self.assertEqual({"WAGG01", "HAST01"}, set(assignments[0]))
+        self.assertEqual({"WAGG02", "MOSQ01"}, set(assignments[1]))
+
+    def test_writer_pool_merge(self):
+        # nothing listening on the configured port. every writer fails and its rows are counted as dropped
+        db_importer = build_importer("res/db_unreachable_config.json")
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.set_writer_count(2)
+
+        for i in range(20):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        db_importer.execute()
+
+        self.assertTrue(db_importer.failed)
+        self.assertEqual(20, db_importer.dropped_count)
+        self.assertEqual(0, db_importer.insert_count)
+        self.assertIsNone(db_importer.writer_pool)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,171 @@
+import unittest
+import csv
+import random
+import re
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.data.EntryScrubber import EntryScrubber, SCRUB_CHARACTERS, COLUMN_SEPARATOR
+from src.data.CompactDataEntry import CompactDataEntry
+from src.cosmo.CosmoDataEntry import CosmoDataEntry
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_entryscrubber.py
+# ../venv/bin/python3 -m unittest
+
+# the per-value regex scrub EntryScrubber replaced. its output is the reference
+def regex_scrub(value):
+    scrub_pattern = re.compile(r'[\[\]\'\"\$\#\@\!\{\}\,\|]')
+
+    return re.sub(scrub_pattern, '', str(value))
+
+
+# entry class: dump rows fixture in res, and the metadata lines above its schema
+ENTRY_FIXTURES = {
+    CosmoDataEntry: ("cosmo_entries_test.csv", 0),
+    CNVRainfallDataEntry: ("cnv_rainfall_entries_test.csv", 2)
+}
+
+
+# the dump rows of an entry class's fixture, as read by csv.DictReader
+def fixture_rows(entry_class):
+    fixture, metadata_lines = ENTRY_FIXTURES[entry_class]
+
+    with open(Path(__file__).parent / "res" / fixture, newline='', encoding='utf-8') as csvfile:
+        for i in range(metadata_lines):
+            next(csvfile)
+
+        return list(csv.DictReader(csvfile, delimiter=',', strict=True))
+
+
+# every value of every csv fixture in res
+def fixture_values():
+    values = []
+
+    for fixture in sorted((Path(__file__).parent / "res").glob("*.csv")):
+        with open(fixture, newline='', encoding='utf-8') as csvfile:
+            for row in csv.reader(csvfile):
+                values.extend(row)
+
+    return values
+
+
+# values made up of the scrubbed characters, the column separator and other text, and values that aren't strings
+def synthetic_values():
+    values = ["", "plain", "12.5", "-0.001", "2019-01-01", "00:15:00", "Air Temperature (°C)", "tab\there", "\n",
+              COLUMN_SEPARATOR, "a%sb" % COLUMN_SEPARATOR, "[%s]" % COLUMN_SEPARATOR,
+              None, 0, -1.25, Decimal("12.30"), datetime(2023, 1, 5, 20, 20)]
+
+    values.extend(SCRUB_CHARACTERS)
+    values.append(SCRUB_CHARACTERS)
+
+    alphabet = SCRUB_CHARACTERS + COLUMN_SEPARATOR + "abcXYZ019 .-_:/%;\\°é"
+    generator = random.Random(1234)
+
+    for i in range(2000):
+        values.append("".join(generator.choice(alphabet) for j in range(generator.randint(0, 12))))
+
+    return values
+
+
+class EntryScrubberTests(unittest.TestCase):
+    def test_scrub_value(self):
+        self.assertTrue(len(fixture_values()) > 0)
+
+        for value in fixture_values() + synthetic_values():
+            self.assertEqual(regex_scrub(value), EntryScrubber.scrub_value(value), repr(value))
+
+    def test_scrub_column(self):
+        values = fixture_values() + synthetic_values()
+
+        self.assertEqual([regex_scrub(value) for value in values], EntryScrubber.scrub_column(values))
+
+        # without the separator, the column is translated in one call
+        values = [value for value in values if COLUMN_SEPARATOR not in str(value)]
+        self.assertEqual([regex_scrub(value) for value in values], EntryScrubber.scrub_column(values))
+
+        self.assertEqual([], EntryScrubber.scrub_column([]))
+        self.assertEqual([""], EntryScrubber.scrub_column([""]))
+
+    def test_scrub_rows(self):
+        values = fixture_values() + synthetic_values()
+        fields = ["a", "b", "c", "d", "e"]
+
+        rows = [list(values[i:i + len(fields)]) for i in range(0, len(values) - len(fields), len(fields))]
+        expected = [[regex_scrub(value) for value in row] for row in rows]
+
+        row_by_row = [list(row) for row in rows]
+        for row in row_by_row:
+            EntryScrubber(fields).scrub_values(row)
+
+        EntryScrubber(fields).scrub_rows(rows)
+
+        self.assertEqual(expected, row_by_row)
+        self.assertEqual(expected, rows)
+
+    def test_numeric_fields(self):
+        # numeric fields hold values validation parsed as numbers. they're only converted to strings
+        scrubber = EntryScrubber(["name", "value"], ["value"])
+
+        rows = [["a|b", "12.5"], ["'c'", Decimal("-1.0")], ["d", 1e-05]]
+        scrubber.scrub_rows(rows)
+
+        self.assertEqual([["ab", "12.5"], ["c", "-1.0"], ["d", "1e-05"]], rows)
+
+    def test_build_entries(self):
+        # fixture rows with rejects and scrubbed characters, and more values wrapped in scrubbed characters
+        sources = [
+            (CosmoDataEntry, ["ActivityEndDate", "ActivityEndTime", "AnalysisStartDate", "AnalysisStartTime"]),
+            (CNVRainfallDataEntry, ["Hourly Rainfall (mm)"])
+        ]
+
+        for entry_class, empty_fields in sources:
+            rows = []
+            for i, row in enumerate(fixture_rows(entry_class)):
+                field = entry_class.SCHEMA.fields[i % len(entry_class.SCHEMA.fields)]
+                if i % 3 == 0 and row[field] != "":
+                    row[field] = "{%s}" % row[field]
+
+                rows.append(row)
+
+            entries = CompactDataEntry.build_entries(entry_class, [dict(row) for row in rows])
+
+            self.assertEqual(len(rows), len(entries))
+            rejected_count = 0
+
+            for row, entry in zip(rows, entries):
+                try:
+                    expected = entry_class(dict(row))
+                except Exception as e:
+                    self.assertIsInstance(entry, Exception)
+                    self.assertEqual(str(e), str(entry))
+                    rejected_count += 1
+                    continue
+
+                self.assertIsInstance(entry, entry_class)
+                self.assertEqual(expected._get_entry_data(), entry._get_entry_data())
+                self.assertEqual(expected.get_db_destination(), entry.get_db_destination())
+
+                # the same values the per-row regex scrub gave
+                for field in entry_class.SCHEMA.fields:
+                    value = regex_scrub(row[field])
+                    if field in empty_fields and value == "":
+                        value = None
+
+                    self.assertEqual(value, entry.get(field))
+
+            # rejects from the fixture, and wrapped numbers
+            self.assertEqual(rejected_count, sum(1 for entry in entries if isinstance(entry, Exception)))
+            self.assertTrue(rejected_count >= 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+import tempfile
+import gzip
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_MULTIROW
+from src.importer.FailureSink import FailureSink
+from mysql.connector import Error
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from src.exception.DataValidationException import DataValidationException
+from importer_fakes import cnv_row, DuplicateRejectingCursor, NoopConnection, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_failuresink.py
+# ../venv/bin/python3 -m unittest
+
+class FailureSinkTests(unittest.TestCase):
+    def test_failure_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            failure_file = "%s/invalid_rows.log.gz" % temp_dir
+
+            sink = FailureSink(failure_file, limit=5, sample_first=3, sample_every=10)
+
+            for i in range(100):
+                sink.write("row %d" % i, FailureSink.reason(DataValidationException("Found invalid value [%d]" % i)))
+            sink.write("row 100", FailureSink.reason(Error(msg="Data too long", errno=1406)))
+            sink.close()
+
+            with gzip.open(failure_file, 'rt', encoding='utf-8') as filehandle:
+                records = filehandle.read().splitlines()
+
+            # the first 3, then 1 in 10, up to 5 records. every failure is counted
+            self.assertEqual(["row 0", "row 1", "row 2", "row 12", "row 22"], records)
+            self.assertEqual(101, sink.count)
+            self.assertEqual(["Found invalid value: 100", "MySQL error 1406: 1"], sink.report())
+
+            # nothing written, no file
+            sink = FailureSink("%s/errors.sql" % temp_dir, limit=0)
+            sink.write("row", "reason")
+            sink.close()
+
+            self.assertEqual(1, sink.count)
+            self.assertFalse(Path("%s/errors.sql" % temp_dir).exists())
+
+    def test_failure_sink_flush(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_MULTIROW)
+            db_importer.duplicate_sink = FailureSink("%s/duplicates.sql" % temp_dir)
+
+            for i in range(10):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+            db_importer.connection = NoopConnection()
+            db_importer.cursor = DuplicateRejectingCursor(["2022-02-27 00:03:00", "2022-02-27 00:07:00"])
+            db_importer.flush()
+
+            # written out with the flush, not held for the end
+            self.assertEqual([], db_importer.duplicates)
+            self.assertEqual(2, db_importer.duplicate_sink.count)
+
+            db_importer.duplicate_sink.close()
+
+            with open("%s/duplicates.sql" % temp_dir, encoding='utf-8') as filehandle:
+                self.assertIn("'2022-02-27 00:07:00'", filehandle.read().splitlines()[1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import tempfile
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.ImportCheckpoint import ImportCheckpoint
+from importer_fakes import build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_importcheckpoint.py
+# ../venv/bin/python3 -m unittest
+
+class ImportCheckpointTests(unittest.TestCase):
+    def test_checkpoint(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dump_file = "%s/dump.csv" % temp_dir
+            state_file = "%s/checkpoint.json" % temp_dir
+
+            with open(dump_file, 'w') as filehandle:
+                filehandle.write("yyyy/MM/dd HH:mm:ss\n2022/02/27 00:00:00\n")
+
+            db_importer = build_importer()
+            db_importer.insert_count = 1200
+            db_importer.duplicate_count = 3
+
+            ImportCheckpoint(state_file, dump_file).save(1250, db_importer)
+
+            state = ImportCheckpoint(state_file, dump_file).load()
+            self.assertEqual(1250, state["position"])
+
+            resumed_importer = build_importer()
+            resumed_importer.restore(state)
+            self.assertEqual(1200, resumed_importer.insert_count)
+            self.assertEqual(3, resumed_importer.duplicate_count)
+
+            # a changed dump can't be resumed
+            with open(dump_file, 'a') as filehandle:
+                filehandle.write("2022/02/27 00:05:00\n")
+
+            self.assertIsNone(ImportCheckpoint(state_file, dump_file).load())
+
+
+if __name__ == '__main__':
+    unittest.main()
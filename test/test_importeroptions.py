@@ -0,0 +1,81 @@
+import unittest
+import contextlib
+import io
+import argparse
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.ImporterOptions import ImporterOptions
+from src.importer.DBBulkLoader import DBBulkLoader
+from importer_fakes import build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_importeroptions.py
+# ../venv/bin/python3 -m unittest
+
+class ImporterOptionsTests(unittest.TestCase):
+    def test_dump_arguments(self):
+        # options for dump importers only, like --incremental, --resume and --sink, aren't offered to the correlation
+        # script
+        correlation_parser = argparse.ArgumentParser()
+        ImporterOptions.add_arguments(correlation_parser)
+
+        dump_parser = argparse.ArgumentParser()
+        ImporterOptions.add_arguments(dump_parser)
+        ImporterOptions.add_dump_arguments(dump_parser)
+
+        for options in [["--incremental"], ["--resume"], ["--sink", "sqlite"]]:
+            self.assertTrue(getattr(dump_parser.parse_args(options), options[0][2:]))
+
+            with self.assertRaises(SystemExit):
+                with contextlib.redirect_stderr(io.StringIO()):
+                    correlation_parser.parse_args(options)
+
+        # the correlation script always writes to mysql
+        self.assertTrue(ImporterOptions.needs_database(correlation_parser.parse_args([])))
+
+    def test_skip_existing_upsert(self):
+        parser = argparse.ArgumentParser()
+        ImporterOptions.add_arguments(parser)
+        ImporterOptions.add_dump_arguments(parser)
+
+        db_importer = build_importer()
+        ImporterOptions.apply(parser.parse_args(["--skip-existing", "--duplicates", "ignore"]), db_importer)
+        self.assertTrue(db_importer.skip_existing)
+
+        # existing rows would be skipped rather than updated
+        with self.assertRaises(Exception):
+            ImporterOptions.apply(parser.parse_args(["--skip-existing", "--duplicates", "upsert"]), build_importer())
+
+    def test_bulk_load_options(self):
+        parser = argparse.ArgumentParser()
+        ImporterOptions.add_arguments(parser)
+        ImporterOptions.add_dump_arguments(parser)
+
+        parsed_args = parser.parse_args(["--bulk-load"])
+        db_bulk_loader = ImporterOptions.build_importer(parsed_args, None)
+        self.assertIsInstance(db_bulk_loader, DBBulkLoader)
+
+        # no checkpoint to save, or to skip rows by
+        with contextlib.redirect_stdout(io.StringIO()):
+            ImporterOptions.apply(parsed_args, db_bulk_loader)
+        self.assertEqual(0, ImporterOptions.start_checkpoint(parsed_args, db_bulk_loader, "dump.csv"))
+        self.assertIsNone(db_bulk_loader.checkpoint)
+
+        # options the bulk loader can't honour are refused rather than ignored
+        for options in [["--skip-existing"], ["--pipeline"]]:
+            with self.assertRaises(Exception):
+                ImporterOptions.apply(parser.parse_args(["--bulk-load"] + options), DBBulkLoader(None))
+
+        with self.assertRaises(Exception):
+            ImporterOptions.start_checkpoint(parser.parse_args(["--bulk-load", "--resume"]), DBBulkLoader(None),
+                                             "dump.csv")
+
+
+if __name__ == '__main__':
+    unittest.main()
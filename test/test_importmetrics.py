@@ -0,0 +1,83 @@
+import unittest
+import tempfile
+import json
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.ImportMetrics import ImportMetrics
+from src.data.DataEntry import DataEntry
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import cnv_row, DroppingCursor, NoopConnection, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_importmetrics.py
+# ../venv/bin/python3 -m unittest
+
+class ImportMetricsTests(unittest.TestCase):
+    def test_metrics(self):
+        # nothing is kept without a file to write to
+        metrics = ImportMetrics()
+        rows = [1, 2]
+        metrics.observe("read", 0.1)
+
+        self.assertEqual({}, metrics.histograms)
+        self.assertIs(rows, metrics.timed(rows))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            metrics = ImportMetrics("cnv-rainfall", "%s/metrics.json" % temp_dir, "%s/metrics.prom" % temp_dir)
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_commit_size(10)
+            db_importer.set_metrics(metrics)
+
+            DataEntry.metrics = metrics
+            try:
+                for i in metrics.timed(range(25)):
+                    db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+            finally:
+                DataEntry.metrics = None
+
+            db_importer.connection = NoopConnection()
+            db_importer.cursor = DroppingCursor(0)
+
+            db_importer.flush()
+            db_importer._write_metrics()
+
+            with open("%s/metrics.json" % temp_dir) as filehandle:
+                report = json.load(filehandle)
+
+            stages = {(stage["stage"], stage["table"]): stage for stage in report["stages"]}
+
+            self.assertEqual(["read", "validate", "scrub", "build", "execute", "commit"],
+                             [stage["stage"] for stage in report["stages"]])
+            self.assertEqual(25, stages[("read", None)]["calls"])
+            self.assertEqual(25, stages[("build", "CNV")]["rows"])
+
+            # a chunk per commit size rows
+            self.assertEqual(3, stages[("execute", "CNV")]["calls"])
+            self.assertEqual(25, stages[("execute", "CNV")]["rows"])
+            self.assertEqual(3, stages[("commit", "CNV")]["buckets"]["+Inf"])
+
+            counters = {(counter["name"], counter["table"]): counter["value"] for counter in report["counters"]}
+            self.assertEqual(25, counters[("rows_inserted", None)])
+            self.assertEqual(25, counters[("rows_flushed", "CNV")])
+
+            with open("%s/metrics.prom" % temp_dir) as filehandle:
+                textfile = filehandle.read().splitlines()
+
+            self.assertIn('nssk_import_stage_seconds_count{importer="cnv-rainfall",stage="commit",table="CNV"} 3',
+                          textfile)
+            self.assertIn('nssk_import_stage_seconds_bucket{importer="cnv-rainfall",stage="execute",table="CNV",'
+                          'le="+Inf"} 3', textfile)
+            self.assertIn('nssk_import_rows_inserted{importer="cnv-rainfall"} 25', textfile)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from unittest import mock
+import tempfile
+import argparse
+import pstats
+import threading
+import tracemalloc
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.ImporterOptions import ImporterOptions
+from src.importer.ImportProfiler import ImportProfiler
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import cnv_row, DroppingCursor, NoopConnection, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_importprofiler.py
+# ../venv/bin/python3 -m unittest
+
+class ImportProfilerTests(unittest.TestCase):
+    def test_profile(self):
+        def build_entries(parsed_args):
+            entries = [CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")) for i in range(parsed_args.rows)]
+
+            # writes in other threads are profiled too
+            thread = threading.Thread(target=flush_entries, args=(entries,))
+            thread.start()
+            thread.join()
+
+            return len(entries)
+
+        def flush_entries(entries):
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+            for entry in entries:
+                db_importer.add(entry)
+
+            db_importer.connection = NoopConnection()
+            db_importer.cursor = DroppingCursor(0)
+            db_importer.flush()
+
+        # run as is without --profile
+        self.assertEqual(5, ImporterOptions.run(build_entries, argparse.Namespace(rows=5, profile=False), "unused.log"))
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            parsed_args = argparse.Namespace(rows=20, profile=True)
+
+            self.assertEqual(20, ImporterOptions.run(build_entries, parsed_args, "%s/cnv-rainfall.log" % temp_dir))
+
+            stats = pstats.Stats("%s/cnv-rainfall.prof" % temp_dir)
+            functions = set(function for filename, lineno, function in stats.stats)
+
+            self.assertIn("build_entries", functions)
+            self.assertIn("flush_entries", functions)
+
+            snapshot = tracemalloc.Snapshot.load("%s/cnv-rainfall.tracemalloc" % temp_dir)
+            self.assertTrue(len(snapshot.traces) > 0)
+
+            with open("%s/cnv-rainfall.profile.txt" % temp_dir) as filehandle:
+                summary = filehandle.read()
+
+            self.assertIn("Hottest functions", summary)
+            self.assertIn("CNVRainfallDataEntry.py", summary)
+            self.assertIn("Top allocation sites", summary)
+
+    def test_profile_thread_refused(self):
+        # python 3.12 and later refuse a second profiler. the thread's hook is removed rather than left to run on every
+        # call
+        profiler = ImportProfiler("unused.log")
+        hooks = []
+
+        def profile_refused(frame, event, arg):
+            with mock.patch("cProfile.Profile.enable", side_effect=ValueError):
+                profiler._profile_thread(frame, event, arg)
+
+            hooks.append(sys.getprofile())
+
+        thread = threading.Thread(target=sys.setprofile, args=(None,))
+        threading.setprofile(profile_refused)
+        try:
+            thread.start()
+        finally:
+            threading.setprofile(None)
+        thread.join()
+
+        self.assertEqual([None], hooks)
+        self.assertEqual([], profiler.thread_profiles)
+
+
+if __name__ == '__main__':
+    unittest.main()
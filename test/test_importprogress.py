@@ -0,0 +1,58 @@
+import unittest
+import io
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.ImportProgress import ImportProgress
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_importprogress.py
+# ../venv/bin/python3 -m unittest
+
+# output stream that claims to be a terminal
+class TerminalStream(io.StringIO):
+    def isatty(self):
+        return True
+
+
+class ImportProgressTests(unittest.TestCase):
+    def test_progress_rate_limited(self):
+        # not a terminal: a full line on the first update, then nothing until the interval has passed
+        stream = io.StringIO()
+        progress = ImportProgress(stream=stream, interval=3600)
+
+        for i in range(1, 1001):
+            progress.parsed(i, i // 100)
+
+        self.assertEqual(1, len(stream.getvalue().splitlines()))
+
+        progress.finish()
+
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(2, len(lines))
+        self.assertIn("Read 1000 rows, 10 failed", lines[1])
+
+    def test_progress_terminal(self):
+        # a terminal: one line redrawn in place, ended when reading is done
+        stream = TerminalStream()
+        progress = ImportProgress(stream=stream, interval=0)
+
+        progress.parsed(10)
+        progress.wrote(5, 10)
+
+        self.assertTrue(stream.getvalue().startswith("\r"))
+        self.assertNotIn("\n", stream.getvalue())
+        self.assertIn("Written 5 / 10", stream.getvalue())
+
+        progress.finish()
+
+        self.assertTrue(stream.getvalue().endswith("\n"))
+
+
+if __name__ == '__main__':
+    unittest.main()
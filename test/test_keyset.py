@@ -0,0 +1,30 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.KeySet import KeySet
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_keyset.py
+# ../venv/bin/python3 -m unittest
+
+class KeySetTests(unittest.TestCase):
+    def test_key_set(self):
+        key_set = KeySet()
+        key_set.update(("2022-02-27 00:%02d:00" % i,) for i in range(0, 60, 2))
+
+        for i in range(60):
+            key_set.add(("2022-02-27 00:%02d:00" % i,))
+
+        self.assertEqual(60, len(key_set))
+        self.assertIn(("2022-02-27 00:31:00",), key_set)
+        self.assertNotIn(("2022-02-27 01:00:00",), key_set)
+
+
+if __name__ == '__main__':
+    unittest.main()
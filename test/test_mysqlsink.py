@@ -0,0 +1,58 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.MySQLSink import MySQLSink
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import cnv_row, DroppingCursor, NoopConnection, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_mysqlsink.py
+# ../venv/bin/python3 -m unittest
+
+class MySQLSinkTests(unittest.TestCase):
+    def test_mysql_sink(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+
+        # the database is the sink unless another is set
+        self.assertIsInstance(db_importer.storage_sink, MySQLSink)
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        cursor = DroppingCursor(0)
+        db_importer.connection = NoopConnection()
+        db_importer.cursor = cursor
+
+        db_importer.flush()
+
+        self.assertFalse(db_importer.failed)
+        self.assertEqual(10, db_importer.insert_count)
+        self.assertEqual(10, sum(len(chunk) for chunk in cursor.chunks))
+        self.assertEqual(0, db_importer.pending_count())
+
+    def test_mysql_sink_unreachable(self):
+        db_importer = build_importer()
+        db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+        db_importer.logger.disabled = True
+
+        for i in range(10):
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:%02d:00" % i, "")))
+
+        # no database config to connect with. the rows are counted as dropped rather than held
+        db_importer.flush()
+
+        self.assertTrue(db_importer.failed)
+        self.assertEqual(10, db_importer.dropped_count)
+        self.assertEqual(0, db_importer.pending_count())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import tempfile
+import gzip
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH, EXECUTE_MODE_MULTIROW
+from src.importer.DBImporter import DUPLICATE_POLICY_UPSERT
+from src.importer.SQLDumpWriter import SQLDumpWriter, DUMP_FORMAT_STATEMENT
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import cnv_row, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_sqldumpwriter.py
+# ../venv/bin/python3 -m unittest
+
+class SQLDumpWriterTests(unittest.TestCase):
+    def test_sql_dump(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dump_file = "%s/load.sql.gz" % temp_dir
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_MULTIROW)
+            db_importer.set_sql_dump(SQLDumpWriter(dump_file))
+            db_importer.set_streaming(True)
+            db_importer.set_flush_rows(100)
+
+            for i in range(250):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 %02d:%02d:00" % (i // 60, i % 60), "")))
+
+                # written as they're flushed, not held for the end
+                self.assertLess(db_importer.pending_count(), 100)
+
+            db_importer.dump()
+
+            with gzip.open(dump_file, 'rt', encoding='utf-8') as filehandle:
+                statements = [line for line in filehandle if line.startswith("INSERT INTO CNV ")]
+
+            # one multirow statement per flush
+            self.assertEqual(3, len(statements))
+            self.assertEqual(250, db_importer.sql_dump.row_count)
+            self.assertEqual(0, db_importer.insert_count)
+
+    def test_sql_dump_statements(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            dump_file = "%s/load.sql" % temp_dir
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_duplicate_policy(DUPLICATE_POLICY_UPSERT)
+            db_importer.set_sql_dump(SQLDumpWriter(dump_file, DUMP_FORMAT_STATEMENT))
+
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:00:00", "")))
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022-02-27 00:05:00", "")))
+            db_importer.dump()
+
+            with open(dump_file, encoding='utf-8') as filehandle:
+                statements = [line.rstrip("\n") for line in filehandle if line.startswith("INSERT ")]
+
+            self.assertEqual(2, len(statements))
+            self.assertTrue(statements[0].startswith("INSERT IGNORE INTO CNV (MeasurementTimestamp,"))
+            self.assertIn("VALUES ('2022-02-27 00:00:00',", statements[0])
+            self.assertTrue(statements[1].endswith(",Rainfall=new.Rainfall;"))
+
+
+if __name__ == '__main__':
+    unittest.main()
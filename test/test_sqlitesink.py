@@ -0,0 +1,96 @@
+import unittest
+import tempfile
+import sqlite3
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.importer.DBImporter import EXECUTE_MODE_BATCH
+from src.importer.DBImporter import DUPLICATE_POLICY_UPSERT
+from src.importer.FailureSink import FailureSink
+from src.importer.SQLiteSink import SQLiteSink
+from src.cnv.CNVRainfallDataEntry import CNVRainfallDataEntry
+from importer_fakes import CNV_TABLE_TEMPLATE, cnv_row, build_importer
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_sqlitesink.py
+# ../venv/bin/python3 -m unittest
+
+class SQLiteSinkTests(unittest.TestCase):
+    def test_sqlite_sink(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sink_path = "%s/cnv.sqlite" % temp_dir
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_storage_sink(SQLiteSink(sink_path, CNV_TABLE_TEMPLATE))
+            db_importer.duplicate_sink = FailureSink("%s/duplicates.sql" % temp_dir)
+
+            for i in range(10):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:%02d:00" % i, "")))
+            db_importer.flush()
+
+            # the second flush repeats a row of the first
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:03:00", "")))
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:10:00", "0.4")))
+            db_importer.flush()
+
+            db_importer._close()
+            db_importer.duplicate_sink.close()
+
+            self.assertEqual(11, db_importer.insert_count)
+            self.assertEqual(1, db_importer.duplicate_count)
+
+            with open("%s/duplicates.sql" % temp_dir) as filehandle:
+                self.assertIn("'2022-02-27 00:03:00'", filehandle.read())
+
+            with sqlite3.connect(sink_path) as connection:
+                rows = connection.execute("SELECT * FROM CNV ORDER BY MeasurementTimestamp").fetchall()
+
+            # dates are canonical and numbers are stored as numbers
+            self.assertEqual(11, len(rows))
+            self.assertEqual(("2022-02-27 00:10:00", 4.5, 1012.25, 0.4, 0.2), rows[10])
+            self.assertIsNone(rows[0][3])
+
+    def test_sqlite_sink_upsert(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sink_path = "%s/cnv.sqlite" % temp_dir
+
+            db_importer = build_importer()
+            db_importer.set_execute_mode(EXECUTE_MODE_BATCH)
+            db_importer.set_duplicate_policy(DUPLICATE_POLICY_UPSERT)
+            db_importer.set_storage_sink(SQLiteSink(sink_path, CNV_TABLE_TEMPLATE))
+
+            for i in range(10):
+                db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:%02d:00" % i, "")))
+            db_importer.flush()
+
+            # one repeated row is unchanged, the other gets an hourly rainfall, and a new row is repeated in the flush
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:03:00", "")))
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:07:00", "1.5")))
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:10:00", "")))
+            db_importer.add(CNVRainfallDataEntry(cnv_row("2022/02/27 00:10:00", "0.4")))
+            db_importer.flush()
+
+            db_importer._close()
+
+            # counted as the mysql upsert counts them: only rows that changed are updates
+            self.assertEqual(11, db_importer.insert_count)
+            self.assertEqual(3, db_importer.duplicate_count)
+            self.assertEqual(2, db_importer.updated_count)
+
+            with sqlite3.connect(sink_path) as connection:
+                rows = dict(connection.execute("SELECT MeasurementTimestamp, HourlyRainfall FROM CNV").fetchall())
+
+            self.assertEqual(11, len(rows))
+            self.assertIsNone(rows["2022-02-27 00:03:00"])
+            self.assertEqual(1.5, rows["2022-02-27 00:07:00"])
+            self.assertEqual(0.4, rows["2022-02-27 00:10:00"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from pathlib import Path
+import sys
+
+path_root = Path(__file__).parents[1]
+sys.path.append(str(path_root))
+
+# depends on adding src to sys.path
+from src.data.TableTemplate import TableTemplate
+from src.data.ColumnTypes import TYPE_DATETIME, TYPE_DECIMAL
+from importer_fakes import CNV_TABLE_TEMPLATE
+
+
+# run with:
+# ../venv/bin/python3 -m unittest test_tabletemplate.py
+# ../venv/bin/python3 -m unittest
+
+class TableTemplateTests(unittest.TestCase):
+    def test_table_template(self):
+        template = TableTemplate(CNV_TABLE_TEMPLATE)
+
+        self.assertEqual("SITE", template.placeholder)
+        self.assertEqual(["MeasurementTimestamp", "AirTemperature", "BarometricPressure", "HourlyRainfall", "Rainfall"],
+                         template.columns)
+        self.assertEqual(TYPE_DATETIME, template.column_type("MeasurementTimestamp"))
+        self.assertEqual((9, 7), template.column_sizes["AirTemperature"])
+        self.assertEqual(["MeasurementTimestamp"], template.key_columns)
+        self.assertTrue(template.mysql("CNV").startswith("CREATE TABLE CNV ("))
+
+        # keyed by the dump field written to each column
+        field_types = template.field_types(["yyyy/MM/dd HH:mm:ss", "Rainfall (mm)"],
+                                           ["MeasurementTimestamp", "Rainfall"])
+        self.assertEqual({"yyyy/MM/dd HH:mm:ss": TYPE_DATETIME, "Rainfall (mm)": TYPE_DECIMAL}, field_types)
+
+
+if __name__ == '__main__':
+    unittest.main()